@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class AssignmentConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "assignment"
+
+    def ready(self):
+        from assignment import signals  # noqa: F401
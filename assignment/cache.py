@@ -0,0 +1,163 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from assignment.models import submission_digest
+
+
+class SummaryCache:
+    """
+    Caches summary responses under a per-user data version. Any write to a
+    user's records replaces the version token, so entries computed from older
+    data are never looked up again and simply age out of the cache.
+    """
+
+    @staticmethod
+    def is_enabled():
+        return getattr(settings, "SUMMARY_CACHE_ENABLED", True)
+
+    @staticmethod
+    def _cache():
+        return caches[getattr(settings, "SUMMARY_CACHE_ALIAS", "default")]
+
+    @staticmethod
+    def _version_key(user_id):
+        return f"summary:version:{user_id}"
+
+    @staticmethod
+    def _new_version():
+        # A fresh token rather than a counter, so an evicted version key can
+        # never be recreated with a value that matches old entries.
+        return str(time.time_ns())
+
+    @staticmethod
+    def version(user_id):
+        cache = SummaryCache._cache()
+        key = SummaryCache._version_key(user_id)
+        version = cache.get(key)
+        if version is None:
+            cache.add(key, SummaryCache._new_version(), timeout=None)
+            version = cache.get(key)
+        return version
+
+    @staticmethod
+    def bump(*user_ids):
+        """
+        Invalidates cached summaries of the given users. The version is
+        replaced immediately and again once the surrounding transaction
+        commits, so readers racing the commit cannot cache uncommitted state.
+        """
+        if not SummaryCache.is_enabled() or not user_ids:
+            return
+
+        def replace_versions():
+            SummaryCache._cache().set_many(
+                {
+                    SummaryCache._version_key(user_id): SummaryCache._new_version()
+                    for user_id in user_ids
+                },
+                timeout=None,
+            )
+
+        replace_versions()
+        transaction.on_commit(replace_versions)
+
+    @staticmethod
+    def key(user_id, from_date, to_date, granularity, tzinfo, window=3, method="sma"):
+        params = "|".join(
+            [
+                str(user_id),
+                SummaryCache.version(user_id),
+                from_date.isoformat(),
+                to_date.isoformat(),
+                granularity,
+                str(tzinfo),
+                str(window),
+                method,
+            ]
+        )
+        return f"summary:{hashlib.sha256(params.encode()).hexdigest()}"
+
+    @staticmethod
+    def get(key):
+        return SummaryCache._cache().get(key)
+
+    @staticmethod
+    def set(key, payload):
+        SummaryCache._cache().set(
+            key, payload, timeout=getattr(settings, "SUMMARY_CACHE_TIMEOUT", 300)
+        )
+
+
+class RecentSubmissions:
+    """
+    Bounded in-process filter of recently stored submission IDs, mapping each
+    to its record ID so a retried submission can be answered without the
+    user lookup and the rejected insert. Entries live in a fixed table of
+    slots picked by the digest's leading bytes; a new entry overwrites
+    whatever shared its slot, so memory stays constant and old entries fade
+    out. Slots keep the full 16-byte digest, so a hit is never a different
+    submission; a miss only means the database has to be consulted.
+
+    Entries are dropped by the Record post_delete signal and by PurgeService
+    in this process only; records deleted by another process (a worker,
+    purge_data or init_data) stay here until overwritten. A hit is therefore
+    confirmed with an indexed exists() before it is trusted.
+    """
+
+    _slots = []
+
+    @staticmethod
+    def size():
+        return getattr(settings, "RECENT_SUBMISSIONS_SIZE", 65536)
+
+    @staticmethod
+    def _index(digest):
+        slots = RecentSubmissions._slots
+        if len(slots) != RecentSubmissions.size():
+            slots = RecentSubmissions._slots = [None] * RecentSubmissions.size()
+        return slots, int.from_bytes(digest[:8], "big") % len(slots)
+
+    @staticmethod
+    def get(submission_id):
+        if RecentSubmissions.size() <= 0:
+            return None
+        digest = submission_digest(submission_id)
+        slots, index = RecentSubmissions._index(digest)
+        entry = slots[index]
+        if entry is not None and entry[0] == digest:
+            return entry[1]
+        return None
+
+    @staticmethod
+    def add(submission_id, record_id):
+        """
+        Remembers a stored submission once the surrounding transaction
+        commits, so a rolled-back insert is never reported as existing.
+        """
+        if RecentSubmissions.size() <= 0:
+            return
+        digest = submission_digest(submission_id)
+
+        def remember():
+            slots, index = RecentSubmissions._index(digest)
+            slots[index] = (digest, record_id)
+
+        transaction.on_commit(remember)
+
+    @staticmethod
+    def discard(submission_id):
+        if RecentSubmissions.size() <= 0:
+            return
+        digest = submission_digest(submission_id)
+        slots, index = RecentSubmissions._index(digest)
+        entry = slots[index]
+        if entry is not None and entry[0] == digest:
+            slots[index] = None
+
+    @staticmethod
+    def clear():
+        RecentSubmissions._slots = []
@@ -0,0 +1,159 @@
+"""
+Serializer-free rendering of summary periods.
+
+`SummarySerializer` builds a field object per value and the JSON renderer
+walks the result again; for long ranges that dominates the response time.
+The functions here produce the same wire format from the period dicts
+returned by AggregationService directly: ISO strings are computed once per
+distinct datetime (a period's end is the next period's start) and numbers
+are formatted straight into a fixed template.
+"""
+
+import json
+
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from assignment import timing
+
+PERIOD_TEMPLATE = (
+    '{"start_date":"%s","end_date":"%s","total_word_count":%d,'
+    '"total_study_time_minutes":%d,"average_words_per_minute":%s,'
+    '"moving_avg_word_count":%s,"moving_avg_study_time":%s,"record_count":%d}'
+)
+
+
+class SummaryPeriods(list):
+    """
+    Raw period dicts that should be rendered with the fast encoder rather
+    than through SummarySerializer.
+    """
+
+
+class IsoFormatter:
+    """
+    Formats aware datetimes exactly like DRF's DateTimeField: converted to
+    the current timezone, ISO 8601, with "+00:00" written as "Z".
+    """
+
+    def __init__(self, tzinfo=None):
+        self.tzinfo = tzinfo or timezone.get_current_timezone()
+        self.formatted = {}
+
+    def __call__(self, value):
+        formatted = self.formatted.get(value)
+        if formatted is None:
+            formatted = value.astimezone(self.tzinfo).isoformat()
+            if formatted.endswith("+00:00"):
+                formatted = formatted[:-6] + "Z"
+            self.formatted[value] = formatted
+        return formatted
+
+
+def format_float(value):
+    return "null" if value is None else repr(float(value))
+
+
+def represent_period(period, isoformat):
+    """
+    Returns the same dict as `SummarySerializer(period).data`.
+    """
+    return {
+        "start_date": isoformat(period["start_date"]),
+        "end_date": isoformat(period["end_date"]),
+        "total_word_count": int(period["total_word_count"]),
+        "total_study_time_minutes": int(period["total_study_time_minutes"]),
+        "average_words_per_minute": float(period["average_words_per_minute"]),
+        "moving_avg_word_count": (
+            None
+            if period["moving_avg_word_count"] is None
+            else float(period["moving_avg_word_count"])
+        ),
+        "moving_avg_study_time": (
+            None
+            if period["moving_avg_study_time"] is None
+            else float(period["moving_avg_study_time"])
+        ),
+        "record_count": int(period["record_count"]),
+    }
+
+
+def encode_period(period, isoformat):
+    """
+    Returns `SummarySerializer(period).data` as compact JSON text.
+    """
+    return PERIOD_TEMPLATE % (
+        isoformat(period["start_date"]),
+        isoformat(period["end_date"]),
+        period["total_word_count"],
+        period["total_study_time_minutes"],
+        format_float(period["average_words_per_minute"]),
+        format_float(period["moving_avg_word_count"]),
+        format_float(period["moving_avg_study_time"]),
+        period["record_count"],
+    )
+
+
+def iter_encoded_periods(periods, tzinfo=None):
+    isoformat = IsoFormatter(tzinfo)
+    for period in periods:
+        yield encode_period(period, isoformat)
+
+
+def encode_periods(periods, tzinfo=None):
+    """
+    Returns `SummarySerializer(periods, many=True).data` as compact JSON text.
+    """
+    return "[" + ",".join(iter_encoded_periods(periods, tzinfo)) + "]"
+
+
+def encode_payload(data):
+    """
+    Encodes a response payload like DRF's JSONRenderer does with its default
+    settings (compact, unicode, strict), writing SummaryPeriods values with
+    the fast encoder.
+    """
+    members = []
+    for key, value in data.items():
+        if isinstance(value, SummaryPeriods):
+            encoded = encode_periods(value)
+        else:
+            encoded = json.dumps(
+                value, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+            )
+        members.append(f"{json.dumps(key, ensure_ascii=False)}:{encoded}")
+    text = "{" + ",".join(members) + "}"
+    # Same escaping JSONRenderer applies for JavaScript compatibility
+    return text.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029").encode()
+
+
+class SummaryJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that writes summary payloads with the fast encoder. Any
+    other data, or an indented rendering (e.g. for the browsable API), goes
+    through the regular renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timing.phase("render"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, dict) or not any(
+            isinstance(value, SummaryPeriods) for value in data.values()
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is None:
+            return encode_payload(data)
+
+        isoformat = IsoFormatter()
+        data = {
+            key: (
+                [represent_period(period, isoformat) for period in value]
+                if isinstance(value, SummaryPeriods)
+                else value
+            )
+            for key, value in data.items()
+        }
+        return super().render(data, accepted_media_type, renderer_context)
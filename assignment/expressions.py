@@ -0,0 +1,181 @@
+from bisect import bisect_right
+from datetime import UTC, datetime, timedelta
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import NotSupportedError
+from django.db.models import BigIntegerField, DateTimeField, Func
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+# Local-time formats of the truncated values, as returned by Django's
+# django_datetime_trunc() SQLite function. "%%" is a literal "%" in SQL.
+SQLITE_TRUNC_FORMATS = {
+    "hour": "%%Y-%%m-%%d %%H:00:00",
+    "day": "%%Y-%%m-%%d 00:00:00",
+    "month": "%%Y-%%m-01 00:00:00",
+}
+
+# Range scanned for UTC offset transitions; outside it the nearest known
+# offset applies.
+OFFSET_SCAN_RANGE = (
+    datetime(1970, 1, 1, tzinfo=UTC),
+    datetime(2100, 1, 1, tzinfo=UTC),
+)
+
+
+class EpochSeconds(Func):
+    """
+    Whole seconds since the Unix epoch (UTC) of a datetime column, computed
+    natively by the database.
+    """
+
+    arity = 1
+    output_field = BigIntegerField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        raise NotSupportedError(
+            f"EpochSeconds is not implemented for {connection.vendor}"
+        )
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            template="CAST(strftime('%%%%s', %(expressions)s) AS INTEGER)",
+            **extra_context,
+        )
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            template="FLOOR(EXTRACT(EPOCH FROM %(expressions)s))::bigint",
+            **extra_context,
+        )
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        return super().as_sql(
+            compiler,
+            connection,
+            template="UNIX_TIMESTAMP(%(expressions)s) DIV 1",
+            **extra_context,
+        )
+
+
+class WindowSum(Func):
+    """
+    SUM() usable as a window function over an aggregate, e.g.
+    SUM(SUM(word_count)) OVER (...) on a grouped query. Django's Sum refuses
+    to wrap another aggregate.
+    """
+
+    function = "SUM"
+    window_compatible = True
+    output_field = BigIntegerField()
+
+
+@lru_cache(maxsize=32)
+def utc_offset_spans(tzinfo):
+    """
+    Returns [(since, offset_seconds), ...] for `tzinfo`, oldest first: from
+    `since` (an aware UTC datetime) on, local time is UTC + offset_seconds.
+    Transitions are located by scanning OFFSET_SCAN_RANGE a day at a time and
+    bisecting to the second.
+    """
+    start, end = OFFSET_SCAN_RANGE
+    if tzinfo is None or isinstance(tzinfo, dt_timezone):
+        offset = tzinfo.utcoffset(None) if tzinfo is not None else timedelta(0)
+        return ((start, int(offset.total_seconds())),)
+
+    def offset_at(epoch):
+        moment = datetime.fromtimestamp(epoch, UTC).astimezone(tzinfo)
+        return int(moment.utcoffset().total_seconds())
+
+    day = 24 * 3600
+    epoch = int(start.timestamp())
+    spans = [(start, offset_at(epoch))]
+    while epoch < end.timestamp():
+        following = epoch + day
+        if offset_at(following) != spans[-1][1]:
+            low, high = epoch, following
+            while high - low > 1:
+                middle = (low + high) // 2
+                if offset_at(middle) == spans[-1][1]:
+                    low = middle
+                else:
+                    high = middle
+            spans.append((datetime.fromtimestamp(high, UTC), offset_at(high)))
+        epoch = following
+    return tuple(spans)
+
+
+def utc_offset_spans_between(tzinfo, start=None, end=None):
+    """
+    The utc_offset_spans() that apply to [start, end]; the whole table when
+    either bound is unknown.
+    """
+    spans = utc_offset_spans(tzinfo)
+    if start is None or end is None:
+        return spans
+    sinces = [since for since, _ in spans]
+    first = max(bisect_right(sinces, start) - 1, 0)
+    last = max(bisect_right(sinces, end) - 1, 0)
+    return spans[first : last + 1]
+
+
+class PeriodTrunc(Trunc):
+    """
+    Trunc that SQLite evaluates natively. Django's SQLite backend implements
+    Trunc as a Python function called once per row; this emits strftime()
+    with the current timezone's UTC offset as a modifier instead. Offsets
+    that change inside `bounds` (DST) are chosen with a CASE on the stored
+    UTC timestamp. Without bounds, a timezone with more than one offset
+    falls back to Django's implementation, as does SUMMARY_NATIVE_TRUNC =
+    False. Other backends already truncate natively (date_trunc, CONVERT_TZ)
+    and use Trunc unchanged.
+    """
+
+    def __init__(self, expression, kind, bounds=(None, None), **extra):
+        self.bounds = bounds
+        super().__init__(expression, kind, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        if (
+            not getattr(settings, "SUMMARY_NATIVE_TRUNC", True)
+            or self.kind not in SQLITE_TRUNC_FORMATS
+            or not isinstance(self.output_field, DateTimeField)
+            or not isinstance(self.lhs.output_field, DateTimeField)
+        ):
+            return super().as_sql(compiler, connection)
+
+        tzinfo = None
+        if settings.USE_TZ:
+            tzinfo = self.tzinfo or timezone.get_current_timezone()
+        spans = utc_offset_spans_between(tzinfo, *self.bounds)
+        if len(spans) > 1 and None in self.bounds:
+            return super().as_sql(compiler, connection)
+
+        sql, params = compiler.compile(self.lhs)
+        fmt = SQLITE_TRUNC_FORMATS[self.kind]
+        # SQLite rounds fractional seconds to milliseconds, which could carry
+        # xx:59:59.9995 into the next period; drop them before parsing.
+        value = f"substr({sql}, 1, 19)"
+        if len(spans) == 1:
+            offset = spans[0][1]
+            if offset == 0:
+                return f"strftime('{fmt}', {value})", params
+            return f"strftime('{fmt}', {value}, '{offset:+d} seconds')", params
+
+        # Timestamps are stored as UTC "YYYY-MM-DD HH:MM:SS[.ffffff]" text,
+        # so they compare correctly with transition instants as strings.
+        whens = "".join(
+            f" WHEN {sql} < '{since:%Y-%m-%d %H:%M:%S}' THEN '{offset:+d} seconds'"
+            for (_, offset), (since, _) in zip(spans, spans[1:])
+        )
+        modifier = f"CASE{whens} ELSE '{spans[-1][1]:+d} seconds' END"
+        return (
+            f"strftime('{fmt}', {value}, {modifier})",
+            (*params, *params * (len(spans) - 1)),
+        )
@@ -0,0 +1,194 @@
+"""
+Background runner for management commands. JobRunner.submit() stores a Job
+row and runs the command on a thread pool of JOB_WORKERS threads in the
+current process. The row records the status, the last line the command
+wrote, its output and timing, so any worker process can answer a status
+request.
+
+A job belongs to the process that submitted it. When that process exits
+before the job finishes, the job can never complete; JobRunner.refresh()
+marks such jobs failed when they are looked up on the same host.
+"""
+
+import io
+import logging
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.utils import timezone
+
+from assignment.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Seconds between progress writes while a command runs
+PROGRESS_INTERVAL = 1.0
+
+# Characters of command output kept on the job (the end of it)
+OUTPUT_LIMIT = 64 * 1024
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def is_alive(worker):
+    """
+    False when `worker` names a process on this host that no longer exists;
+    True when it exists or runs on another host, where it cannot be checked.
+    """
+    host, _, pid = worker.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobOutput(io.TextIOBase):
+    """
+    stdout/stderr of a running command: keeps the end of the output and
+    stores the last line written as the job's progress, at most once per
+    PROGRESS_INTERVAL. Nothing is stored while the command is inside a
+    transaction: the write would only be seen once it commits, would be
+    undone with it, and would hold a lock on the job row meanwhile. Commands
+    run as jobs (init_data) therefore write their progress lines between
+    transactions.
+    """
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.parts = []
+        self.size = 0
+        self.last_line = ""
+        self.saved_at = 0.0
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        if self.size > 2 * OUTPUT_LIMIT:
+            kept = "".join(self.parts)[-OUTPUT_LIMIT:]
+            self.parts = [kept]
+            self.size = len(kept)
+
+        lines = [line.strip() for line in text.splitlines() if line.strip()]
+        if lines:
+            self.last_line = lines[-1][:255]
+            now = time.monotonic()
+            if (
+                now - self.saved_at >= PROGRESS_INTERVAL
+                and not transaction.get_connection().in_atomic_block
+            ):
+                self.saved_at = now
+                Job.objects.filter(id=self.job_id).update(progress=self.last_line)
+        return len(text)
+
+    def getvalue(self):
+        return "".join(self.parts)[-OUTPUT_LIMIT:]
+
+
+class JobRunner:
+    _executor = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _get_executor():
+        with JobRunner._lock:
+            if JobRunner._executor is None:
+                JobRunner._executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, "JOB_WORKERS", 1),
+                    thread_name_prefix="job",
+                )
+            return JobRunner._executor
+
+    @staticmethod
+    def shutdown(wait=True):
+        """Stops the pool, by default after its queued jobs have finished."""
+        with JobRunner._lock:
+            executor, JobRunner._executor = JobRunner._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    @staticmethod
+    def _after_fork():
+        # The pool's threads do not survive a fork
+        JobRunner._executor = None
+        JobRunner._lock = threading.Lock()
+
+    @staticmethod
+    def submit(command, **options):
+        """
+        Stores a queued Job for `call_command(command, **options)` and starts
+        it once the surrounding transaction commits. `options` must be JSON
+        serializable.
+        """
+        job = Job.objects.create(command=command, options=options, worker=worker_name())
+        transaction.on_commit(
+            lambda: JobRunner._get_executor().submit(JobRunner._work, job.id)
+        )
+        return job
+
+    @staticmethod
+    def run(job_id):
+        """Runs a queued job in the calling thread."""
+        started = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=timezone.now(), worker=worker_name()
+        )
+        if not started:
+            return
+        job = Job.objects.get(id=job_id)
+        output = JobOutput(job_id)
+        status, error = Job.SUCCEEDED, ""
+        try:
+            call_command(job.command, stdout=output, stderr=output, **job.options)
+        except Exception as e:
+            logger.exception(f"Job {job_id} ({job.command}) failed")
+            status, error = Job.FAILED, str(e) or e.__class__.__name__
+        Job.objects.filter(id=job_id).update(
+            status=status,
+            error=error,
+            progress=output.last_line,
+            output=output.getvalue(),
+            finished_at=timezone.now(),
+        )
+
+    @staticmethod
+    def _work(job_id):
+        try:
+            JobRunner.run(job_id)
+        except Exception:
+            logger.exception(f"Job {job_id} could not be run")
+        finally:
+            # Pool threads would otherwise keep their connections open
+            connections.close_all()
+
+    @staticmethod
+    def refresh(job):
+        """
+        Marks `job` failed when it is unfinished and the process that owns
+        it has exited. Returns the job.
+        """
+        if job.status in (Job.QUEUED, Job.RUNNING) and not is_alive(job.worker):
+            error = f"Worker process {job.worker} exited before the job finished"
+            updated = Job.objects.filter(id=job.id, status=job.status).update(
+                status=Job.FAILED, error=error, finished_at=timezone.now()
+            )
+            if updated:
+                job.refresh_from_db()
+        return job
+
+
+os.register_at_fork(after_in_child=JobRunner._after_fork)
@@ -0,0 +1,112 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from django.utils import timezone
+
+from assignment.models import Record, RecordRollup, User
+from assignment.services import RecordIngestService
+
+BENCHMARK_USERNAME = "ingest-benchmark"
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark RecordIngestService.bulk_ingest throughput and the on-disk "
+        "size of the Record table and its indexes"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size", type=int, default=100_000, help="Number of records to ingest"
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--without-rollups",
+            action="store_true",
+            help="Disable rollup maintenance to time the Record inserts alone",
+        )
+
+    def handle(self, *args, **options):
+        if options["without_rollups"]:
+            with override_settings(SUMMARY_USE_ROLLUPS=False):
+                return self.benchmark(options)
+        return self.benchmark(options)
+
+    def benchmark(self, options):
+        users = [
+            User.objects.get_or_create(username=f"{BENCHMARK_USERNAME}-{i}")[0]
+            for i in range(options["users"])
+        ]
+        try:
+            self.clear(users)
+            entries = self.generate(users, options["size"], options["seed"])
+            sizes_before = self.storage_sizes()
+
+            started = time.perf_counter()
+            RecordIngestService.bulk_ingest(entries, chunk_size=options["chunk_size"])
+            created = time.perf_counter() - started
+
+            started = time.perf_counter()
+            RecordIngestService.bulk_ingest(entries, chunk_size=options["chunk_size"])
+            duplicates = time.perf_counter() - started
+
+            size = len(entries)
+            self.stdout.write(
+                f"{size:,} records  created {size / created:10,.0f}/s"
+                f"  duplicates {size / duplicates:10,.0f}/s"
+            )
+            sizes_after = self.storage_sizes()
+            if sizes_after is not None:
+                for name, after in sizes_after.items():
+                    grown = after - sizes_before.get(name, 0)
+                    self.stdout.write(f"  {name:<40} {grown / size:7.1f} bytes/record")
+        finally:
+            self.clear(users)
+            User.objects.filter(id__in=[user.id for user in users]).delete()
+
+    def generate(self, users, size, seed):
+        rng = random.Random(seed)
+        start = timezone.now() - timedelta(days=365)
+        return [
+            {
+                "user_id": rng.choice(users).id,
+                "word_count": rng.randint(10, 100),
+                "study_time_minutes": rng.randint(5, 60),
+                "timestamp": start + timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+            }
+            for _ in range(size)
+        ]
+
+    def storage_sizes(self):
+        """
+        Bytes used by the record table and each of its indexes, or None when
+        the database cannot report it (SQLite's dbstat table is required).
+        """
+        if connection.vendor != "sqlite":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT s.name, SUM(s.pgsize) FROM dbstat AS s "
+                "JOIN sqlite_master AS m ON m.name = s.name "
+                "WHERE m.tbl_name = %s GROUP BY s.name ORDER BY s.name",
+                [Record._meta.db_table],
+            )
+            return dict(cursor.fetchall())
+
+    def clear(self, users):
+        # Plain DELETEs: the ORM collector would load every row into memory
+        user_ids = [user.id for user in users]
+        placeholders = ", ".join(["%s"] * len(user_ids))
+        with connection.cursor() as cursor:
+            for model in (Record, RecordRollup):
+                cursor.execute(
+                    f"DELETE FROM {model._meta.db_table} "
+                    f"WHERE user_id IN ({placeholders})",
+                    user_ids,
+                )
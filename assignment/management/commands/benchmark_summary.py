@@ -0,0 +1,142 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from django.utils import timezone
+
+from assignment.models import Record, RecordRollup, User
+from assignment.services import GRANULARITIES, AggregationService, RollupService
+
+BENCHMARK_USERNAME = "summary-benchmark"
+
+ENGINE_SETTINGS = {
+    "orm-trunc": {
+        "SUMMARY_ENGINE": "orm",
+        "SUMMARY_USE_ROLLUPS": False,
+        "SUMMARY_NATIVE_TRUNC": False,
+    },
+    "orm": {"SUMMARY_ENGINE": "orm", "SUMMARY_USE_ROLLUPS": False},
+    "rollup": {"SUMMARY_ENGINE": "orm", "SUMMARY_USE_ROLLUPS": True},
+    "numpy": {"SUMMARY_ENGINE": "numpy"},
+}
+
+
+class Command(BaseCommand):
+    help = "Benchmark AggregationService.get_summary engines on synthetic data"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[10_000, 1_000_000, 10_000_000],
+            help="Numbers of records to benchmark",
+        )
+        parser.add_argument(
+            "--engines",
+            nargs="+",
+            choices=sorted(ENGINE_SETTINGS),
+            default=["orm", "rollup", "numpy"],
+            help="Summary engines to compare",
+        )
+        parser.add_argument(
+            "--granularity",
+            nargs="+",
+            choices=GRANULARITIES,
+            default=list(GRANULARITIES),
+            help="Granularities to benchmark",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=730,
+            help="Time span the synthetic records are spread over",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=3,
+            help="Runs per measurement; the fastest is reported",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        to_date = timezone.now()
+        from_date = to_date - timedelta(days=options["days"])
+
+        try:
+            for size in options["sizes"]:
+                self.clear(user)
+                started = time.perf_counter()
+                self.generate(user, size, from_date, options["days"], options["seed"])
+                if "rollup" in options["engines"]:
+                    RollupService.rebuild(user_id=user.id)
+                self.stdout.write(
+                    f"\n{size:,} records "
+                    f"(generated in {time.perf_counter() - started:.1f}s)"
+                )
+
+                for granularity in options["granularity"]:
+                    timings = {
+                        engine: self.measure(
+                            engine,
+                            user.id,
+                            from_date,
+                            to_date,
+                            granularity,
+                            options["repeat"],
+                        )
+                        for engine in options["engines"]
+                    }
+                    baseline = timings[options["engines"][0]]
+                    self.stdout.write(
+                        f"  {granularity:<6}"
+                        + "".join(
+                            f"  {engine}={seconds * 1000:9.1f}ms"
+                            f" ({baseline / seconds:5.1f}x)"
+                            for engine, seconds in timings.items()
+                        )
+                    )
+        finally:
+            self.clear(user)
+            user.delete()
+
+    def measure(self, engine, user_id, from_date, to_date, granularity, repeat):
+        best = float("inf")
+        with override_settings(**ENGINE_SETTINGS[engine]):
+            for _ in range(repeat):
+                started = time.perf_counter()
+                AggregationService.get_summary(user_id, from_date, to_date, granularity)
+                best = min(best, time.perf_counter() - started)
+        return best
+
+    def generate(self, user, size, from_date, days, seed, batch_size=10_000):
+        rng = random.Random(seed)
+        span_seconds = days * 24 * 3600
+        for start in range(0, size, batch_size):
+            batch = [
+                Record(
+                    user=user,
+                    word_count=rng.randint(10, 100),
+                    study_time_minutes=rng.randint(5, 60),
+                    timestamp=from_date
+                    + timedelta(seconds=rng.randrange(span_seconds)),
+                    submission_id=f"bench_{seed}_{i}",
+                )
+                for i in range(start, min(start + batch_size, size))
+            ]
+            with transaction.atomic():
+                Record.objects.bulk_create(batch)
+
+    def clear(self, user):
+        # Plain DELETEs: the ORM collector would load every row into memory
+        with connection.cursor() as cursor:
+            for model in (Record, RecordRollup):
+                cursor.execute(
+                    f"DELETE FROM {model._meta.db_table} WHERE user_id = %s",
+                    [user.id],
+                )
@@ -0,0 +1,77 @@
+import random
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from assignment.encoders import encode_periods
+from assignment.serializers import SummarySerializer
+from assignment.services import AggregationService, next_period
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark rendering summary periods with SummarySerializer vs the fast encoder"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1_000, 10_000],
+            help="Numbers of summary periods to render",
+        )
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=5,
+            help="Runs per measurement; the fastest is reported",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        for size in options["sizes"]:
+            periods = self.generate(size, options["seed"])
+            serializer_bytes = self.render_serializer(periods)
+            encoder_bytes = encode_periods(periods).encode()
+            if serializer_bytes != encoder_bytes:
+                self.stderr.write(f"{size:,} periods: encoder output differs")
+
+            serializer = self.measure(self.render_serializer, periods, options)
+            encoder = self.measure(
+                lambda p: encode_periods(p).encode(), periods, options
+            )
+            self.stdout.write(
+                f"{size:>8,} periods  serializer={serializer * 1000:9.1f}ms"
+                f"  encoder={encoder * 1000:9.1f}ms ({serializer / encoder:5.1f}x)"
+            )
+
+    def measure(self, render, periods, options):
+        best = float("inf")
+        for _ in range(options["repeat"]):
+            started = time.perf_counter()
+            render(periods)
+            best = min(best, time.perf_counter() - started)
+        return best
+
+    def render_serializer(self, periods):
+        return JSONRenderer().render(SummarySerializer(periods, many=True).data)
+
+    def generate(self, size, seed):
+        rng = random.Random(seed)
+        period = timezone.make_aware(datetime(2020, 1, 1))
+        rows = []
+        for _ in range(size):
+            rows.append(
+                {
+                    "period": period,
+                    "total_word_count": rng.randint(0, 5000),
+                    "total_study_time_minutes": rng.randint(0, 300),
+                    "record_count": rng.randint(1, 50),
+                }
+            )
+            period = next_period(period, "hour")
+        return AggregationService.derive_metrics(rows, "hour")
@@ -0,0 +1,75 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from assignment.exports import (
+    CONTENT_TYPES,
+    EXPORT_CHUNK_SIZE,
+    encode_rows,
+    export_rows,
+)
+from assignment.management.commands.purge_data import parse_datetime
+from assignment.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream a user's raw records in (timestamp, id) order as CSV or NDJSON "
+        "to a file or stdout"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-id", type=int, required=True)
+        parser.add_argument(
+            "--format",
+            choices=sorted(CONTENT_TYPES),
+            default="csv",
+            dest="export_format",
+        )
+        parser.add_argument(
+            "--from",
+            dest="from_date",
+            type=parse_datetime,
+            default=None,
+            help="Only records at or after this ISO time",
+        )
+        parser.add_argument(
+            "--to",
+            dest="to_date",
+            type=parse_datetime,
+            default=None,
+            help="Only records at or before this ISO time",
+        )
+        parser.add_argument(
+            "--output", default="-", help="File to write to (default: stdout)"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help="Records fetched and written at a time",
+        )
+
+    def handle(self, *args, **options):
+        user_id = options["user_id"]
+        if not User.objects.filter(id=user_id).exists():
+            raise CommandError(f"User with ID {user_id} does not exist.")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be positive")
+
+        rows = export_rows(
+            user_id,
+            options["from_date"],
+            options["to_date"],
+            chunk_size=options["chunk_size"],
+        )
+        chunks = encode_rows(rows, options["export_format"], options["chunk_size"])
+
+        if options["output"] == "-":
+            # Every chunk ends with a newline, so none is appended
+            for chunk in chunks:
+                self.stdout.write(chunk)
+            return
+
+        with open(options["output"], "w", encoding="utf-8", newline="") as out:
+            for chunk in chunks:
+                out.write(chunk)
+        self.stderr.write(f"Exported user {user_id} to {options['output']}")
@@ -1,13 +1,160 @@
-from django.core.management.base import BaseCommand
-from assignment.models import User, Record
-from datetime import timedelta
+import math
+import multiprocessing
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
 from django.utils import timezone
-import hashlib
+
+from assignment.cache import SummaryCache
+from assignment.models import Record, User
+from assignment.services import PurgeService, RollupService, build_submission_id
+
+# Users per shard: a shard's records are inserted and its rollups rebuilt
+# by one worker, and its user IDs must fit in one IN (...) clause.
+SHARD_SIZE = 500
+
+# Seconds a worker waits for another worker's write transaction
+WORKER_LOCK_TIMEOUT = 300
+
+
+def user_weights(rng, count):
+    """
+    Relative activity of `count` users: log-normal, so most users study a
+    little and a few account for a large share of the records.
+    """
+    return [rng.lognormvariate(0, 1) for _ in range(count)]
+
+
+def allocate(total, weights):
+    """Splits `total` into integer parts proportional to `weights`."""
+    scale = total / sum(weights)
+    shares = [weight * scale for weight in weights]
+    counts = [int(share) for share in shares]
+    by_remainder = sorted(
+        range(len(shares)), key=lambda i: shares[i] - counts[i], reverse=True
+    )
+    for i in by_remainder[: total - sum(counts)]:
+        counts[i] += 1
+    return counts
+
+
+def user_records(user_id, count, start, days, seed):
+    """
+    Yields `count` Records for one user, drawn from the user's own study
+    habits: a preferred time of day, weekdays vs. weekends, sessions of
+    several consecutive records and a few multi-day breaks. The stream only
+    depends on (seed, user_id), not on how users are split across workers.
+    """
+    rng = random.Random(f"{seed}:{user_id}")
+    weekend_factor = rng.uniform(0.2, 1.3)
+    preferred_hour = rng.gauss(19, 3) % 24
+    hour_spread = rng.uniform(1, 3.5)
+    session_mean = rng.uniform(1.5, 5)
+    median_minutes = rng.uniform(10, 35)
+    words_per_minute = rng.uniform(0.8, 3)
+
+    day_weights = [
+        weekend_factor if (start + timedelta(days=day)).weekday() >= 5 else 1.0
+        for day in range(days)
+    ]
+    for _ in range(rng.randint(0, days // 30 + 1)):
+        gap_start = rng.randrange(days)
+        for day in range(gap_start, min(days, gap_start + rng.randint(2, 14))):
+            day_weights[day] = 0.0
+    if not any(day_weights):
+        day_weights = [1.0] * days
+
+    sessions = []
+    remaining = count
+    while remaining:
+        size = min(remaining, 1 + int(rng.expovariate(1 / (session_mean - 1))))
+        sessions.append(size)
+        remaining -= size
+    session_days = rng.choices(range(days), weights=day_weights, k=len(sessions))
+
+    for size, day in zip(sessions, session_days):
+        hour = min(max(rng.gauss(preferred_hour, hour_spread), 0), 23.99)
+        moment = start + timedelta(
+            days=day, hours=hour, microseconds=rng.randrange(60_000_000)
+        )
+        for _ in range(size):
+            minutes = min(
+                max(round(rng.lognormvariate(math.log(median_minutes), 0.45)), 1),
+                180,
+            )
+            words = max(round(minutes * words_per_minute * rng.uniform(0.7, 1.3)), 1)
+            moment += timedelta(minutes=minutes)
+            yield Record(
+                user_id=user_id,
+                word_count=words,
+                study_time_minutes=minutes,
+                timestamp=moment,
+                submission_id=build_submission_id(user_id, moment, words, minutes),
+            )
+            moment += timedelta(minutes=rng.randint(0, 10))
+
+
+def generate_shard(shard, start, days, seed, chunk_size):
+    """
+    Inserts the records of one shard of (user_id, count) pairs in
+    transactions of `chunk_size` rows, then rebuilds the shard's rollups.
+    Returns (inserted, skipped): rows stored, and generated rows that were
+    already stored by an earlier run.
+    """
+    # Shards never share users, so counting the shard's own records is exact
+    # even while other workers insert
+    user_ids = [user_id for user_id, _ in shard]
+    records = Record.objects.filter(user_id__in=user_ids)
+    before = records.count()
+    generated = 0
+    chunk = []
+    for user_id, count in shard:
+        for record in user_records(user_id, count, start, days, seed):
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                insert_chunk(chunk)
+                generated += len(chunk)
+                chunk = []
+    if chunk:
+        insert_chunk(chunk)
+        generated += len(chunk)
+    inserted = records.count() - before
+
+    if RollupService.is_enabled():
+        # bulk_create skips the rollup signals; one grouped pass per shard
+        # is far cheaper than applying every chunk
+        RollupService.rebuild(user_ids=user_ids)
+    SummaryCache.bump(*user_ids)
+    return inserted, generated - inserted
+
+
+def init_worker():
+    """
+    SQLite allows one writer at a time: make a worker wait for the others'
+    transactions instead of failing with "database is locked". The workers
+    still generate and prepare their rows in parallel.
+    """
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA busy_timeout = {WORKER_LOCK_TIMEOUT * 1000}")
+
+
+def insert_chunk(chunk):
+    with transaction.atomic():
+        # Identical submissions already stored are skipped like retries
+        Record.objects.bulk_create(chunk, ignore_conflicts=True)
 
 
 class Command(BaseCommand):
-    help = "Generate records data"
+    help = (
+        "Generate synthetic records for one user or many users, with realistic "
+        "per-user study sessions, deterministic for a given --seed and --end"
+    )
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -16,11 +163,45 @@ class Command(BaseCommand):
             default=1,
             help="ID of existing user to associate with records data",
         )
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=None,
+            help=(
+                "Generate for this many synthetic users (created as "
+                "<user-prefix>-<n> when missing) instead of --user-id"
+            ),
+        )
+        parser.add_argument("--user-prefix", default="synthetic")
         parser.add_argument(
             "--num-records",
             type=int,
             default=100,
-            help="Number of records data to generate",
+            help="Number of records data to generate, in total across users",
+        )
+        parser.add_argument(
+            "--days", type=int, default=30, help="Number of days the records span"
+        )
+        parser.add_argument(
+            "--end",
+            default=None,
+            help="ISO date the records end at (default: today, 00:00 UTC)",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=5000,
+            help="Records inserted per bulk_create transaction",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help=(
+                "Processes generating user shards in parallel (use 1 with "
+                "in-memory SQLite databases)"
+            ),
         )
         parser.add_argument(
             "--clear-existing",
@@ -29,60 +210,111 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        user_id = options["user_id"]
-        num_records = options["num_records"]
-        clear_existing = options["clear_existing"]
-
-        try:
-            user = User.objects.get(id=user_id)
-            self.stdout.write(f"Found user: {user.email} (ID: {user.id})")
-        except User.DoesNotExist:
-            self.stdout.write(
-                self.style.ERROR(f"User with ID {user_id} does not exist.")
-            )
-            self.stdout.write("Available users:")
-            for u in User.objects.all():
-                self.stdout.write(f"  ID: {u.id}, Email: {u.email}")
-            return
+        if options["days"] < 1 or options["num_records"] < 0:
+            raise CommandError("--days must be positive and --num-records >= 0")
+
+        if options["users"] is not None:
+            users = self.synthetic_users(options["users"], options["user_prefix"])
+        else:
+            user_id = options["user_id"]
+            try:
+                user = User.objects.get(id=user_id)
+                self.stdout.write(f"Found user: {user.email} (ID: {user.id})")
+            except User.DoesNotExist:
+                self.stdout.write(
+                    self.style.ERROR(f"User with ID {user_id} does not exist.")
+                )
+                self.stdout.write("Available users:")
+                for u in User.objects.all():
+                    self.stdout.write(f"  ID: {u.id}, Email: {u.email}")
+                return
+            users = [user.id]
 
         # Clear existing records if requested
-        if clear_existing:
-            deleted_count, _ = Record.objects.filter(user=user).delete()
+        if options["clear_existing"]:
+            deleted_count = PurgeService.purge_records(users)
             self.stdout.write(f"Cleared {deleted_count} existing test records")
 
-        base_date = timezone.now() - timedelta(days=30)
-
-        records_created = 0
-        for i in range(num_records):
-            # Ensure unique timestamps
-            record_date = base_date + timedelta(
-                days=random.randint(0, 30),
-                hours=random.randint(0, 23),
-                minutes=random.randint(0, 59),
-                seconds=i,
-                milliseconds=random.randint(0, 999),
-            )
-
-            word_count = random.randint(10, 100)
-            study_time = random.randint(5, 60)
+        if options["end"]:
+            end = datetime.fromisoformat(options["end"])
+            if timezone.is_naive(end):
+                end = timezone.make_aware(end, timezone.get_default_timezone())
+        else:
+            end = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        days = options["days"]
+        start = end - timedelta(days=days)
 
-            # unique hash
-            hash_data = (
-                f"{user.id}_{record_date.isoformat()}_{word_count}_{study_time}_{i}"
-            )
-            submission_id = hashlib.sha256(hash_data.encode()).hexdigest()
-
-            Record.objects.create(
-                user=user,
-                word_count=word_count,
-                study_time_minutes=study_time,
-                timestamp=record_date,
-                submission_id=submission_id,
+        rng = random.Random(options["seed"])
+        counts = allocate(options["num_records"], user_weights(rng, len(users)))
+        shards = [
+            [(user_id, count) for user_id, count in pairs if count]
+            for pairs in (
+                list(zip(users, counts))[i : i + SHARD_SIZE]
+                for i in range(0, len(users), SHARD_SIZE)
             )
-            records_created += 1
+        ]
+        shards = [shard for shard in shards if shard]
+        arguments = (start, days, options["seed"], options["chunk_size"])
+
+        started = time.perf_counter()
+        if options["workers"] > 1 and len(shards) > 1:
+            results = self.generate_parallel(shards, arguments, options["workers"])
+        else:
+            results = [generate_shard(shard, *arguments) for shard in shards]
+        elapsed = time.perf_counter() - started
+        inserted = sum(shard_inserted for shard_inserted, _ in results)
+        skipped = sum(shard_skipped for _, shard_skipped in results)
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Successfully generated {records_created} test records for user: {user.email}"
+                f"Successfully generated {inserted} test records for "
+                f"{len(users)} user(s) in {elapsed:.1f}s "
+                f"({inserted / max(elapsed, 1e-9):,.0f} records/s)"
             )
         )
+        if skipped:
+            self.stdout.write(
+                f"Skipped {skipped} records already stored (same --seed and --end)"
+            )
+
+    def generate_parallel(self, shards, arguments, workers):
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        # Forked workers must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=init_worker
+        ) as pool:
+            futures = [
+                pool.submit(generate_shard, shard, *arguments) for shard in shards
+            ]
+            results = []
+            for done, future in enumerate(futures, 1):
+                results.append(future.result())
+                self.stdout.write(f"  shard {done}/{len(shards)} done")
+        return results
+
+    def synthetic_users(self, count, prefix):
+        """
+        IDs of the users <prefix>-000001 ... <prefix>-<count>, creating the
+        missing ones with unusable passwords (no hashing cost).
+        """
+        usernames = [f"{prefix}-{i:06d}" for i in range(1, count + 1)]
+        password = make_password(None)
+        for i in range(0, count, 1000):
+            User.objects.bulk_create(
+                [
+                    User(username=name, email=f"{name}@example.com", password=password)
+                    for name in usernames[i : i + 1000]
+                ],
+                ignore_conflicts=True,
+            )
+        ids = {}
+        for i in range(0, count, 1000):
+            ids.update(
+                User.objects.filter(username__in=usernames[i : i + 1000]).values_list(
+                    "username", "id"
+                )
+            )
+        self.stdout.write(f"Using {count} synthetic users ({prefix}-*)")
+        return [ids[name] for name in usernames]
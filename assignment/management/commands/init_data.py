@@ -1,7 +1,112 @@
 import json
 import os
-from django.core.management.base import BaseCommand
+import time
+
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
 from assignment.models import User
+from assignment.services import PurgeService
+
+# Fixture keys copied onto User; anything else in an entry is ignored
+USER_FIELDS = (
+    "username",
+    "email",
+    "first_name",
+    "last_name",
+    "is_staff",
+    "is_superuser",
+    "is_active",
+)
+
+# Fields ignored with --unprivileged (loads triggered over HTTP)
+PRIVILEGE_FIELDS = ("is_staff", "is_superuser")
+
+# Characters that may follow an array element
+DELIMITERS = {",", "]", " ", "\t", "\n", "\r"}
+
+
+def iter_json_array(file, buffer_size=64 * 1024):
+    """
+    Yields the elements of the top-level JSON array in `file`, reading
+    `buffer_size` characters at a time, so only the current element and one
+    buffer are ever in memory.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = file.read(buffer_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+        return not eof
+
+    def skip_whitespace():
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position].isspace():
+                position += 1
+            if position < len(buffer) or not fill():
+                return
+
+    def expect(characters):
+        skip_whitespace()
+        if position >= len(buffer) or buffer[position] not in characters:
+            found = buffer[position : position + 20] or "end of file"
+            raise ValueError(f"Expected {' or '.join(characters)}, found {found!r}")
+        return buffer[position]
+
+    expect("[")
+    position += 1
+    skip_whitespace()
+    if buffer[position : position + 1] == "]":
+        return
+    while True:
+        skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if fill():
+                    continue
+                raise
+            # A number cut off by the buffer ("1" of "1.5") decodes too;
+            # only a delimiter after the value proves it is complete
+            if buffer[end : end + 1] in DELIMITERS or eof or not fill():
+                break
+        position = end
+        yield value
+        if expect(",]") == "]":
+            return
+        position += 1
+
+
+def user_from_entry(entry, password_hash=None, fields=USER_FIELDS):
+    """
+    An unsaved User for one fixture entry. A `password` in the entry is
+    used as-is when it is already hashed and hashed otherwise (the slow
+    path); `password_hash` replaces it when given.
+    """
+    if not isinstance(entry, dict):
+        raise TypeError(f"Expected a JSON object per user, found {entry!r}")
+    user = User(**{field: entry[field] for field in fields if field in entry})
+    password = entry.get("password")
+    if password_hash is not None:
+        user.password = password_hash
+    elif password is None:
+        user.set_unusable_password()
+    else:
+        try:
+            identify_hasher(password)
+            user.password = password
+        except ValueError:
+            user.password = make_password(password)
+    return user
 
 
 class Command(BaseCommand):
@@ -9,32 +114,142 @@ class Command(BaseCommand):
         parser.add_argument(
             "--file", default="MOCK_DATA.json", help="JSON file name to load data from"
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Users inserted per bulk_create",
+        )
+        passwords = parser.add_mutually_exclusive_group()
+        passwords.add_argument(
+            "--password-hash",
+            default=None,
+            help=(
+                "Encoded password hash (see make_password) given to every "
+                "loaded user instead of the fixture passwords"
+            ),
+        )
+        passwords.add_argument(
+            "--password",
+            default=None,
+            help="Password hashed once and given to every loaded user",
+        )
+        parser.add_argument(
+            "--unprivileged",
+            action="store_true",
+            help="Ignore is_staff and is_superuser in the fixture",
+        )
 
     def handle(self, *args, **options):
-        User.objects.all().delete()
-
-        self.stdout.write(self.style.SUCCESS("All existing item data has been deleted"))
-
         try:
             file_name = options.get("file", "MOCK_DATA.json")
             json_file_path = os.path.join(os.path.dirname(__file__), file_name)
+            fields = USER_FIELDS
+            if options.get("unprivileged"):
+                fields = tuple(f for f in USER_FIELDS if f not in PRIVILEGE_FIELDS)
 
+            password_hash = options.get("password_hash")
+            if password_hash is not None:
+                # Fail before deleting anything if the hash is not usable
+                identify_hasher(password_hash)
+            elif options.get("password") is not None:
+                password_hash = make_password(options["password"])
+
+            started = time.perf_counter()
+            # The whole fixture is checked before anything is deleted. The
+            # purge and the load then commit batch by batch, so other writers
+            # are never locked out for the whole reseed.
             with open(json_file_path) as json_file:
-                _ = json.load(json_file)
-                # Handle the data as needed, e.g., creating User objects
+                count = self.check_fixture(iter_json_array(json_file), fields)
+            self.stdout.write(f"Fixture checked: {count} users")
 
-            User.objects.create_superuser(
-                "testuser", email="testuser@example.com", password="testpassword"
+            PurgeService.purge_users(
+                progress=lambda deleted: self.stdout.write(
+                    f"  {deleted} records deleted"
+                )
             )
-            for i in range(1, 6):
-                User.objects.create_user(
-                    f"testuser{i}",
-                    email=f"testuser{i}@example.com",
-                    password="testpassword",
+            self.stdout.write(
+                self.style.SUCCESS("All existing item data has been deleted")
+            )
+
+            with open(json_file_path) as json_file:
+                loaded = self.load_users(
+                    iter_json_array(json_file),
+                    password_hash,
+                    options.get("chunk_size", 1000),
+                    fields,
                 )
+            self.create_test_users()
 
             self.stdout.write(
-                self.style.SUCCESS(f"Mock data loaded successfully from {file_name}")
+                self.style.SUCCESS(
+                    f"Mock data loaded successfully from {file_name}: {loaded} "
+                    f"users in {time.perf_counter() - started:.1f}s"
+                )
             )
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Error loading data: {e}"))
+            # Fails the command (and a background job running it)
+            raise CommandError(f"Error loading data: {e}") from e
+
+    def check_fixture(self, entries, fields):
+        """
+        Validates every entry as load_users() would store it, without
+        hashing passwords, and rejects repeated usernames. Keeps only the
+        usernames in memory. Returns the number of entries.
+        """
+        usernames = set()
+        for index, entry in enumerate(entries):
+            # Any hash skips hashing the fixture password; it is not stored
+            user = user_from_entry(entry, "", fields)
+            try:
+                user.clean_fields(exclude=["password"])
+            except ValidationError as e:
+                raise ValueError(f"User {index}: {e}") from e
+            if user.username in usernames:
+                raise ValueError(f"User {index}: duplicate username {user.username!r}")
+            usernames.add(user.username)
+        return len(usernames)
+
+    def load_users(self, entries, password_hash, chunk_size, fields=USER_FIELDS):
+        loaded = 0
+        chunk = []
+        for entry in entries:
+            chunk.append(user_from_entry(entry, password_hash, fields))
+            if len(chunk) >= chunk_size:
+                User.objects.bulk_create(chunk)
+                loaded += len(chunk)
+                chunk = []
+                self.stdout.write(f"  {loaded} users loaded")
+        if chunk:
+            User.objects.bulk_create(chunk)
+            loaded += len(chunk)
+        return loaded
+
+    def create_test_users(self):
+        # The fixed accounts used by the mock login and the docs; hashed once
+        password = make_password("testpassword")
+        users = [
+            User(
+                username="testuser",
+                email="testuser@example.com",
+                password=password,
+                is_staff=True,
+                is_superuser=True,
+            ),
+            *(
+                User(
+                    username=f"testuser{i}",
+                    email=f"testuser{i}@example.com",
+                    password=password,
+                )
+                for i in range(1, 6)
+            ),
+        ]
+        existing = set(
+            User.objects.filter(
+                username__in=[user.username for user in users]
+            ).values_list("username", flat=True)
+        )
+        User.objects.bulk_create(
+            [user for user in users if user.username not in existing]
+        )
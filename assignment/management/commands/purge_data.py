@@ -0,0 +1,97 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from assignment.services import PurgeService
+
+
+def parse_datetime(value):
+    moment = datetime.fromisoformat(value)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, timezone.get_default_timezone())
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete records (and optionally users) in batches, keeping rollups and "
+        "summary caches consistent"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user-id",
+            type=int,
+            action="append",
+            dest="user_ids",
+            help="Only purge this user (repeatable)",
+        )
+        parser.add_argument(
+            "--all", action="store_true", help="Purge every user's records"
+        )
+        parser.add_argument(
+            "--from",
+            dest="from_date",
+            type=parse_datetime,
+            default=None,
+            help="Only records at or after this ISO time",
+        )
+        parser.add_argument(
+            "--to",
+            dest="to_date",
+            type=parse_datetime,
+            default=None,
+            help="Only records before this ISO time",
+        )
+        parser.add_argument(
+            "--delete-users",
+            action="store_true",
+            help="Delete the users too (not with --from/--to)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Records deleted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options["user_ids"]
+        if not user_ids and not options["all"]:
+            raise CommandError("Pass --user-id or --all")
+        if user_ids and options["all"]:
+            raise CommandError("--user-id and --all are mutually exclusive")
+        if options["delete_users"] and (options["from_date"] or options["to_date"]):
+            raise CommandError("--delete-users cannot be combined with --from/--to")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        started = time.perf_counter()
+
+        def progress(deleted):
+            self.stdout.write(
+                f"  {deleted} records deleted ({time.perf_counter() - started:.1f}s)"
+            )
+
+        if options["delete_users"]:
+            records, users = PurgeService.purge_users(
+                user_ids, batch_size=options["batch_size"], progress=progress
+            )
+        else:
+            records = PurgeService.purge_records(
+                user_ids,
+                from_date=options["from_date"],
+                to_date=options["to_date"],
+                batch_size=options["batch_size"],
+                progress=progress,
+            )
+            users = 0
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {records} records and {users} users in "
+                f"{time.perf_counter() - started:.1f}s"
+            )
+        )
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from assignment.models import User
+from assignment.services import RollupService
+
+
+class Command(BaseCommand):
+    help = "Rebuild hour/day/month record rollups from raw records"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user-id",
+            type=int,
+            default=None,
+            help="Only rebuild rollups for this user (default: all users)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rollup rows written per insert",
+        )
+
+    def handle(self, *args, **options):
+        user_id = options["user_id"]
+
+        if user_id is not None and not User.objects.filter(id=user_id).exists():
+            self.stdout.write(
+                self.style.ERROR(f"User with ID {user_id} does not exist.")
+            )
+            return
+
+        written = RollupService.rebuild(
+            user_id=user_id, batch_size=options["batch_size"]
+        )
+
+        target = f"user {user_id}" if user_id is not None else "all users"
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {written} rollup rows for {target}")
+        )
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+from assignment.slow_queries import SlowQueryLog, log_file
+
+
+def is_full_scan(plan):
+    """
+    True when a SQLite plan reads a whole table or index: SCAN steps, as
+    opposed to SEARCH steps that seek a key range. A scan of a covering
+    index is still proportional to the size of the table.
+    """
+    return any(line.startswith("SCAN ") for line in plan or ())
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarize the slow-query log: the slowest statements by total time, "
+        "with their views and latest query plan"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--top", type=int, default=10, help="Number of statements to show"
+        )
+        parser.add_argument(
+            "--since",
+            default=None,
+            help="Only entries logged at or after this ISO time (UTC)",
+        )
+        parser.add_argument(
+            "--full-scans",
+            action="store_true",
+            help="Only statements whose plan scans a whole table or index",
+        )
+
+    def handle(self, *args, **options):
+        groups = defaultdict(list)
+        for entry in SlowQueryLog.read():
+            if options["since"] and entry.get("time", "") < options["since"]:
+                continue
+            groups[entry["sql"]].append(entry)
+
+        if not groups:
+            self.stdout.write(f"No slow queries logged in {log_file()}")
+            return
+
+        summaries = []
+        for sql, entries in groups.items():
+            durations = [entry["duration_ms"] for entry in entries]
+            plan = next(
+                (entry["plan"] for entry in reversed(entries) if entry.get("plan")),
+                None,
+            )
+            if options["full_scans"] and not is_full_scan(plan):
+                continue
+            summaries.append((sum(durations), sql, entries, durations, plan))
+        summaries.sort(key=lambda summary: summary[0], reverse=True)
+
+        for total, sql, entries, durations, plan in summaries[: options["top"]]:
+            views = sorted({entry.get("view") or "-" for entry in entries})
+            header = (
+                f"{len(entries)}x  total {total:.1f}ms  "
+                f"avg {total / len(entries):.1f}ms  max {max(durations):.1f}ms"
+            )
+            if is_full_scan(plan):
+                header += "  FULL SCAN"
+            self.stdout.write(self.style.WARNING(header))
+            self.stdout.write(f"  views: {', '.join(views)}")
+            self.stdout.write(f"  sql:   {sql}")
+            self.stdout.write(f"  last params: {entries[-1].get('params')}")
+            for line in plan or ["(no plan)"]:
+                self.stdout.write(f"  plan:  {line}")
+            self.stdout.write("")
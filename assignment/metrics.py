@@ -0,0 +1,276 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Metrics are declared once at import time and updated with a short critical
+section per call (one lock per metric, held for a dict update). With
+METRICS_DIR set, each process periodically writes a snapshot of its values
+to its own file in that directory and the metrics endpoint sums the
+snapshots of all processes, so a multi-worker server reports totals for the
+whole deployment. Files of exited workers are kept, so counters never go
+backwards; clear the directory when the server restarts.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from django.conf import settings
+
+# Latency buckets in seconds, from 1ms to 10s
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def is_enabled():
+    return getattr(settings, "METRICS_ENABLED", True)
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def snapshot(self):
+        """Returns [(label values, value), ...] for the current process."""
+        with self._lock:
+            return [(key, self._copy(value)) for key, value in self._values.items()]
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def _copy(value):
+        return value
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    @staticmethod
+    def merge(value, other):
+        return value + other
+
+    def samples(self, key, value):
+        yield self.name, key, value
+
+
+class Histogram(Metric):
+    """
+    Values are [bucket counts..., sum]; the bucket counts are per bucket
+    (not cumulative) and include a final +Inf bucket.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                values = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            values[index] += 1
+            values[-1] += value
+
+    @staticmethod
+    def _copy(value):
+        return list(value)
+
+    @staticmethod
+    def merge(value, other):
+        return [a + b for a, b in zip(value, other)]
+
+    def samples(self, key, value):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), value[:-1]):
+            cumulative += count
+            yield f"{self.name}_bucket", (*key, format_bound(bound)), cumulative
+        yield f"{self.name}_sum", key, value[-1]
+        yield f"{self.name}_count", key, cumulative
+
+
+def format_bound(bound):
+    return bound if isinstance(bound, str) else repr(float(bound))
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._next_flush = 0.0
+        self._file = None
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def reset(self):
+        for metric in self.metrics.values():
+            metric.reset()
+        self._next_flush = 0.0
+
+    def _after_fork(self):
+        # A forked worker starts from zero with its own file; the parent's
+        # values are already reported by the parent.
+        self.reset()
+        self._file = None
+
+    @staticmethod
+    def directory():
+        directory = getattr(settings, "METRICS_DIR", None)
+        return Path(directory) if directory else None
+
+    def snapshot(self):
+        return {
+            name: [[list(key), value] for key, value in metric.snapshot()]
+            for name, metric in self.metrics.items()
+        }
+
+    def maybe_flush(self):
+        """Writes this process's snapshot if the flush interval has passed."""
+        if time.monotonic() >= self._next_flush:
+            self.flush()
+
+    def flush(self):
+        directory = self.directory()
+        if directory is None:
+            return
+        self._next_flush = time.monotonic() + getattr(
+            settings, "METRICS_FLUSH_INTERVAL", 5
+        )
+        if self._file is None:
+            self._file = directory / f"metrics-{os.getpid()}-{time.time_ns()}.json"
+        directory.mkdir(parents=True, exist_ok=True)
+        # Readers must never see a partially written file
+        handle, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(handle, "w") as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temporary, self._file)
+
+    def collect(self):
+        """
+        Returns {metric name: {label values: value}} summed over all
+        processes that wrote to METRICS_DIR, or for this process alone.
+        """
+        snapshots = [self.snapshot()]
+        directory = self.directory()
+        if directory is not None and directory.is_dir():
+            for path in directory.glob("metrics-*.json"):
+                if path == self._file:
+                    continue
+                try:
+                    snapshots.append(json.loads(path.read_text()))
+                except (OSError, ValueError):
+                    continue
+
+        totals = {name: {} for name in self.metrics}
+        for snapshot in snapshots:
+            for name, samples in snapshot.items():
+                metric = self.metrics.get(name)
+                if metric is None:
+                    continue
+                values = totals[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    if key in values:
+                        values[key] = metric.merge(values[key], value)
+                    else:
+                        values[key] = value
+        return totals
+
+    def exposition(self):
+        """The collected metrics in the Prometheus text format."""
+        lines = []
+        for name, values in self.collect().items():
+            metric = self.metrics[name]
+            lines.append(f"# HELP {name} {metric.help}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, value in sorted(values.items()):
+                label_names = metric.labels
+                for sample, sample_key, sample_value in metric.samples(key, value):
+                    names = (
+                        (*label_names, "le")
+                        if len(sample_key) > len(label_names)
+                        else label_names
+                    )
+                    labels = ",".join(
+                        f'{label}="{escape_label(label_value)}"'
+                        for label, label_value in zip(names, sample_key)
+                    )
+                    lines.append(
+                        f"{sample}{{{labels}}} {sample_value}"
+                        if labels
+                        else f"{sample} {sample_value}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+os.register_at_fork(after_in_child=registry._after_fork)
+
+http_requests = registry.counter(
+    "http_requests_total",
+    "HTTP requests by route, method and status code.",
+    ("route", "method", "status"),
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route, method and summary granularity.",
+    ("route", "method", "granularity"),
+)
+summary_rows_scanned = registry.histogram(
+    "summary_rows_scanned",
+    "Rows aggregated per summary: records when grouping raw records, "
+    "rollup rows when served from rollups.",
+    ("granularity", "source"),
+    buckets=(0, 10, 100, 1_000, 10_000, 100_000, 1_000_000),
+)
+records_ingested = registry.counter(
+    "records_ingested_total",
+    "Submitted records by result: created or duplicate.",
+    ("endpoint", "result"),
+)
@@ -1,15 +1,85 @@
+import copy
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
 from django.contrib.auth import login
+from django.db import connections
 from django.http import HttpResponse
 
+from assignment import metrics, slow_queries
 from assignment.models import User
+from assignment.profiling import ProfileBudget, RequestProfile
+from assignment.slow_queries import SlowQueryWrapper
+from assignment.timing import ServerTiming
 
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class UserCache:
+    """
+    Bounded LRU cache of users by username for the mock login. Entries are
+    dropped by the User post_save/post_delete signals; like any per-process
+    cache, changes made by other processes are only seen once evicted.
+    """
+
+    _users = OrderedDict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def size():
+        return getattr(settings, "MOCK_LOGIN_CACHE_SIZE", 1024)
+
+    @staticmethod
+    def get(username):
+        """
+        Returns a copy of the cached user, loading it on a miss. Raises
+        User.DoesNotExist for unknown usernames, which are not cached.
+        """
+        with UserCache._lock:
+            user = UserCache._users.get(username)
+            if user is not None:
+                UserCache._users.move_to_end(username)
+                return copy.copy(user)
+
+        user = User.objects.get(username=username)
+        with UserCache._lock:
+            UserCache._users[username] = user
+            while len(UserCache._users) > UserCache.size():
+                UserCache._users.popitem(last=False)
+        return copy.copy(user)
+
+    @staticmethod
+    def invalidate(user):
+        """
+        Drops every entry for `user`, including one cached under a username
+        it no longer has.
+        """
+        with UserCache._lock:
+            for username, cached in list(UserCache._users.items()):
+                if cached.pk == user.pk or username == user.username:
+                    del UserCache._users[username]
+
+    @staticmethod
+    def clear():
+        with UserCache._lock:
+            UserCache._users.clear()
+
+
 # Skip Login step for this assignment
 class MockLoginUserMiddleware:
+    """
+    Authenticates /api requests from the X-User-NAME header. In the default
+    stateless mode the user comes from UserCache and is only set on the
+    request, so no session is read or written; MOCK_LOGIN_STATELESS = False
+    restores the session login().
+    """
+
     def __init__(self, get_response):
         self.get_response = get_response
 
@@ -19,11 +89,365 @@ class MockLoginUserMiddleware:
             if username:
                 logger.info(f"Mock login for user: {username}")
                 try:
-                    user = User.objects.get(username=username)
-                    login(request, user)
+                    if getattr(settings, "MOCK_LOGIN_STATELESS", True):
+                        request.user = UserCache.get(username)
+                    else:
+                        user = User.objects.get(username=username)
+                        login(request, user)
                 except User.DoesNotExist:
                     return HttpResponse(
                         "User not found or invalid credentials.", status=401
                     )
         response = self.get_response(request)
         return response
+
+
+class QueryStats:
+    """
+    Database execute wrapper that counts the queries run through it and the
+    time spent in them. One instance is installed on every connection for
+    the duration of a request.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+    @property
+    def duration_ms(self):
+        return round(self.duration * 1000, 2)
+
+    def install(self):
+        add_execute_wrapper(self)
+
+    def uninstall(self):
+        remove_execute_wrapper(self)
+
+
+def add_execute_wrapper(wrapper):
+    for connection in connections.all():
+        connection.execute_wrappers.append(wrapper)
+
+
+def remove_execute_wrapper(wrapper):
+    for connection in connections.all():
+        if wrapper in connection.execute_wrappers:
+            connection.execute_wrappers.remove(wrapper)
+
+
+def describe_view(request):
+    """Dotted path of the view that handled `request`, once it is resolved."""
+    match = request.resolver_match
+    if match is None:
+        return None
+    view = getattr(match.func, "view_class", match.func)
+    return f"{view.__module__}.{view.__qualname__}"
+
+
+class QueryCountMiddleware:
+    """
+    Reports the number of database queries and the time spent in them for
+    each request, as X-DB-Query-Count / X-DB-Time-Ms response headers and a
+    log line with `db_queries` and `db_time_ms` fields. Streamed responses
+    query while they are consumed, so they only get the log line, written
+    once the stream is exhausted. Disabled by QUERY_STATS_ENABLED = False.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "QUERY_STATS_ENABLED", True):
+            return self.get_response(request)
+
+        stats = QueryStats()
+        stats.install()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            stats.uninstall()
+            raise
+
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                response.streaming_content, request, response, stats
+            )
+            return response
+
+        stats.uninstall()
+        response["X-DB-Query-Count"] = str(stats.count)
+        response["X-DB-Time-Ms"] = f"{stats.duration_ms:.2f}"
+        self.log(request, response, stats)
+        return response
+
+    def measure_stream(self, content, request, response, stats):
+        # The finally clause also runs when the server closes a partially
+        # consumed response.
+        try:
+            yield from content
+        finally:
+            stats.uninstall()
+            self.log(request, response, stats)
+
+    @staticmethod
+    def log(request, response, stats):
+        logger.info(
+            f"{request.method} {request.path} {response.status_code}: "
+            f"{stats.count} queries in {stats.duration_ms:.2f}ms",
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "status_code": response.status_code,
+                "db_queries": stats.count,
+                "db_time_ms": stats.duration_ms,
+            },
+        )
+
+
+class ServerTimingMiddleware:
+    """
+    Gives each request a ServerTiming that views and services record phases
+    on (see assignment.timing) and reports them, plus the total, as a
+    Server-Timing header and a log line with one `<phase>_ms` field per
+    phase. For streamed responses the header only covers the work done
+    before the stream started; the log line, written once it ends, covers
+    everything. Disabled by SERVER_TIMING_ENABLED = False.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "SERVER_TIMING_ENABLED", True):
+            return self.get_response(request)
+
+        timer = ServerTiming()
+        started = time.perf_counter()
+        with timer.activate():
+            response = self.get_response(request)
+
+        if response.streaming:
+            if timer.milliseconds():
+                response["Server-Timing"] = timer.header()
+            response.streaming_content = self.measure_stream(
+                response.streaming_content, request, response, timer, started
+            )
+            return response
+
+        if timer.milliseconds():
+            timer.durations["total"] = time.perf_counter() - started
+            response["Server-Timing"] = timer.header()
+            self.log(request, response, timer)
+        return response
+
+    def measure_stream(self, content, request, response, timer, started):
+        # Each chunk is produced with the timer active again, since the
+        # generators behind it run after the view has returned.
+        iterator = iter(content)
+        try:
+            while True:
+                token = timer.enter()
+                try:
+                    chunk = next(iterator, None)
+                finally:
+                    timer.exit(token)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            if timer.milliseconds():
+                timer.durations["total"] = time.perf_counter() - started
+                self.log(request, response, timer)
+
+    @staticmethod
+    def log(request, response, timer):
+        durations = timer.milliseconds()
+        logger.info(
+            f"{request.method} {request.path} {response.status_code}: "
+            + ", ".join(f"{name} {ms:.2f}ms" for name, ms in durations.items()),
+            extra={
+                "method": request.method,
+                "path": request.path,
+                "status_code": response.status_code,
+                **{f"{name}_ms": ms for name, ms in durations.items()},
+            },
+        )
+
+
+class MetricsMiddleware:
+    """
+    Counts requests by route, method and status code and observes their
+    latency (labelled with the granularity for summary routes) in the
+    assignment.metrics registry. Routes are URL pattern names, so the label
+    values stay bounded. Streamed responses are observed when the stream
+    ends. Disabled by METRICS_ENABLED = False.
+    """
+
+    SUMMARY_ROUTES = ("summary", "summary_batch")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not metrics.is_enabled():
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                response.streaming_content, request, response, started
+            )
+        else:
+            self.observe(request, response, started)
+        return response
+
+    def measure_stream(self, content, request, response, started):
+        try:
+            yield from content
+        finally:
+            self.observe(request, response, started)
+
+    def observe(self, request, response, started):
+        match = request.resolver_match
+        route = match.url_name if match is not None and match.url_name else "unmatched"
+        granularity = ""
+        if route in self.SUMMARY_ROUTES:
+            granularity = request.GET.get("granularity", "day")
+            if granularity not in ("hour", "day", "month"):
+                granularity = "invalid"
+
+        metrics.http_requests.inc(
+            route=route, method=request.method, status=response.status_code
+        )
+        metrics.http_request_duration.observe(
+            time.perf_counter() - started,
+            route=route,
+            method=request.method,
+            granularity=granularity,
+        )
+        metrics.registry.maybe_flush()
+
+
+class ProfilingMiddleware:
+    """
+    Captures a cProfile profile and the top tracemalloc allocation sites of
+    a request (see assignment.profiling) when PROFILING_ENABLED is set and
+    either an allowed user sends the PROFILING_HEADER header or the request
+    is sampled at PROFILING_SAMPLE_RATE. PROFILING_MAX_PER_MINUTE caps the
+    captures of both kinds. Files are named by route and X-Request-ID (or a
+    random ID), and the name is returned in the X-Profile header. Must come
+    after the middleware that sets request.user.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "PROFILING_ENABLED", False):
+            return self.get_response(request)
+        if not self.requested(request) or not ProfileBudget.admit():
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        if not profile.start():
+            ProfileBudget.refund()
+            return self.get_response(request)
+
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            profile.stop(self.file_name(request, request_id))
+            raise
+
+        name = self.file_name(request, request_id)
+        response["X-Profile"] = name
+        if response.streaming:
+            response.streaming_content = self.profile_stream(
+                response.streaming_content, profile, name
+            )
+        else:
+            profile.stop(name)
+        return response
+
+    @staticmethod
+    def requested(request):
+        header = getattr(settings, "PROFILING_HEADER", "X-Profile")
+        if request.headers.get(header):
+            allowed = getattr(settings, "PROFILING_ALLOWED_USERS", [])
+            user = getattr(request, "user", None)
+            # MockLoginUserMiddleware only authenticates /api paths; elsewhere
+            # the mock login header names the user
+            username = getattr(user, "username", None) or request.headers.get(
+                "X-User-NAME"
+            )
+            return username in allowed
+        return random.random() < getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+
+    @staticmethod
+    def file_name(request, request_id):
+        match = request.resolver_match
+        route = match.url_name if match is not None and match.url_name else "unmatched"
+        return RequestProfile.file_name(route, request_id)
+
+    @staticmethod
+    def profile_stream(content, profile, name):
+        try:
+            yield from content
+        finally:
+            profile.stop(name)
+
+
+class SlowQueryMiddleware:
+    """
+    Logs the request's queries slower than SLOW_QUERY_THRESHOLD_MS, with
+    their parameters, the view and the query plan, to the slow-query log
+    (see assignment.slow_queries). Streamed responses are watched until the
+    stream ends. SLOW_QUERY_THRESHOLD_MS = None disables it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        limit = slow_queries.threshold()
+        if limit is None:
+            return self.get_response(request)
+
+        wrapper = SlowQueryWrapper(
+            limit,
+            caller=lambda: {
+                "view": describe_view(request),
+                "request": f"{request.method} {request.get_full_path()}",
+            },
+        )
+        add_execute_wrapper(wrapper)
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            remove_execute_wrapper(wrapper)
+            raise
+
+        if response.streaming:
+            response.streaming_content = self.watch_stream(
+                response.streaming_content, wrapper
+            )
+        else:
+            remove_execute_wrapper(wrapper)
+        return response
+
+    @staticmethod
+    def watch_stream(content, wrapper):
+        try:
+            yield from content
+        finally:
+            remove_execute_wrapper(wrapper)
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-17 01:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assignment", "0002_record"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RecordRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("hour", "Hour"), ("day", "Day"), ("month", "Month")],
+                        max_length=5,
+                    ),
+                ),
+                ("period", models.DateTimeField()),
+                ("total_word_count", models.BigIntegerField(default=0)),
+                ("total_study_time_minutes", models.BigIntegerField(default=0)),
+                ("record_count", models.IntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rollups",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["period"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "granularity", "period"),
+                        name="unique_rollup_per_user_period",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:28
+
+from calendar import timegm
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# Frozen copy of assignment.models.bucket_keys as of this migration
+def bucket_keys(timestamp):
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    local = timezone.localtime(timestamp, timezone.get_default_timezone())
+    seconds = timegm(local.timetuple())
+    return {
+        "bucket_hour": seconds // 3600,
+        "bucket_day": seconds // 86400,
+        "bucket_month": local.year * 12 + local.month,
+    }
+
+
+def backfill_bucket_keys(apps, schema_editor):
+    Record = apps.get_model("assignment", "Record")
+    fields = ["bucket_hour", "bucket_day", "bucket_month"]
+    batch = []
+    for record in Record.objects.only("id", "timestamp").iterator(chunk_size=2000):
+        for field, key in bucket_keys(record.timestamp).items():
+            setattr(record, field, key)
+        batch.append(record)
+        if len(batch) >= 2000:
+            Record.objects.bulk_update(batch, fields)
+            batch = []
+    if batch:
+        Record.objects.bulk_update(batch, fields)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assignment", "0003_recordrollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="record",
+            name="bucket_day",
+            field=models.IntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="record",
+            name="bucket_hour",
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="record",
+            name="bucket_month",
+            field=models.IntegerField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_bucket_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="record",
+            index=models.Index(
+                fields=["user", "bucket_hour"], name="assignment__user_id_6f69c2_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="record",
+            index=models.Index(
+                fields=["user", "bucket_day"], name="assignment__user_id_60ffdd_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="record",
+            index=models.Index(
+                fields=["user", "bucket_month"], name="assignment__user_id_e0bc00_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assignment", "0004_record_bucket_keys"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="record",
+            name="assignment__user_id_9c8648_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="record",
+            name="assignment__user_id_6f69c2_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="record",
+            name="assignment__user_id_60ffdd_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="record",
+            name="assignment__user_id_e0bc00_idx",
+        ),
+        migrations.AddIndex(
+            model_name="record",
+            index=models.Index(
+                fields=["user", "timestamp", "word_count", "study_time_minutes"],
+                name="assignment__user_id_c53357_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="record",
+            index=models.Index(
+                fields=[
+                    "user",
+                    "bucket_hour",
+                    "timestamp",
+                    "word_count",
+                    "study_time_minutes",
+                ],
+                name="assignment__user_id_4dedd7_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="record",
+            index=models.Index(
+                fields=[
+                    "user",
+                    "bucket_day",
+                    "timestamp",
+                    "word_count",
+                    "study_time_minutes",
+                ],
+                name="assignment__user_id_d0f46f_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="record",
+            index=models.Index(
+                fields=[
+                    "user",
+                    "bucket_month",
+                    "timestamp",
+                    "word_count",
+                    "study_time_minutes",
+                ],
+                name="assignment__user_id_5f7585_idx",
+            ),
+        ),
+    ]
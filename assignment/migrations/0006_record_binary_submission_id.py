@@ -0,0 +1,92 @@
+import hashlib
+
+from django.db import migrations, models
+
+import assignment.models
+
+
+# Frozen copy of assignment.models.submission_digest as of this migration,
+# extended to read back the 32-character hex IDs written by the reverse step
+def submission_digest(value):
+    if value is None or isinstance(value, bytes):
+        return value
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    if len(value) in (32, 64):
+        try:
+            return bytes.fromhex(value)[:16]
+        except ValueError:
+            pass
+    return hashlib.sha256(value.encode()).digest()[:16]
+
+
+def convert_submission_ids(apps, schema_editor):
+    Record = apps.get_model("assignment", "Record")
+    batch = []
+    records = Record.objects.only("id", "submission_id").iterator(chunk_size=2000)
+    for record in records:
+        record.submission_digest = submission_digest(record.submission_id)
+        batch.append(record)
+        if len(batch) >= 2000:
+            Record.objects.bulk_update(batch, ["submission_digest"])
+            batch = []
+    if batch:
+        Record.objects.bulk_update(batch, ["submission_digest"])
+
+
+def restore_submission_ids(apps, schema_editor):
+    """
+    Writes the digests back as hex. The rest of the SHA-256 was dropped, so
+    the restored IDs are 32 characters instead of 64.
+    """
+    Record = apps.get_model("assignment", "Record")
+    batch = []
+    records = Record.objects.only("id", "submission_digest").iterator(chunk_size=2000)
+    for record in records:
+        record.submission_id = bytes(record.submission_digest).hex()
+        batch.append(record)
+        if len(batch) >= 2000:
+            Record.objects.bulk_update(batch, ["submission_id"])
+            batch = []
+    if batch:
+        Record.objects.bulk_update(batch, ["submission_id"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("assignment", "0005_record_covering_indexes"),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name="record",
+            name="unique_submission_per_user",
+        ),
+        # Nullable and not unique while both columns exist, so that migrating
+        # backwards can re-add it empty before restore_submission_ids fills it
+        migrations.AlterField(
+            model_name="record",
+            name="submission_id",
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name="record",
+            name="submission_digest",
+            field=assignment.models.SubmissionIdField(max_length=16, null=True),
+        ),
+        migrations.RunPython(convert_submission_ids, restore_submission_ids),
+        migrations.RemoveField(
+            model_name="record",
+            name="submission_id",
+        ),
+        migrations.RenameField(
+            model_name="record",
+            old_name="submission_digest",
+            new_name="submission_id",
+        ),
+        migrations.AlterField(
+            model_name="record",
+            name="submission_id",
+            field=assignment.models.SubmissionIdField(max_length=16, unique=True),
+        ),
+    ]
@@ -1,6 +1,11 @@
+import hashlib
+import uuid
+from calendar import timegm
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 
 class User(AbstractUser):
@@ -16,25 +21,205 @@ class User(AbstractUser):
 ## TODO: Modify the following
 
 
+BUCKET_KEY_FIELDS = {
+    "hour": "bucket_hour",
+    "day": "bucket_day",
+    "month": "bucket_month",
+}
+
+
+def bucket_keys(timestamp):
+    """
+    Integer hour/day/month keys of `timestamp` in the default timezone (the
+    timezone rollups use): hours and days since the epoch of the local wall
+    time, and year * 12 + month.
+    """
+    if timezone.is_naive(timestamp):
+        timestamp = timezone.make_aware(timestamp)
+    local = timezone.localtime(timestamp, timezone.get_default_timezone())
+    seconds = timegm(local.timetuple())
+    return {
+        "bucket_hour": seconds // 3600,
+        "bucket_day": seconds // 86400,
+        "bucket_month": local.year * 12 + local.month,
+    }
+
+
+def submission_digest(value):
+    """
+    The 16-byte idempotency key stored for a submission ID: the first half of
+    a hex SHA-256 digest (as built by build_submission_id), or the truncated
+    SHA-256 of any other string. Bytes are returned unchanged.
+    """
+    if value is None or isinstance(value, bytes):
+        return value
+    if isinstance(value, (bytearray, memoryview)):
+        return bytes(value)
+    if len(value) == 64:
+        try:
+            return bytes.fromhex(value)[:16]
+        except ValueError:
+            pass
+    return hashlib.sha256(value.encode()).digest()[:16]
+
+
+class SubmissionIdField(models.BinaryField):
+    """
+    Stores submission IDs as 16-byte digests (128 bits) instead of 64 hex
+    characters. Strings are converted on save and in lookups, so
+    `filter(submission_id=hex_digest)` keeps working.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_length", 16)
+        super().__init__(*args, **kwargs)
+
+    def to_python(self, value):
+        return submission_digest(value)
+
+    def from_db_value(self, value, expression, connection):
+        return submission_digest(value)
+
+    def get_prep_value(self, value):
+        return super().get_prep_value(submission_digest(value))
+
+
+class RecordQuerySet(models.QuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        # bulk_create() bypasses save(), so fill the bucket keys here
+        objs = list(objs)
+        for obj in objs:
+            obj.set_bucket_keys()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
 class Record(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="record")
     word_count = models.IntegerField(validators=[MinValueValidator(0)])
     study_time_minutes = models.IntegerField(validators=[MinValueValidator(0)])
     timestamp = models.DateTimeField()
     created_at = models.DateTimeField(auto_now_add=True)
-    submission_id = models.CharField(max_length=64, unique=True, db_index=True)
+    # A single unique index; it also makes the key unique per user
+    submission_id = SubmissionIdField(unique=True)
+    # Period keys of `timestamp`, see bucket_keys(). Filled on save and
+    # bulk_create; a raw timestamp UPDATE must refresh them too.
+    bucket_hour = models.BigIntegerField(null=True, editable=False)
+    bucket_day = models.IntegerField(null=True, editable=False)
+    bucket_month = models.IntegerField(null=True, editable=False)
+
+    objects = RecordQuerySet.as_manager()
 
     class Meta:
+        # The per-user indexes carry every column a summary reads, so a
+        # user's records sit contiguously in index order and aggregation is
+        # an index-only scan instead of a rowid lookup per record.
         indexes = [
-            models.Index(fields=["user", "timestamp"]),
+            models.Index(
+                fields=["user", "timestamp", "word_count", "study_time_minutes"]
+            ),
             models.Index(fields=["timestamp"]),
+            *(
+                models.Index(
+                    fields=[
+                        "user",
+                        bucket_field,
+                        "timestamp",
+                        "word_count",
+                        "study_time_minutes",
+                    ]
+                )
+                for bucket_field in BUCKET_KEY_FIELDS.values()
+            ),
         ]
+        ordering = ["timestamp"]
+
+    def __str__(self):
+        return f"{self.user.id} - {self.timestamp}"
+
+    def set_bucket_keys(self):
+        for field, key in bucket_keys(self.timestamp).items():
+            setattr(self, field, key)
+
+    def save(self, *args, **kwargs):
+        self.set_bucket_keys()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "timestamp" in update_fields:
+            kwargs["update_fields"] = {*update_fields, *BUCKET_KEY_FIELDS.values()}
+        super().save(*args, **kwargs)
+
+
+class RecordRollup(models.Model):
+    """
+    Pre-aggregated totals of a user's records for one hour, day or month.
+    Kept in step with Record inserts/deletes so summaries can avoid raw scans.
+    """
+
+    GRANULARITY_CHOICES = [
+        ("hour", "Hour"),
+        ("day", "Day"),
+        ("month", "Month"),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="rollups")
+    granularity = models.CharField(max_length=5, choices=GRANULARITY_CHOICES)
+    period = models.DateTimeField()
+    total_word_count = models.BigIntegerField(default=0)
+    total_study_time_minutes = models.BigIntegerField(default=0)
+    record_count = models.IntegerField(default=0)
+
+    class Meta:
         constraints = [
             models.UniqueConstraint(
-                fields=["user_id", "submission_id"], name="unique_submission_per_user"
+                fields=["user", "granularity", "period"],
+                name="unique_rollup_per_user_period",
             )
         ]
-        ordering = ["timestamp"]
+        ordering = ["period"]
 
     def __str__(self):
-        return f"{self.user.id} - {self.timestamp}"
+        return f"{self.user_id} - {self.granularity} - {self.period}"
+
+
+class Job(models.Model):
+    """
+    A management command run in the background by assignment.jobs. The row
+    is the job's only state, so any worker process can report on it.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    command = models.CharField(max_length=100)
+    options = models.JSONField(default=dict)
+    status = models.CharField(max_length=9, choices=STATUS_CHOICES, default=QUEUED)
+    # Last line the command wrote, updated while it runs
+    progress = models.CharField(max_length=255, blank=True, default="")
+    output = models.TextField(blank=True, default="")
+    error = models.TextField(blank=True, default="")
+    # host:pid of the process whose thread pool owns the job
+    worker = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.command} {self.id} ({self.status})"
+
+    @property
+    def duration(self):
+        """Seconds spent running so far, or None before the job starts."""
+        if self.started_at is None:
+            return None
+        return ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
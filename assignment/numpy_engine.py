@@ -0,0 +1,181 @@
+"""
+NumPy-vectorized summary engine, selected with SUMMARY_ENGINE = "numpy".
+
+Raw (epoch, word_count, study_time_minutes) columns are fetched straight from
+the database cursor into arrays, bucketed with datetime64 casts and summed
+with `np.add.reduceat`. Results are identical to the ORM engine.
+"""
+
+import math
+from datetime import UTC, datetime
+from itertools import chain
+
+import numpy as np
+from django.db import connections
+from django.utils import timezone
+
+from assignment.expressions import EpochSeconds
+from assignment.services import next_period
+from assignment.windows import moving_average
+
+DATETIME64_UNITS = {"hour": "h", "day": "D", "month": "M"}
+
+
+def fetch_columns(records):
+    """
+    Returns int64 arrays (epoch_seconds, word_count, study_time_minutes)
+    for the given Record queryset, bypassing model/row construction.
+    """
+    query = (
+        records.order_by()
+        .annotate(epoch=EpochSeconds("timestamp"))
+        .values_list("epoch", "word_count", "study_time_minutes")
+    )
+    sql, params = query.query.get_compiler(using=query.db).as_sql()
+    with connections[query.db].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    flat = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=3 * len(rows))
+    columns = flat.reshape(-1, 3)
+    return columns[:, 0], columns[:, 1], columns[:, 2]
+
+
+def utc_offsets(epochs, tzinfo):
+    """
+    UTC offset in seconds of `tzinfo` at each epoch. Offsets are resolved once
+    per distinct UTC hour, which covers every DST transition in practice.
+    """
+    hours, inverse = np.unique(epochs // 3600, return_inverse=True)
+    offsets = np.fromiter(
+        (
+            datetime.fromtimestamp(int(hour) * 3600, tzinfo).utcoffset().total_seconds()
+            for hour in hours
+        ),
+        dtype=np.int64,
+        count=len(hours),
+    )
+    return offsets[inverse]
+
+
+def bucket_keys(epochs, granularity, tzinfo):
+    """
+    Local-time period keys in seconds since the epoch (naive local wall time).
+    """
+    local = epochs + utc_offsets(epochs, tzinfo)
+    unit = DATETIME64_UNITS[granularity]
+    return (
+        local.astype("datetime64[s]")
+        .astype(f"datetime64[{unit}]")
+        .astype("datetime64[s]")
+        .astype(np.int64)
+    )
+
+
+def vector_moving_average(values, window, method):
+    """
+    Trailing `window`-period average as a float array; positions without a
+    full window are NaN. SMA and WMA are computed with cumsum/convolve, EMA is
+    inherently sequential and uses the single-pass implementation.
+    """
+    if method == "ema":
+        return np.array(
+            [
+                np.nan if v is None else v
+                for v in moving_average(values.tolist(), window, method)
+            ],
+            dtype=np.float64,
+        )
+
+    result = np.full(len(values), np.nan)
+    if len(values) < window:
+        return result
+    if method == "wma":
+        # np.convolve flips the kernel, so weights run newest=window .. oldest=1
+        sums = np.convolve(values, np.arange(window, 0, -1), mode="valid")
+        result[window - 1 :] = sums / (window * (window + 1) // 2)
+    else:
+        sums = np.cumsum(values)
+        sums[window:] = sums[window:] - sums[:-window]
+        result[window - 1 :] = sums[window - 1 :] / window
+    return result
+
+
+def aggregate(records, granularity):
+    """
+    Groups the queryset's records by period. Returns (period_keys,
+    total_words, total_minutes, counts) arrays, or None when there is no data.
+    """
+    epochs, words, minutes = fetch_columns(records)
+    if len(epochs) == 0:
+        return None
+
+    keys = bucket_keys(epochs, granularity, timezone.get_current_timezone())
+
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1))
+
+    return (
+        keys[starts],
+        np.add.reduceat(words[order], starts),
+        np.add.reduceat(minutes[order], starts),
+        np.diff(np.append(starts, len(keys))),
+    )
+
+
+def summarize(aggregated, granularity, window=3, method="sma", history=()):
+    """
+    Builds the same period dicts as AggregationService.get_summary from
+    `aggregate()` output, using `history` periods as moving-average warm-up.
+    """
+    period_keys, total_words, total_minutes, counts = aggregated
+    tzinfo = timezone.get_current_timezone()
+
+    safe_minutes = np.where(total_minutes > 0, total_minutes, 1)
+    wpm = np.where(total_minutes > 0, total_words / safe_minutes, 0.0)
+
+    history_words = np.array([p["total_word_count"] for p in history], np.int64)
+    history_minutes = np.array(
+        [p["total_study_time_minutes"] for p in history], np.int64
+    )
+    moving_words = vector_moving_average(
+        np.concatenate((history_words, total_words)), window, method
+    )[len(history) :]
+    moving_minutes = vector_moving_average(
+        np.concatenate((history_minutes, total_minutes)), window, method
+    )[len(history) :]
+
+    periods = []
+    for key, word_sum, minute_sum, count, rate, avg_words, avg_minutes in zip(
+        period_keys.tolist(),
+        total_words.tolist(),
+        total_minutes.tolist(),
+        counts.tolist(),
+        wpm.tolist(),
+        moving_words.tolist(),
+        moving_minutes.tolist(),
+    ):
+        start_date = timezone.make_aware(
+            datetime.fromtimestamp(key, UTC).replace(tzinfo=None), tzinfo
+        )
+        # Python's round() is applied per period so results match the ORM
+        # engine bit for bit (np.round rounds the scaled binary value).
+        periods.append(
+            {
+                "period": start_date,
+                "total_word_count": word_sum,
+                "total_study_time_minutes": minute_sum,
+                "record_count": count,
+                "average_words_per_minute": round(rate, 2),
+                "moving_avg_word_count": (
+                    None if math.isnan(avg_words) else round(avg_words, 2)
+                ),
+                "moving_avg_study_time": (
+                    None if math.isnan(avg_minutes) else round(avg_minutes, 2)
+                ),
+                "start_date": start_date,
+                "end_date": next_period(start_date, granularity),
+            }
+        )
+    return periods
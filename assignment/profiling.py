@@ -0,0 +1,126 @@
+"""
+On-demand cProfile and tracemalloc capture of single requests.
+
+Both profilers are process-wide (cProfile cannot run twice at once, and
+tracemalloc sees every thread's allocations), so at most one request per
+process is captured at a time and concurrent candidates are skipped.
+"""
+
+import cProfile
+import re
+import threading
+import time
+import tracemalloc
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+
+_UNSAFE_NAME = re.compile(r"[^A-Za-z0-9_-]+")
+
+# Frames kept per traced allocation
+TRACEBACK_FRAMES = 10
+
+
+def safe_name(value, length=64):
+    return _UNSAFE_NAME.sub("_", value)[:length] or "_"
+
+
+class ProfileBudget:
+    """
+    Admits at most PROFILING_MAX_PER_MINUTE captures per process in any
+    sliding minute, however they were triggered.
+    """
+
+    _started = deque()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def admit():
+        limit = getattr(settings, "PROFILING_MAX_PER_MINUTE", 6)
+        now = time.monotonic()
+        with ProfileBudget._lock:
+            started = ProfileBudget._started
+            while started and now - started[0] >= 60:
+                started.popleft()
+            if len(started) >= limit:
+                return False
+            started.append(now)
+            return True
+
+    @staticmethod
+    def refund():
+        """Returns the latest admission, for a capture that never started."""
+        with ProfileBudget._lock:
+            if ProfileBudget._started:
+                ProfileBudget._started.pop()
+
+    @staticmethod
+    def clear():
+        with ProfileBudget._lock:
+            ProfileBudget._started.clear()
+
+
+class RequestProfile:
+    """
+    One capture. start() returns False when another capture is running;
+    stop(name) writes `<name>.prof` (load with pstats or snakeviz) and
+    `<name>.allocations.txt` with the top allocation sites to PROFILING_DIR.
+    """
+
+    _active = threading.Lock()
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self._started_tracemalloc = False
+
+    def start(self):
+        if not RequestProfile._active.acquire(blocking=False):
+            return False
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEBACK_FRAMES)
+            self._started_tracemalloc = True
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger) owns the profiling hook
+            self._stop_tracemalloc()
+            RequestProfile._active.release()
+            return False
+        return True
+
+    @staticmethod
+    def file_name(route, request_id):
+        return "-".join(
+            (
+                datetime.now().strftime("%Y%m%dT%H%M%S"),
+                safe_name(route),
+                safe_name(request_id),
+            )
+        )
+
+    def stop(self, name):
+        try:
+            self.profile.disable()
+            snapshot = tracemalloc.take_snapshot()
+            self._stop_tracemalloc()
+        finally:
+            RequestProfile._active.release()
+
+        directory = Path(settings.PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.profile.dump_stats(directory / f"{name}.prof")
+
+        top = getattr(settings, "PROFILING_TOP_ALLOCATIONS", 25)
+        snapshot = snapshot.filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),)
+        )
+        with open(directory / f"{name}.allocations.txt", "w") as file:
+            for stat in snapshot.statistics("lineno")[:top]:
+                file.write(f"{stat}\n")
+
+    def _stop_tracemalloc(self):
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
@@ -1,51 +1,906 @@
-from django.db import models
-from django.db.models import Sum
-from django.db.models.functions import Trunc
+from collections import defaultdict
+from itertools import chain, groupby
+from operator import itemgetter
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, models, transaction
+from django.db.models import F, Q, RowRange, Sum, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
-from assignment.models import Record, User
-from datetime import timedelta
+from assignment import metrics, timing
+from assignment.cache import RecentSubmissions, SummaryCache
+from assignment.expressions import PeriodTrunc, WindowSum
+from assignment.models import (
+    BUCKET_KEY_FIELDS,
+    Record,
+    RecordRollup,
+    User,
+    bucket_keys,
+    submission_digest,
+)
+from assignment.windows import MovingAverage
+from datetime import datetime, timedelta
+import hashlib
+
+GRANULARITIES = ("hour", "day", "month")
+
+# Rows fetched per round trip when streaming query results
+ITERATOR_CHUNK_SIZE = 2000
+
+# Rollups per INSERT ... ON CONFLICT (6 parameters each), below SQLite's
+# variable limit
+UPSERT_BATCH_SIZE = 150
+
+# Row IDs per DELETE ... WHERE id IN (...), below SQLite's variable limit
+DELETE_BATCH_SIZE = 900
+
+# Records per INSERT ... ON CONFLICT DO NOTHING (9 parameters each), below
+# SQLite's variable limit
+INSERT_BATCH_SIZE = 100
+
+
+def group_rows_by_user(rows):
+    """
+    Groups value dicts ordered by user_id into (user_id, rows) pairs, removing
+    the user_id key from each row.
+    """
+    for user_id, group in groupby(rows, key=itemgetter("user_id")):
+        periods = list(group)
+        for period in periods:
+            del period["user_id"]
+        yield user_id, periods
+
+
+def build_submission_id(user_id, timestamp, word_count, study_time_minutes):
+    """
+    SHA-256 idempotency key of a record submission.
+    """
+    hash_data = f"{user_id}_{timestamp.isoformat()}_{word_count}_{study_time_minutes}"
+    return hashlib.sha256(hash_data.encode()).hexdigest()
+
+
+def truncate_period(value, granularity, tzinfo=None):
+    """
+    Returns the start of the hour/day/month containing `value`, expressed in
+    `tzinfo` (the current timezone by default), matching Django's Trunc.
+    """
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    local = timezone.localtime(value, tzinfo)
+    if granularity == "hour":
+        naive = local.replace(minute=0, second=0, microsecond=0, tzinfo=None)
+    elif granularity == "day":
+        naive = local.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=None)
+    else:
+        naive = local.replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0, tzinfo=None
+        )
+    return timezone.make_aware(naive, tzinfo)
+
+
+def next_period(start_date, granularity):
+    """
+    Returns the start of the period following the one beginning at `start_date`.
+    """
+    if granularity == "hour":
+        return start_date + timedelta(hours=1)
+    elif granularity == "day":
+        return start_date + timedelta(days=1)
+    else:
+        if start_date.month == 12:
+            return start_date.replace(year=start_date.year + 1, month=1)
+        else:
+            return start_date.replace(month=start_date.month + 1)
+
+
+def bucket_key_period(key, granularity, tzinfo=None):
+    """
+    Inverse of models.bucket_keys(): the start of the period with bucket
+    `key`, as an aware datetime in `tzinfo` (the default timezone).
+    """
+    tzinfo = tzinfo or timezone.get_default_timezone()
+    if granularity == "hour":
+        naive = datetime(1970, 1, 1) + timedelta(hours=key)
+    elif granularity == "day":
+        naive = datetime(1970, 1, 1) + timedelta(days=key)
+    else:
+        year, month = divmod(key - 1, 12)
+        naive = datetime(year, month + 1, 1)
+    return timezone.make_aware(naive, tzinfo)
+
+
+def can_use_bucket_keys(tzinfo=None):
+    """
+    Whether Record's stored bucket keys, computed in the default timezone,
+    can group periods for `tzinfo` (the current timezone by default).
+    """
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    return getattr(settings, "SUMMARY_USE_BUCKET_KEYS", True) and str(tzinfo) == str(
+        timezone.get_default_timezone()
+    )
+
+
+def grouped_periods(records, granularity, bounds=(None, None), by=(), tzinfo=None):
+    """
+    Groups `records` by (*by, period) and yields value dicts with the period
+    totals, ordered by (*by, period). Periods are read from the stored bucket
+    key columns when they match `tzinfo` (the current timezone by default), so
+    the grouping can follow a (user, bucket) index; otherwise timestamps are
+    truncated with PeriodTrunc.
+    """
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    totals = {
+        "total_word_count": Sum("word_count"),
+        "total_study_time_minutes": Sum("study_time_minutes"),
+        "record_count": models.Count("id"),
+    }
+
+    if not can_use_bucket_keys(tzinfo):
+        yield from (
+            records.annotate(
+                period=PeriodTrunc(
+                    "timestamp", kind=granularity, tzinfo=tzinfo, bounds=bounds
+                )
+            )
+            .values(*by, "period")
+            .annotate(**totals)
+            .order_by(*by, "period")
+            .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+        )
+        return
+
+    field = BUCKET_KEY_FIELDS[granularity]
+    if None not in bounds:
+        # Redundant with the timestamp filters, but lets the database range
+        # scan the (user, bucket) index
+        records = records.filter(
+            **{
+                f"{field}__gte": bucket_keys(bounds[0])[field],
+                f"{field}__lte": bucket_keys(bounds[1])[field],
+            }
+        )
+    rows = (
+        records.values(*by, field)
+        .annotate(**totals)
+        .order_by(*by, field)
+        .iterator(chunk_size=ITERATOR_CHUNK_SIZE)
+    )
+    for row in rows:
+        row["period"] = bucket_key_period(row.pop(field), granularity, tzinfo)
+        yield row
+
+
+def latest_periods(records, granularity, before, count, tzinfo=None):
+    """
+    The latest `count` period totals of `records` before the period starting
+    at `before`, newest first, in one query. Grouped like grouped_periods but
+    ordered by period descending with a LIMIT, so with bucket keys the
+    database walks a (user, bucket) index backwards and stops after `count`
+    periods instead of grouping the whole history.
+    """
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    totals = {
+        "total_word_count": Sum("word_count"),
+        "total_study_time_minutes": Sum("study_time_minutes"),
+        "record_count": models.Count("id"),
+    }
+
+    if not can_use_bucket_keys(tzinfo):
+        return list(
+            records.filter(timestamp__lt=before)
+            .annotate(period=PeriodTrunc("timestamp", kind=granularity, tzinfo=tzinfo))
+            .values("period")
+            .annotate(**totals)
+            .order_by("-period")[:count]
+        )
+
+    # `before` starts a period, so the bucket key alone selects the records
+    # before it
+    field = BUCKET_KEY_FIELDS[granularity]
+    rows = list(
+        records.filter(**{f"{field}__lt": bucket_keys(before)[field]})
+        .values(field)
+        .annotate(**totals)
+        .order_by(f"-{field}")[:count]
+    )
+    for row in rows:
+        row["period"] = bucket_key_period(row.pop(field), granularity, tzinfo)
+    return rows
+
+
+class RollupService:
+    """
+    Maintains RecordRollup rows. Buckets are always computed in the default
+    timezone (settings.TIME_ZONE), so they can only answer summaries requested
+    in that timezone.
+    """
+
+    @staticmethod
+    def is_enabled():
+        return getattr(settings, "SUMMARY_USE_ROLLUPS", True)
+
+    @staticmethod
+    def can_serve(tzinfo=None):
+        tzinfo = tzinfo or timezone.get_current_timezone()
+        return RollupService.is_enabled() and str(tzinfo) == str(
+            timezone.get_default_timezone()
+        )
+
+    @staticmethod
+    def apply(records, sign=1):
+        """
+        Adds (sign=1) or removes (sign=-1) the given records from the rollups.
+        Must run inside the transaction that inserts/deletes the records.
+        """
+        if not RollupService.is_enabled():
+            return
+
+        deltas = RollupService._deltas(records, sign)
+        # No savepoint: the statements only make sense with the caller's
+        # insert or delete, and savepoints would double the round trips
+        with transaction.atomic(savepoint=False):
+            if sign > 0:
+                RollupService._upsert(deltas)
+                return
+
+            for (user_id, granularity, period), delta in deltas.items():
+                RollupService._apply_delta(user_id, granularity, period, *delta)
+            RecordRollup.objects.filter(
+                user_id__in={key[0] for key in deltas}, record_count__lte=0
+            ).delete()
+
+    @staticmethod
+    def remove(records):
+        """
+        Removes a batch of deleted records from the rollups, like
+        apply(records, sign=-1), but rollups the batch empties are deleted
+        with one DELETE instead of being decremented to zero one UPDATE at a
+        time, so purging whole periods costs a few statements per batch.
+        """
+        if not RollupService.is_enabled():
+            return
+
+        deltas = RollupService._deltas(records, sign=-1)
+        with transaction.atomic():
+            for granularity in GRANULARITIES:
+                keys = {
+                    (user_id, period): delta
+                    for (user_id, kind, period), delta in deltas.items()
+                    if kind == granularity
+                }
+                if not keys:
+                    continue
+                periods = [period for _, period in keys]
+                existing = RecordRollup.objects.filter(
+                    granularity=granularity,
+                    user_id__in={user_id for user_id, _ in keys},
+                    period__gte=min(periods),
+                    period__lte=max(periods),
+                ).values_list("id", "user_id", "period", "record_count")
+
+                emptied = []
+                for rollup_id, user_id, period, record_count in existing:
+                    delta = keys.get((user_id, period))
+                    if delta is None:
+                        continue
+                    if record_count + delta[2] <= 0:
+                        emptied.append(rollup_id)
+                    else:
+                        RollupService._apply_delta(user_id, granularity, period, *delta)
+                for start in range(0, len(emptied), DELETE_BATCH_SIZE):
+                    RecordRollup.objects.filter(
+                        id__in=emptied[start : start + DELETE_BATCH_SIZE]
+                    ).delete()
+
+    @staticmethod
+    def _deltas(records, sign):
+        """(user_id, granularity, period) -> [words, minutes, count] changes."""
+        tzinfo = timezone.get_default_timezone()
+        deltas = defaultdict(lambda: [0, 0, 0])
+        for record in records:
+            for granularity in GRANULARITIES:
+                period = truncate_period(record.timestamp, granularity, tzinfo)
+                delta = deltas[(record.user_id, granularity, period)]
+                delta[0] += sign * record.word_count
+                delta[1] += sign * record.study_time_minutes
+                delta[2] += sign
+        return deltas
+
+    @staticmethod
+    def _upsert(deltas):
+        """
+        Adds positive deltas with INSERT ... ON CONFLICT DO UPDATE, one
+        statement for up to UPSERT_BATCH_SIZE rollups (SQLite 3.24+ and
+        PostgreSQL), so concurrent writers of a new period cannot collide.
+        """
+        table = connection.ops.quote_name(RecordRollup._meta.db_table)
+        period_field = RecordRollup._meta.get_field("period")
+        columns = ("total_word_count", "total_study_time_minutes", "record_count")
+        rows = [
+            (
+                user_id,
+                granularity,
+                period_field.get_db_prep_value(period, connection),
+                *delta,
+            )
+            for (user_id, granularity, period), delta in deltas.items()
+        ]
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start : start + UPSERT_BATCH_SIZE]
+            values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(batch))
+            increments = ", ".join(
+                f"{column} = {table}.{column} + excluded.{column}" for column in columns
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} "
+                    f"(user_id, granularity, period, {', '.join(columns)}) "
+                    f"VALUES {values} "
+                    f"ON CONFLICT (user_id, granularity, period) "
+                    f"DO UPDATE SET {increments}",
+                    [value for row in batch for value in row],
+                )
+
+    @staticmethod
+    def _apply_delta(user_id, granularity, period, words, minutes, count):
+        """Decrements an existing rollup; removals never create one."""
+        RecordRollup.objects.filter(
+            user_id=user_id, granularity=granularity, period=period
+        ).update(
+            total_word_count=F("total_word_count") + words,
+            total_study_time_minutes=F("total_study_time_minutes") + minutes,
+            record_count=F("record_count") + count,
+        )
+
+    @staticmethod
+    def rebuild(user_id=None, batch_size=1000, user_ids=None):
+        """
+        Recomputes rollups from the raw Record table, for one user, the users
+        in `user_ids` or everyone. Returns the number of rollup rows written.
+        """
+        tzinfo = timezone.get_default_timezone()
+        records = Record.objects.all()
+        rollups = RecordRollup.objects.all()
+        if user_id is not None:
+            user_ids = [user_id]
+        if user_ids is not None:
+            records = records.filter(user_id__in=user_ids)
+            rollups = rollups.filter(user_id__in=user_ids)
+
+        written = 0
+        with transaction.atomic():
+            rollups.delete()
+            for granularity in GRANULARITIES:
+                grouped = grouped_periods(
+                    records, granularity, by=("user_id",), tzinfo=tzinfo
+                )
+                batch = []
+                for row in grouped:
+                    batch.append(RecordRollup(granularity=granularity, **row))
+                    if len(batch) >= batch_size:
+                        RecordRollup.objects.bulk_create(batch)
+                        written += len(batch)
+                        batch = []
+                if batch:
+                    RecordRollup.objects.bulk_create(batch)
+                    written += len(batch)
+        return written
+
+    @staticmethod
+    def get_periods(user_id, from_date, to_date, granularity):
+        """
+        Returns grouped period rows for [from_date, to_date]. Fully covered
+        periods come from the rollups; the partial periods at either end of
+        the range are aggregated from raw records.
+        """
+        return list(
+            RollupService.iter_periods(user_id, from_date, to_date, granularity)
+        )
+
+    @staticmethod
+    def iter_periods(user_id, from_date, to_date, granularity):
+        """
+        Generator form of get_periods; rollup rows are read through a
+        server-side cursor.
+        """
+        tzinfo = timezone.get_current_timezone()
+        head = truncate_period(from_date, granularity, tzinfo)
+        first_full = head if head == from_date else next_period(head, granularity)
+        tail = truncate_period(to_date, granularity, tzinfo)
+
+        if first_full >= tail:
+            yield from AggregationService._raw_periods(
+                Record.objects.filter(
+                    user_id=user_id, timestamp__gte=from_date, timestamp__lte=to_date
+                ),
+                granularity,
+                bounds=(from_date, to_date),
+            )
+            return
+
+        edge_periods = AggregationService._raw_periods(
+            Record.objects.filter(user_id=user_id).filter(
+                Q(timestamp__gte=from_date, timestamp__lt=first_full)
+                | Q(timestamp__gte=tail, timestamp__lte=to_date)
+            ),
+            granularity,
+            bounds=(from_date, to_date),
+        )
+        yield from (p for p in edge_periods if p["period"] < first_full)
+
+        rollup_rows = (
+            RecordRollup.objects.filter(
+                user_id=user_id,
+                granularity=granularity,
+                period__gte=first_full,
+                period__lt=tail,
+            )
+            .values(
+                "period",
+                "total_word_count",
+                "total_study_time_minutes",
+                "record_count",
+            )
+            .order_by("period")
+        )
+        for period in rollup_rows.iterator(chunk_size=ITERATOR_CHUNK_SIZE):
+            period["period"] = timezone.localtime(period["period"], tzinfo)
+            yield period
+
+        yield from (p for p in edge_periods if p["period"] >= tail)
+
+    @staticmethod
+    def get_periods_by_user(user_ids, from_date, to_date, granularity):
+        """
+        Multi-user form of get_periods: yields (user_id, periods) ordered by
+        user_id for every user with data in range. `user_ids=None` means all
+        users. Costs two queries however many users are requested.
+        """
+        tzinfo = timezone.get_current_timezone()
+        head = truncate_period(from_date, granularity, tzinfo)
+        first_full = head if head == from_date else next_period(head, granularity)
+        tail = truncate_period(to_date, granularity, tzinfo)
+
+        records = Record.objects.all()
+        rollups = RecordRollup.objects.filter(granularity=granularity)
+        if user_ids is not None:
+            records = records.filter(user_id__in=user_ids)
+            rollups = rollups.filter(user_id__in=user_ids)
+
+        if first_full >= tail:
+            yield from AggregationService._raw_periods_by_user(
+                records.filter(timestamp__gte=from_date, timestamp__lte=to_date),
+                granularity,
+                bounds=(from_date, to_date),
+            )
+            return
+
+        edges = dict(
+            AggregationService._raw_periods_by_user(
+                records.filter(
+                    Q(timestamp__gte=from_date, timestamp__lt=first_full)
+                    | Q(timestamp__gte=tail, timestamp__lte=to_date)
+                ),
+                granularity,
+                bounds=(from_date, to_date),
+            )
+        )
+        rollup_rows = (
+            rollups.filter(period__gte=first_full, period__lt=tail)
+            .values(
+                "user_id",
+                "period",
+                "total_word_count",
+                "total_study_time_minutes",
+                "record_count",
+            )
+            .order_by("user_id", "period")
+        )
+
+        def merged(user_id, rollup_periods):
+            edge_periods = edges.pop(user_id, [])
+            for period in rollup_periods:
+                period["period"] = timezone.localtime(period["period"], tzinfo)
+            return (
+                [p for p in edge_periods if p["period"] < first_full]
+                + rollup_periods
+                + [p for p in edge_periods if p["period"] >= tail]
+            )
+
+        for user_id, rollup_periods in group_rows_by_user(rollup_rows.iterator()):
+            # Users whose only data in range sits in the partial edge periods
+            for edge_user_id in sorted(u for u in edges if u < user_id):
+                yield edge_user_id, edges.pop(edge_user_id)
+            yield user_id, merged(user_id, rollup_periods)
+
+        for edge_user_id in sorted(edges):
+            yield edge_user_id, edges[edge_user_id]
 
 
 class AggregationService:
     @staticmethod
-    def get_summary(user_id, from_date, to_date, granularity):
+    def get_summary(user_id, from_date, to_date, granularity, window=3, method="sma"):
+        """
+        Returns one dict per period with data. Moving averages use a
+        `window`-period SMA, EMA or WMA; the window - 1 periods before
+        `from_date` are fetched as warm-up so the first periods have values
+        whenever enough history exists.
+        """
+        return list(
+            AggregationService.iter_summary(
+                user_id, from_date, to_date, granularity, window, method
+            )
+        )
+
+    @staticmethod
+    def iter_summary(user_id, from_date, to_date, granularity, window=3, method="sma"):
+        """
+        Generator form of get_summary. With the ORM engine, periods are read
+        through a server-side cursor and finished one at a time, so memory
+        stays flat however long the range is.
+        """
         if from_date.tzinfo is None:
             from_date = timezone.make_aware(from_date)
         if to_date.tzinfo is None:
             to_date = timezone.make_aware(to_date)
 
+        # An unknown user has no records and simply yields no periods; callers
+        # that need to tell the two apart (SummaryView) look the user up.
+        engine = getattr(settings, "SUMMARY_ENGINE", "orm")
+        if engine == "numpy":
+            try:
+                from assignment import numpy_engine
+            except ImportError as exc:
+                raise ImproperlyConfigured(
+                    'SUMMARY_ENGINE = "numpy" requires numpy to be installed'
+                ) from exc
+
+            with timing.phase("sql"):
+                aggregated = numpy_engine.aggregate(
+                    Record.objects.filter(
+                        user_id=user_id,
+                        timestamp__gte=from_date,
+                        timestamp__lte=to_date,
+                    ),
+                    granularity,
+                )
+            if aggregated is None:
+                return
+
+            with timing.phase("sql"):
+                history = AggregationService._lookback_periods(
+                    user_id, from_date, granularity, window - 1
+                )
+            yield from numpy_engine.summarize(
+                aggregated, granularity, window, method, history
+            )
+            return
+
+        if engine == "sql_window" and method == "sma":
+            yield from timing.iterate(
+                "sql",
+                AggregationService._sql_window_summary(
+                    user_id, from_date, to_date, granularity, window
+                ),
+            )
+            return
+
+        if RollupService.can_serve():
+            source = "rollups"
+            periods = RollupService.iter_periods(
+                user_id, from_date, to_date, granularity
+            )
+        else:
+            source = "records"
+            records = Record.objects.filter(
+                user_id=user_id, timestamp__gte=from_date, timestamp__lte=to_date
+            )
+            periods = AggregationService._iter_raw_periods(
+                records, granularity, bounds=(from_date, to_date)
+            )
+        if metrics.is_enabled():
+            periods = AggregationService._count_scanned_rows(
+                periods, granularity, source
+            )
+
+        # Time spent pulling periods (the grouping queries and their fetches)
+        # is "sql"; what the metric loop adds on top is the caller's phase.
+        periods = timing.iterate("sql", periods)
+        first = next(periods, None)
+        if first is None:
+            return
+
+        with timing.phase("sql"):
+            history = AggregationService._lookback_periods(
+                user_id, from_date, granularity, window - 1
+            )
+        yield from AggregationService.iter_metrics(
+            chain([first], periods), granularity, window, method, history
+        )
+
+    @staticmethod
+    def _count_scanned_rows(periods, granularity, source):
+        """
+        Passes `periods` through and observes the rows aggregated into them
+        (records, or one per rollup row) once they have all been read.
+        """
+        rows = 0
         try:
-            User.objects.get(id=user_id)
-        except User.DoesNotExist:
-            return []
+            if source == "records":
+                for period in periods:
+                    rows += period["record_count"]
+                    yield period
+            else:
+                for period in periods:
+                    rows += 1
+                    yield period
+        finally:
+            metrics.summary_rows_scanned.observe(
+                rows, granularity=granularity, source=source
+            )
 
-        records = Record.objects.filter(
-            user_id=user_id, timestamp__gte=from_date, timestamp__lte=to_date
-        ).order_by("timestamp")
+    @staticmethod
+    def get_summaries(
+        user_ids, from_date, to_date, granularity, window=3, method="sma"
+    ):
+        """
+        Multi-user get_summary. Yields (user_id, email, periods) ordered by
+        user_id for each existing user in `user_ids` (all users when None),
+        including users without data. Periods are grouped by (user_id, period)
+        in a single query and streamed, so the number of queries does not
+        grow with the number of users.
+        """
+        if from_date.tzinfo is None:
+            from_date = timezone.make_aware(from_date)
+        if to_date.tzinfo is None:
+            to_date = timezone.make_aware(to_date)
+
+        users = User.objects.order_by("id").values_list("id", "email")
+        if user_ids is not None:
+            users = users.filter(id__in=user_ids)
+
+        history = AggregationService._lookback_periods_by_user(
+            user_ids, from_date, granularity, window - 1
+        )
+        if RollupService.can_serve():
+            grouped = RollupService.get_periods_by_user(
+                user_ids, from_date, to_date, granularity
+            )
+        else:
+            records = Record.objects.filter(
+                timestamp__gte=from_date, timestamp__lte=to_date
+            )
+            if user_ids is not None:
+                records = records.filter(user_id__in=user_ids)
+            grouped = AggregationService._raw_periods_by_user(
+                records, granularity, bounds=(from_date, to_date)
+            )
+
+        pending = next(grouped, None)
+        for user_id, email in users.iterator():
+            while pending is not None and pending[0] < user_id:
+                pending = next(grouped, None)
+            periods = []
+            if pending is not None and pending[0] == user_id:
+                periods = pending[1]
+                pending = next(grouped, None)
+            yield (
+                user_id,
+                email,
+                AggregationService.derive_metrics(
+                    periods, granularity, window, method, history.get(user_id, [])
+                ),
+            )
+
+    @staticmethod
+    def derive_metrics(periods, granularity, window=3, method="sma", history=()):
+        """
+        Adds words-per-minute, moving averages and start/end dates to grouped
+        period rows in place. `history` holds the warm-up periods before the
+        first row.
+        """
+        return list(
+            AggregationService.iter_metrics(
+                periods, granularity, window, method, history
+            )
+        )
+
+    @staticmethod
+    def iter_metrics(periods, granularity, window=3, method="sma", history=()):
+        """
+        Generator form of derive_metrics, consuming `periods` in one pass.
+        """
+        moving_word_count = MovingAverage(window, method)
+        moving_study_time = MovingAverage(window, method)
+        for period in history:
+            moving_word_count.push(period["total_word_count"])
+            moving_study_time.push(period["total_study_time_minutes"])
+
+        for period in periods:
+            if period["total_study_time_minutes"] > 0:
+                period["average_words_per_minute"] = round(
+                    period["total_word_count"] / period["total_study_time_minutes"], 2
+                )
+            else:
+                period["average_words_per_minute"] = 0.0
 
-        if not records.exists():
+            avg_words = moving_word_count.push(period["total_word_count"])
+            avg_minutes = moving_study_time.push(period["total_study_time_minutes"])
+            period["moving_avg_word_count"] = (
+                round(avg_words, 2) if avg_words is not None else None
+            )
+            period["moving_avg_study_time"] = (
+                round(avg_minutes, 2) if avg_minutes is not None else None
+            )
+
+            start_date = period["period"]
+            period["start_date"] = start_date
+            period["end_date"] = next_period(start_date, granularity)
+            yield period
+
+    @staticmethod
+    def _lookback_periods_by_user(user_ids, from_date, granularity, count):
+        """
+        Multi-user _lookback_periods in one query: ranks each user's periods
+        before `from_date` with ROW_NUMBER() and keeps the latest `count`.
+        Without rollups this groups the users' full history before the range.
+        """
+        if count <= 0:
+            return {}
+
+        head = truncate_period(from_date, granularity)
+        if RollupService.can_serve():
+            rows = RecordRollup.objects.filter(granularity=granularity, period__lt=head)
+        else:
+            rows = (
+                Record.objects.filter(timestamp__lt=head)
+                .annotate(period=PeriodTrunc("timestamp", kind=granularity))
+                .values("user_id", "period")
+                .annotate(
+                    total_word_count=Sum("word_count"),
+                    total_study_time_minutes=Sum("study_time_minutes"),
+                    record_count=models.Count("id"),
+                )
+            )
+        if user_ids is not None:
+            rows = rows.filter(user_id__in=user_ids)
+
+        rows = (
+            rows.annotate(
+                rank=Window(
+                    RowNumber(),
+                    partition_by=F("user_id"),
+                    order_by=F("period").desc(),
+                )
+            )
+            .filter(rank__lte=count)
+            .values(
+                "user_id",
+                "period",
+                "total_word_count",
+                "total_study_time_minutes",
+                "record_count",
+            )
+            .order_by("user_id", "period")
+        )
+        return dict(group_rows_by_user(rows))
+
+    @staticmethod
+    def _lookback_start(user_id, from_date, granularity, count):
+        """
+        Returns the start of the earliest of the `count` periods with data
+        before the period containing `from_date` (that period's start if there
+        is no earlier data).
+        """
+        head = truncate_period(from_date, granularity)
+        if count <= 0:
+            return head
+
+        if RollupService.can_serve():
+            periods = list(
+                RecordRollup.objects.filter(
+                    user_id=user_id, granularity=granularity, period__lt=head
+                )
+                .order_by("-period")
+                .values_list("period", flat=True)[:count]
+            )
+            return periods[-1] if periods else head
+
+        periods = latest_periods(
+            Record.objects.filter(user_id=user_id), granularity, head, count
+        )
+        return periods[-1]["period"] if periods else head
+
+    @staticmethod
+    def _lookback_periods(user_id, from_date, granularity, count):
+        """
+        Returns up to `count` grouped periods with data that end before the
+        period containing `from_date`, oldest first.
+        """
+        if count <= 0:
             return []
 
-        trunc_kwargs = {
-            "hour": {"kind": "hour"},
-            "day": {"kind": "day"},
-            "month": {"kind": "month"},
-        }
+        head = truncate_period(from_date, granularity)
+        if RollupService.can_serve():
+            rows = (
+                RecordRollup.objects.filter(
+                    user_id=user_id, granularity=granularity, period__lt=head
+                )
+                .order_by("-period")
+                .values(
+                    "period",
+                    "total_word_count",
+                    "total_study_time_minutes",
+                    "record_count",
+                )[:count]
+            )
+            return list(reversed(rows))
+
+        return list(
+            reversed(
+                latest_periods(
+                    Record.objects.filter(user_id=user_id), granularity, head, count
+                )
+            )
+        )
+
+    @staticmethod
+    def _sql_window_summary(user_id, from_date, to_date, granularity, window):
+        """
+        SMA variant of get_summary where the moving sums are computed by the
+        database with window functions over the grouped query. Only the final
+        division and rounding happen in Python, to stay identical to the
+        Python path.
+        """
+        head = truncate_period(from_date, granularity)
+        lookback_start = AggregationService._lookback_start(
+            user_id, from_date, granularity, window - 1
+        )
+        records = Record.objects.filter(user_id=user_id).filter(
+            Q(timestamp__gte=lookback_start, timestamp__lt=head)
+            | Q(timestamp__gte=from_date, timestamp__lte=to_date)
+        )
 
-        aggregated_data = (
-            records.annotate(period=Trunc("timestamp", **trunc_kwargs[granularity]))
+        order_by = F("period").asc()
+        frame = RowRange(start=-(window - 1), end=0)
+        rows = (
+            records.annotate(
+                period=PeriodTrunc(
+                    "timestamp", kind=granularity, bounds=(lookback_start, to_date)
+                )
+            )
             .values("period")
             .annotate(
                 total_word_count=Sum("word_count"),
                 total_study_time_minutes=Sum("study_time_minutes"),
                 record_count=models.Count("id"),
             )
+            # Separate annotate() so the windows are not added to GROUP BY
+            .annotate(
+                window_word_count=Window(
+                    WindowSum(Sum("word_count")), order_by=order_by, frame=frame
+                ),
+                window_study_time=Window(
+                    WindowSum(Sum("study_time_minutes")),
+                    order_by=order_by,
+                    frame=frame,
+                ),
+                row_number=Window(RowNumber(), order_by=order_by),
+            )
             .order_by("period")
         )
 
-        periods = list(aggregated_data)
+        periods = []
+        for period in rows:
+            if period["period"] < head:
+                # Warm-up period, only needed inside the window frame
+                continue
+
+            full_window = period.pop("row_number") >= window
+            window_word_count = period.pop("window_word_count")
+            window_study_time = period.pop("window_study_time")
 
-        for i, period in enumerate(periods):
             if period["total_study_time_minutes"] > 0:
                 period["average_words_per_minute"] = round(
                     period["total_word_count"] / period["total_study_time_minutes"], 2
@@ -53,31 +908,281 @@ class AggregationService:
             else:
                 period["average_words_per_minute"] = 0.0
 
-            # Calculate moving averages (simple 3-period)
-            if i >= 2:
-                word_counts = [p["total_word_count"] for p in periods[i - 2 : i + 1]]
-                study_times = [
-                    p["total_study_time_minutes"] for p in periods[i - 2 : i + 1]
-                ]
-
-                period["moving_avg_word_count"] = round(sum(word_counts) / 3, 2)
-                period["moving_avg_study_time"] = round(sum(study_times) / 3, 2)
-            else:
-                period["moving_avg_word_count"] = None
-                period["moving_avg_study_time"] = None
+            period["moving_avg_word_count"] = (
+                round(window_word_count / window, 2) if full_window else None
+            )
+            period["moving_avg_study_time"] = (
+                round(window_study_time / window, 2) if full_window else None
+            )
 
             start_date = period["period"]
-            if granularity == "hour":
-                end_date = start_date + timedelta(hours=1)
-            elif granularity == "day":
-                end_date = start_date + timedelta(days=1)
-            else:
-                if start_date.month == 12:
-                    end_date = start_date.replace(year=start_date.year + 1, month=1)
-                else:
-                    end_date = start_date.replace(month=start_date.month + 1)
-
             period["start_date"] = start_date
-            period["end_date"] = end_date
+            period["end_date"] = next_period(start_date, granularity)
+            periods.append(period)
 
         return periods
+
+    @staticmethod
+    def _raw_periods_by_user(records, granularity, bounds=(None, None)):
+        """
+        Groups records by (user_id, period) in one query and yields
+        (user_id, periods) ordered by user_id.
+        """
+        return group_rows_by_user(
+            grouped_periods(records, granularity, bounds, by=("user_id",))
+        )
+
+    @staticmethod
+    def _iter_raw_periods(records, granularity, bounds=(None, None)):
+        return grouped_periods(records, granularity, bounds)
+
+    @staticmethod
+    def _raw_periods(records, granularity, bounds=(None, None)):
+        return list(grouped_periods(records, granularity, bounds))
+
+
+class RecordIngestService:
+    """
+    Idempotent bulk insert of already validated record submissions.
+    """
+
+    @staticmethod
+    def bulk_ingest(entries, chunk_size=500):
+        """
+        `entries` is a list of dicts with user_id, word_count, study_time_minutes
+        and an optional timestamp. Returns one (status, payload) tuple per entry
+        where status is "created", "duplicate" or "error".
+        """
+        user_ids = {entry["user_id"] for entry in entries}
+        known_users = set(
+            User.objects.filter(id__in=user_ids).values_list("id", flat=True)
+        )
+
+        results = [None] * len(entries)
+        pending = []
+        for index, entry in enumerate(entries):
+            if entry["user_id"] not in known_users:
+                results[index] = ("error", {"user_id": ["User not found"]})
+                continue
+            timestamp = entry.get("timestamp") or timezone.now()
+            # Stored form of the key, so it matches the values read back below
+            submission_id = submission_digest(
+                build_submission_id(
+                    entry["user_id"],
+                    timestamp,
+                    entry["word_count"],
+                    entry["study_time_minutes"],
+                )
+            )
+            pending.append(
+                (
+                    index,
+                    Record(
+                        user_id=entry["user_id"],
+                        word_count=entry["word_count"],
+                        study_time_minutes=entry["study_time_minutes"],
+                        timestamp=timestamp,
+                        submission_id=submission_id,
+                    ),
+                )
+            )
+
+        for start in range(0, len(pending), chunk_size):
+            RecordIngestService._ingest_chunk(
+                pending[start : start + chunk_size], results
+            )
+
+        if metrics.is_enabled():
+            for result in ("created", "duplicate"):
+                count = sum(1 for status, _ in results if status == result)
+                if count:
+                    metrics.records_ingested.inc(count, endpoint="batch", result=result)
+        return results
+
+    @staticmethod
+    def _ingest_chunk(chunk, results):
+        new_records = {}
+        for _, record in chunk:
+            new_records.setdefault(record.submission_id, record)
+
+        with transaction.atomic():
+            # Only the rows this statement inserted come back, so a record
+            # that existed already or that a concurrent request inserted
+            # meanwhile is never counted (or rolled up) as ours
+            stored = RecordIngestService._insert_new(new_records.values())
+            inserted = [new_records[submission_id] for submission_id in stored]
+            # The raw insert skips post_save, so rollups are applied explicitly
+            RollupService.apply(inserted)
+            SummaryCache.bump(*{record.user_id for record in inserted})
+
+        existing = set(new_records) - set(stored)
+        duplicates = dict(
+            Record.objects.filter(submission_id__in=existing).values_list(
+                "submission_id", "id"
+            )
+        )
+        record_ids = {**duplicates, **stored}
+        for index, record in chunk:
+            submission_id = record.submission_id
+            if submission_id in stored and new_records[submission_id] is record:
+                results[index] = ("created", record_ids[submission_id])
+            else:
+                results[index] = ("duplicate", record_ids[submission_id])
+
+    @staticmethod
+    def _insert_new(records):
+        """
+        Inserts `records` with INSERT ... ON CONFLICT (submission_id) DO
+        NOTHING RETURNING (SQLite 3.35+ and PostgreSQL), up to
+        INSERT_BATCH_SIZE rows per statement. Returns {submission_id: id} of
+        the rows actually inserted and sets their IDs.
+        """
+        table = connection.ops.quote_name(Record._meta.db_table)
+        fields = [
+            field for field in Record._meta.concrete_fields if not field.primary_key
+        ]
+        columns = ", ".join(connection.ops.quote_name(field.column) for field in fields)
+        records = list(records)
+        rows = []
+        for record in records:
+            record.set_bucket_keys()
+            # pre_save() stamps created_at (auto_now_add)
+            rows.append(
+                [
+                    field.get_db_prep_save(field.pre_save(record, True), connection)
+                    for field in fields
+                ]
+            )
+
+        stored = {}
+        for start in range(0, len(rows), INSERT_BATCH_SIZE):
+            batch = rows[start : start + INSERT_BATCH_SIZE]
+            placeholders = "(" + ", ".join(["%s"] * len(fields)) + ")"
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) "
+                    f"VALUES {', '.join([placeholders] * len(batch))} "
+                    f"ON CONFLICT (submission_id) DO NOTHING "
+                    f"RETURNING id, submission_id",
+                    [value for row in batch for value in row],
+                )
+                for record_id, submission_id in cursor.fetchall():
+                    stored[submission_digest(submission_id)] = record_id
+
+        for record in records:
+            if record.submission_id in stored:
+                record.id = stored[record.submission_id]
+        return stored
+
+
+class PurgeService:
+    """
+    Deletes records and users with set-based DELETEs in bounded batches.
+    QuerySet.delete() on records goes through the deletion collector, which
+    loads every record into Python to send post_delete; here each batch is
+    read as plain tuples and the work of the post_delete handler (rollups,
+    recent submissions, summary cache) is done for the batch as a whole, in
+    the batch's transaction, so rollups match the records after every batch.
+    """
+
+    @staticmethod
+    def purge_records(
+        user_ids=None, from_date=None, to_date=None, batch_size=5000, progress=None
+    ):
+        """
+        Deletes the records of `user_ids` (all users when None) with
+        from_date <= timestamp < to_date (either bound optional). `progress`
+        is called with the running total after each batch. Returns the
+        number of records deleted.
+        """
+        records = Record.objects.order_by()
+        if from_date is not None:
+            records = records.filter(timestamp__gte=from_date)
+        if to_date is not None:
+            records = records.filter(timestamp__lt=to_date)
+
+        deleted = 0
+        for user_group in PurgeService._user_groups(user_ids):
+            group_records = records
+            if user_group is not None:
+                group_records = records.filter(user_id__in=user_group)
+            batches = group_records.values_list(
+                "id",
+                "user_id",
+                "timestamp",
+                "word_count",
+                "study_time_minutes",
+                "submission_id",
+                named=True,
+            )
+            while True:
+                with transaction.atomic():
+                    batch = list(batches[:batch_size])
+                    if not batch:
+                        break
+                    PurgeService._delete_records([row.id for row in batch])
+                    RollupService.remove(batch)
+                    SummaryCache.bump(*{row.user_id for row in batch})
+                for row in batch:
+                    RecentSubmissions.discard(row.submission_id)
+                deleted += len(batch)
+                if progress is not None:
+                    progress(deleted)
+        return deleted
+
+    @staticmethod
+    def _user_groups(user_ids):
+        """
+        `user_ids` in groups of DELETE_BATCH_SIZE, so no user_id IN (...)
+        exceeds SQLite's variable limit; [None] (every user) when None.
+        """
+        if user_ids is None:
+            return [None]
+        user_ids = list(user_ids)
+        return [
+            user_ids[start : start + DELETE_BATCH_SIZE]
+            for start in range(0, len(user_ids), DELETE_BATCH_SIZE)
+        ]
+
+    @staticmethod
+    def _delete_records(ids):
+        """
+        Plain DELETE statements, without the collector or post_delete: the
+        caller updates rollups, RecentSubmissions and the summary cache
+        itself. Nothing references records, so no cascade is skipped.
+        """
+        table = connection.ops.quote_name(Record._meta.db_table)
+        with connection.cursor() as cursor:
+            for start in range(0, len(ids), DELETE_BATCH_SIZE):
+                chunk = ids[start : start + DELETE_BATCH_SIZE]
+                placeholders = ", ".join(["%s"] * len(chunk))
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE id IN ({placeholders})", chunk
+                )
+
+    @staticmethod
+    def purge_users(user_ids=None, batch_size=5000, progress=None):
+        """
+        Deletes `user_ids` (all users when None) after purging their records
+        in batches. Users themselves go through QuerySet.delete(), so their
+        signals run, but by then the collector finds no records to load.
+        Returns (records deleted, users deleted).
+        """
+        records = PurgeService.purge_records(
+            user_ids, batch_size=batch_size, progress=progress
+        )
+        deleted = 0
+        for user_group in PurgeService._user_groups(user_ids):
+            users = User.objects.order_by()
+            if user_group is not None:
+                users = users.filter(id__in=user_group)
+            while True:
+                with transaction.atomic():
+                    ids = list(users.values_list("id", flat=True)[:batch_size])
+                    if not ids:
+                        break
+                    # Any rollups left behind when rollups were disabled
+                    RecordRollup.objects.filter(user_id__in=ids).delete()
+                    User.objects.filter(id__in=ids).delete()
+                deleted += len(ids)
+        return records, deleted
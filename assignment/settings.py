@@ -42,6 +42,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "assignment.middleware.MetricsMiddleware",
+    "assignment.middleware.QueryCountMiddleware",
+    "assignment.middleware.ServerTimingMiddleware",
+    "assignment.middleware.SlowQueryMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -50,6 +54,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "assignment.middleware.MockLoginUserMiddleware",
+    "assignment.middleware.ProfilingMiddleware",
 ]
 
 ROOT_URLCONF = "assignment.urls"
@@ -83,6 +88,21 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# LocMemCache evicts least-recently-used entries beyond MAX_ENTRIES and is
+# per-process; use a shared backend (Redis/Memcached) with multiple workers
+# so summary invalidations reach every process.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -125,3 +145,106 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "assignment.User"
+
+
+# Summary aggregation
+# Serve summaries from the incrementally maintained RecordRollup table.
+# Run `manage.py rebuild_rollups` after enabling on an existing database.
+
+SUMMARY_USE_ROLLUPS = True
+
+# "orm" groups periods in the database (using rollups when enabled); "numpy"
+# fetches raw columns and aggregates them with NumPy (requires numpy);
+# "sql_window" also computes SMA moving sums in the database with window
+# functions (other methods fall back to "orm").
+SUMMARY_ENGINE = "orm"
+
+# Truncate timestamps to periods with native SQL on SQLite (strftime plus
+# the timezone's UTC offsets) instead of Django's per-row Python function.
+SUMMARY_NATIVE_TRUNC = True
+
+# Group raw records on Record's stored bucket_hour/bucket_day/bucket_month
+# columns when the requested timezone is TIME_ZONE (the keys' timezone).
+# Otherwise, or when False, timestamps are truncated per query.
+SUMMARY_USE_BUCKET_KEYS = True
+
+# Upper bound for the `window` query parameter of the summary endpoint
+SUMMARY_MAX_WINDOW = 365
+
+# Render summary periods with the stdlib encoder in assignment/encoders.py
+# instead of SummarySerializer; the JSON output is identical.
+SUMMARY_FAST_RENDER = True
+
+# Upper bound for explicit "user_ids" in the batch summary endpoint
+SUMMARY_BATCH_MAX_USERS = 10000
+
+# Cache summary responses per (user, from, to, granularity, timezone). Entries
+# are invalidated by bumping a per-user version whenever the user's records
+# change.
+SUMMARY_CACHE_ENABLED = True
+SUMMARY_CACHE_ALIAS = "default"
+SUMMARY_CACHE_TIMEOUT = 300
+
+
+# Batch ingestion (/recordsjson/batch)
+RECORD_BATCH_MAX_SIZE = 5000
+RECORD_BATCH_CHUNK_SIZE = 500
+
+# Slots of the per-process table of recently stored submission IDs (0
+# disables it). A retried POST to /recordsjson that hits it costs one indexed
+# exists() instead of the user lookup, the rejected insert and the lookup of
+# the existing record; the exists() catches records deleted by another
+# process. Each slot holds a 16-byte digest and a record ID.
+RECENT_SUBMISSIONS_SIZE = 65536
+
+# MockLoginUserMiddleware: resolve X-User-NAME through an in-process LRU of
+# users and set request.user without a session login (no session writes).
+MOCK_LOGIN_STATELESS = True
+MOCK_LOGIN_CACHE_SIZE = 1024
+
+# QueryCountMiddleware: count each request's database queries and time spent
+# in them; reported as X-DB-Query-Count / X-DB-Time-Ms headers and logged.
+QUERY_STATS_ENABLED = True
+
+# ServerTimingMiddleware: time the phases of summary requests (parse, user
+# lookup, SQL, metric loop, render) and report them as a Server-Timing header
+# and log fields. When False no timer is created and the phase hooks are
+# no-ops.
+SERVER_TIMING_ENABLED = True
+
+# In-process metrics (assignment/metrics.py), served in the Prometheus text
+# format at /metrics to the addresses in METRICS_ALLOWED_IPS. With several
+# worker processes set METRICS_DIR to a local directory shared by all of
+# them: each writes its values there at most every METRICS_FLUSH_INTERVAL
+# seconds and /metrics sums them. Clear the directory on restart.
+METRICS_ENABLED = True
+METRICS_DIR = None
+METRICS_FLUSH_INTERVAL = 5
+METRICS_ALLOWED_IPS = ["127.0.0.1", "::1"]
+
+# ProfilingMiddleware: opt-in cProfile + tracemalloc capture of single
+# requests into PROFILING_DIR, for requests from PROFILING_ALLOWED_USERS
+# carrying the PROFILING_HEADER header and for a PROFILING_SAMPLE_RATE
+# fraction of all requests, at most PROFILING_MAX_PER_MINUTE per process.
+# One capture runs at a time per process.
+PROFILING_ENABLED = False
+PROFILING_DIR = BASE_DIR / "profiles"
+PROFILING_HEADER = "X-Profile"
+PROFILING_ALLOWED_USERS = []
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_MAX_PER_MINUTE = 6
+PROFILING_TOP_ALLOCATIONS = 25
+
+# SlowQueryMiddleware: queries slower than this many milliseconds are written
+# with their parameters, view and query plan to SLOW_QUERY_LOG_FILE, rotated
+# at SLOW_QUERY_LOG_MAX_BYTES. `manage.py slow_query_report` summarizes the
+# log. None disables it.
+SLOW_QUERY_THRESHOLD_MS = 200
+SLOW_QUERY_LOG_FILE = BASE_DIR / "logs" / "slow_queries.log"
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+SLOW_QUERY_LOG_BACKUP_COUNT = 5
+
+# Background jobs (assignment.jobs): threads per process running submitted
+# management commands such as POST /init_data/. Job state is kept in the Job
+# table; a job dies with the process that runs it.
+JOB_WORKERS = 1
@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from assignment.cache import RecentSubmissions, SummaryCache
+from assignment.middleware import UserCache
+from assignment.models import Record, User
+from assignment.services import RollupService
+
+
+@receiver(post_save, sender=Record)
+def add_record_to_rollups(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        RollupService.apply([instance])
+    SummaryCache.bump(instance.user_id)
+
+
+@receiver(post_delete, sender=Record)
+def remove_record_from_rollups(sender, instance, **kwargs):
+    RollupService.apply([instance], sign=-1)
+    RecentSubmissions.discard(instance.submission_id)
+    SummaryCache.bump(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_summaries(sender, instance, **kwargs):
+    SummaryCache.bump(instance.id)
+    UserCache.invalidate(instance)
@@ -0,0 +1,164 @@
+"""
+Slow-query log. SlowQueryWrapper is installed on the database connections
+for the duration of a request (by SlowQueryMiddleware); every query slower
+than SLOW_QUERY_THRESHOLD_MS is written as one JSON line to the rotating
+SLOW_QUERY_LOG_FILE with its parameters, the view that ran it and its query
+plan. `manage.py slow_query_report` summarizes the log.
+"""
+
+import json
+import logging
+import threading
+import time
+from datetime import UTC, datetime
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+logger = logging.getLogger(__name__)
+
+EXPLAIN_PREFIXES = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+
+
+def threshold():
+    """Threshold in seconds, or None when the log is disabled."""
+    milliseconds = getattr(settings, "SLOW_QUERY_THRESHOLD_MS", 200)
+    return None if milliseconds is None else milliseconds / 1000
+
+
+def log_file():
+    return Path(
+        getattr(settings, "SLOW_QUERY_LOG_FILE", None)
+        or Path(settings.BASE_DIR) / "logs" / "slow_queries.log"
+    )
+
+
+class SlowQueryLog:
+    """Appends entries to the rotating log file (one JSON object per line)."""
+
+    _handler = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _get_handler():
+        path = log_file()
+        handler = SlowQueryLog._handler
+        if handler is None or Path(handler.baseFilename) != path.resolve():
+            if handler is not None:
+                handler.close()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=getattr(settings, "SLOW_QUERY_LOG_MAX_BYTES", 10 * 1024**2),
+                backupCount=getattr(settings, "SLOW_QUERY_LOG_BACKUP_COUNT", 5),
+                encoding="utf-8",
+                delay=True,
+            )
+            SlowQueryLog._handler = handler
+        return handler
+
+    @staticmethod
+    def write(entry):
+        message = json.dumps(entry, default=str)
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0, message, None, None
+        )
+        with SlowQueryLog._lock:
+            SlowQueryLog._get_handler().emit(record)
+
+    @staticmethod
+    def read():
+        """Yields the logged entries, oldest rotated file first."""
+        path = log_file()
+        backups = sorted(
+            path.parent.glob(path.name + ".*"),
+            key=lambda backup: (
+                int(backup.suffix[1:]) if backup.suffix[1:].isdigit() else 0
+            ),
+            reverse=True,
+        )
+        for file in (*backups, path):
+            if not file.is_file():
+                continue
+            with open(file, encoding="utf-8") as lines:
+                for line in lines:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+
+
+def explain(connection, sql, params):
+    """
+    The query plan of `sql` as a list of lines, or None when the database or
+    the statement cannot be explained.
+    """
+    prefix = EXPLAIN_PREFIXES.get(connection.vendor)
+    if prefix is None or not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    try:
+        # In a savepoint: on PostgreSQL a failed statement would otherwise
+        # abort the request's transaction
+        with (
+            transaction.atomic(using=connection.alias),
+            connection.cursor() as cursor,
+        ):
+            cursor.execute(prefix + sql, params)
+            rows = cursor.fetchall()
+    except DatabaseError:
+        return None
+    # SQLite rows are (id, parent, notused, detail); PostgreSQL's one column
+    return [row[-1] for row in rows]
+
+
+class SlowQueryWrapper:
+    """
+    Execute wrapper that logs queries slower than `limit` seconds. `caller`
+    returns a dict describing where the query came from (e.g. view and
+    request); it is only called when a query is logged.
+    """
+
+    def __init__(self, limit, caller=dict):
+        self.limit = limit
+        self.caller = caller
+        self._explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        # Only execute() is timed. SQLite does the work up to the first row
+        # there, which includes any sort or temporary B-tree of a full scan.
+        started = time.perf_counter()
+        result = execute(sql, params, many, context)
+        duration = time.perf_counter() - started
+        if duration >= self.limit and not self._explaining:
+            self.record(sql, params, many, context, duration)
+        return result
+
+    def record(self, sql, params, many, context, duration):
+        connection = context["connection"]
+        plan = None
+        if not many and not connection.needs_rollback:
+            # The EXPLAIN runs through this wrapper too; don't log it
+            self._explaining = True
+            try:
+                plan = explain(connection, sql, params)
+            finally:
+                self._explaining = False
+
+        caller = self.caller()
+        logger.warning(
+            f"Slow query ({duration * 1000:.1f}ms) in {caller.get('view')}: {sql[:200]}"
+        )
+        SlowQueryLog.write(
+            {
+                "time": datetime.now(UTC).isoformat(),
+                "duration_ms": round(duration * 1000, 2),
+                **caller,
+                "database": connection.alias,
+                "sql": sql,
+                "params": None if many else params,
+                "many": many,
+                "plan": plan,
+            }
+        )
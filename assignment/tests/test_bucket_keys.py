@@ -0,0 +1,142 @@
+import importlib
+from datetime import UTC, datetime, timedelta
+
+import pytest
+from django.apps import apps
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from assignment.models import Record, User, bucket_keys
+from assignment.services import (
+    AggregationService,
+    bucket_key_period,
+    grouped_periods,
+    truncate_period,
+)
+
+TIMESTAMPS = [
+    datetime(2024, 1, 1, 0, 0, tzinfo=UTC),
+    datetime(2024, 2, 29, 23, 59, 59, 999999, tzinfo=UTC),
+    datetime(2024, 3, 10, 6, 30, tzinfo=UTC),
+    datetime(2024, 3, 10, 7, 30, tzinfo=UTC),
+    datetime(2024, 11, 3, 5, 30, tzinfo=UTC),
+    datetime(2024, 11, 3, 6, 30, tzinfo=UTC),
+    datetime(2024, 12, 31, 23, 0, tzinfo=UTC),
+    datetime(1969, 12, 31, 22, 0, tzinfo=UTC),
+]
+
+
+@pytest.mark.parametrize("time_zone", ["UTC", "America/New_York", "Asia/Kolkata"])
+@pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+def test_bucket_key_period_inverts_bucket_keys(time_zone, granularity):
+    """Test a bucket key maps back to the period Trunc would return"""
+    with override_settings(TIME_ZONE=time_zone):
+        tzinfo = timezone.get_default_timezone()
+        for timestamp in TIMESTAMPS:
+            key = bucket_keys(timestamp)[f"bucket_{granularity}"]
+            assert bucket_key_period(key, granularity) == truncate_period(
+                timestamp, granularity, tzinfo
+            )
+
+
+def test_bucket_keys_values():
+    keys = bucket_keys(datetime(2024, 3, 10, 7, 30, tzinfo=UTC))
+
+    assert (
+        keys["bucket_hour"]
+        == int(datetime(2024, 3, 10, 7, tzinfo=UTC).timestamp()) // 3600
+    )
+    assert keys["bucket_day"] == 19792
+    assert keys["bucket_month"] == 2024 * 12 + 3
+
+
+@pytest.mark.django_db
+class TestRecordBucketKeys:
+    def setup_method(self):
+        self.user = User.objects.create_user(username="bucketuser")
+
+    def make_record(self, timestamp, suffix):
+        return Record(
+            user=self.user,
+            word_count=10,
+            study_time_minutes=5,
+            timestamp=timestamp,
+            submission_id=f"bucket_{suffix}",
+        )
+
+    def assert_keys(self, record):
+        record.refresh_from_db()
+        for field, key in bucket_keys(record.timestamp).items():
+            assert getattr(record, field) == key
+
+    def test_keys_filled_on_insert(self):
+        """Test create(), bulk_create() and timestamp updates store bucket keys"""
+        created = Record.objects.create(
+            user=self.user,
+            word_count=10,
+            study_time_minutes=5,
+            timestamp=TIMESTAMPS[1],
+            submission_id="bucket_created",
+        )
+        bulk = Record.objects.bulk_create(
+            self.make_record(timestamp, i) for i, timestamp in enumerate(TIMESTAMPS)
+        )
+
+        self.assert_keys(created)
+        for record in bulk:
+            self.assert_keys(record)
+
+        created.timestamp = TIMESTAMPS[4]
+        created.save(update_fields=["timestamp"])
+        self.assert_keys(created)
+
+    def test_migration_backfills_keys(self):
+        """Test the 0004 data migration fills keys on existing rows"""
+        Record.objects.bulk_create(
+            self.make_record(timestamp, i) for i, timestamp in enumerate(TIMESTAMPS)
+        )
+        Record.objects.update(bucket_hour=None, bucket_day=None, bucket_month=None)
+
+        migration = importlib.import_module(
+            "assignment.migrations.0004_record_bucket_keys"
+        )
+        migration.backfill_bucket_keys(apps, None)
+
+        for record in Record.objects.all():
+            self.assert_keys(record)
+
+    def test_grouping_uses_bucket_index(self):
+        """Test grouping range-scans the (user, bucket) index without sorting"""
+        bounds = (TIMESTAMPS[0], TIMESTAMPS[-2])
+        records = Record.objects.filter(
+            user=self.user, timestamp__gte=bounds[0], timestamp__lte=bounds[1]
+        )
+        with CaptureQueriesContext(connection) as queries:
+            list(grouped_periods(records, "day", bounds))
+
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + queries.captured_queries[0]["sql"])
+            plan = " ".join(row[-1] for row in cursor.fetchall())
+
+        assert "bucket_day" in plan
+        assert "TEMP B-TREE" not in plan
+
+    @pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+    @override_settings(SUMMARY_USE_ROLLUPS=False)
+    def test_summary_matches_trunc(self, granularity):
+        """Test bucket-key summaries match the Trunc-based fallback"""
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+        Record.objects.bulk_create(
+            self.make_record(start + timedelta(hours=13 * i, minutes=i), i)
+            for i in range(200)
+        )
+        args = (self.user.id, start + timedelta(days=3), start + timedelta(days=90))
+
+        with override_settings(SUMMARY_USE_BUCKET_KEYS=False):
+            expected = AggregationService.get_summary(*args, granularity)
+        actual = AggregationService.get_summary(*args, granularity)
+
+        assert actual == expected
+        assert len(actual) > 1
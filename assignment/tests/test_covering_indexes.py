@@ -0,0 +1,112 @@
+from datetime import UTC, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from assignment.models import Record, User
+from assignment.services import AggregationService, grouped_periods
+
+FROM_DATE = datetime(2024, 1, 1, tzinfo=UTC)
+TO_DATE = datetime(2024, 3, 1, tzinfo=UTC)
+
+
+def query_plans(run):
+    """
+    Runs `run()` and returns the EXPLAIN QUERY PLAN details of each SELECT on
+    the record table it executed.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        run()
+
+    plans = []
+    for query in queries.captured_queries:
+        sql = query["sql"]
+        if not sql.startswith("SELECT") or "assignment_record" not in sql:
+            continue
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            plans.append(" | ".join(row[-1] for row in cursor.fetchall()))
+    return plans
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(connection.vendor != "sqlite", reason="SQLite query plans")
+class TestCoveringIndexes:
+    def setup_method(self):
+        self.users = [User.objects.create_user(username=f"cover{i}") for i in range(3)]
+        Record.objects.bulk_create(
+            Record(
+                user=self.users[i % 3],
+                word_count=i,
+                study_time_minutes=i % 11,
+                timestamp=FROM_DATE + timedelta(hours=5 * i),
+                submission_id=f"cover_{i}",
+            )
+            for i in range(300)
+        )
+        self.records = Record.objects.filter(
+            user=self.users[0], timestamp__gte=FROM_DATE, timestamp__lte=TO_DATE
+        )
+
+    def assert_index_only(self, plans):
+        assert plans
+        for plan in plans:
+            assert "COVERING INDEX" in plan, plan
+            assert "SCAN assignment_record" not in plan, plan
+
+    @pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+    def test_bucket_grouping_is_index_only(self, granularity):
+        """Test bucket-key grouping reads only the covering index"""
+        plans = query_plans(
+            lambda: list(
+                grouped_periods(self.records, granularity, (FROM_DATE, TO_DATE))
+            )
+        )
+
+        self.assert_index_only(plans)
+        assert f"bucket_{granularity}" in plans[0]
+        assert "TEMP B-TREE" not in plans[0]
+
+    def test_trunc_grouping_is_index_only(self):
+        """Test grouping in another timezone reads only the covering index"""
+        with timezone.override(ZoneInfo("Asia/Tokyo")):
+            plans = query_plans(
+                lambda: list(grouped_periods(self.records, "day", (FROM_DATE, TO_DATE)))
+            )
+
+        self.assert_index_only(plans)
+        assert "timestamp>?" in plans[0]
+
+    def test_multi_user_grouping_is_index_only(self):
+        """Test grouping several users reads only the covering index"""
+        records = Record.objects.filter(
+            user_id__in=[user.id for user in self.users],
+            timestamp__gte=FROM_DATE,
+            timestamp__lte=TO_DATE,
+        )
+        plans = query_plans(
+            lambda: list(
+                grouped_periods(records, "day", (FROM_DATE, TO_DATE), by=("user_id",))
+            )
+        )
+
+        self.assert_index_only(plans)
+
+    @override_settings(SUMMARY_USE_ROLLUPS=False)
+    def test_summary_queries_are_index_only(self):
+        """Test every record query of a raw summary, including warm-up, is index-only"""
+        plans = query_plans(
+            lambda: AggregationService.get_summary(
+                self.users[0].id,
+                FROM_DATE + timedelta(days=20),
+                TO_DATE,
+                "day",
+                window=5,
+            )
+        )
+
+        self.assert_index_only(plans)
@@ -0,0 +1,140 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.exports import EXPORT_FIELDS, encode_rows, export_rows
+from assignment.models import Record, User
+
+
+@pytest.mark.django_db
+class TestRecordExport:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="exportuser")
+        other = User.objects.create_user(username="otheruser")
+        self.start = timezone.make_aware(datetime(2024, 5, 1, 8))
+        # Inserted out of order, with two records sharing a timestamp
+        for i in [3, 0, 4, 1, 2]:
+            Record.objects.create(
+                user=self.user,
+                word_count=10 * i,
+                study_time_minutes=i + 1,
+                timestamp=self.start + timedelta(hours=min(i, 3)),
+                submission_id=f"export_{i}",
+            )
+        Record.objects.create(
+            user=other,
+            word_count=1,
+            study_time_minutes=1,
+            timestamp=self.start,
+            submission_id="export_other",
+        )
+        self.url = reverse("records_export", kwargs={"id": self.user.id})
+
+    def expected_ids(self):
+        return list(
+            Record.objects.filter(user=self.user)
+            .order_by("timestamp", "id")
+            .values_list("id", flat=True)
+        )
+
+    def test_csv(self):
+        """Test CSV export streams the user's records in (timestamp, id) order"""
+        response = self.client.get(self.url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response["Content-Type"] == "text/csv; charset=utf-8"
+        assert "user-%d-records.csv" % self.user.id in response["Content-Disposition"]
+        body = b"".join(response.streaming_content).decode()
+        rows = list(csv.DictReader(io.StringIO(body)))
+        assert tuple(rows[0]) == EXPORT_FIELDS
+        assert [int(row["id"]) for row in rows] == self.expected_ids()
+        first = Record.objects.get(id=rows[0]["id"])
+        assert rows[0]["timestamp"] == "2024-05-01T08:00:00Z"
+        assert rows[0]["submission_id"] == first.submission_id.hex()
+
+    def test_ndjson_with_bounds(self):
+        response = self.client.get(
+            self.url,
+            {
+                "format": "ndjson",
+                "from": "2024-05-01T09:00:00Z",
+                "to": "2024-05-01T10:00:00Z",
+            },
+        )
+
+        assert response["Content-Type"] == "application/x-ndjson"
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        assert [row["word_count"] for row in rows] == [10, 20]
+        assert set(rows[0]) == set(EXPORT_FIELDS)
+
+    def test_streamed_in_chunks_from_one_query(self):
+        """Test rows are fetched with a single query and encoded chunk by chunk"""
+        with CaptureQueriesContext(connection) as queries:
+            chunks = list(
+                encode_rows(
+                    export_rows(self.user.id, chunk_size=2), "ndjson", chunk_size=2
+                )
+            )
+
+        assert [chunk.count("\n") for chunk in chunks] == [2, 2, 1]
+        assert len(queries) == 1
+
+    @pytest.mark.parametrize(
+        "params",
+        [{"format": "xml"}, {"from": "yesterday"}],
+    )
+    def test_invalid_params(self, params):
+        response = self.client.get(self.url, params)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "error" in response.json()
+
+    def test_unknown_user(self):
+        response = self.client.get(reverse("records_export", kwargs={"id": 999}))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_command(self, tmp_path):
+        out = StringIO()
+        call_command(
+            "export_records",
+            "--user-id",
+            str(self.user.id),
+            "--format",
+            "ndjson",
+            stdout=out,
+        )
+        ids = [json.loads(line)["id"] for line in out.getvalue().splitlines()]
+        assert ids == self.expected_ids()
+
+        path = tmp_path / "records.csv"
+        call_command(
+            "export_records",
+            "--user-id",
+            str(self.user.id),
+            "--from",
+            "2024-05-01T10:00:00",
+            "--output",
+            str(path),
+            stderr=StringIO(),
+        )
+        rows = list(csv.DictReader(path.open()))
+        assert [row["word_count"] for row in rows] == ["20", "30", "40"]
+
+    def test_command_unknown_user(self):
+        with pytest.raises(CommandError):
+            call_command("export_records", "--user-id", "999", stdout=StringIO())
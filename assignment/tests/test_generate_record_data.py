@@ -0,0 +1,97 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Count, Sum
+
+from assignment.management.commands.generate_record_data import allocate
+from assignment.models import Record, RecordRollup, User
+from assignment.services import RollupService
+
+
+def generate(*args):
+    out = StringIO()
+    call_command("generate_record_data", "--end", "2024-03-01", *args, stdout=out)
+    return out.getvalue()
+
+
+def snapshot(model, *fields):
+    return sorted(model.objects.values_list(*fields))
+
+
+def test_allocate_preserves_total():
+    counts = allocate(1000, [0.5, 3.0, 1.25, 0.01])
+
+    assert sum(counts) == 1000
+    assert counts[1] > counts[2] > counts[0] > counts[3]
+
+
+@pytest.mark.django_db
+class TestGenerateRecordData:
+    def test_same_seed_same_records(self):
+        """Test a seed reproduces the same records, however they are chunked"""
+        generate("--users", "5", "--num-records", "300", "--seed", "7")
+        first = snapshot(Record, "user_id", "timestamp", "word_count", "submission_id")
+        Record.objects.all().delete()
+
+        generate(
+            "--users", "5", "--num-records", "300", "--seed", "7", "--chunk-size", "17"
+        )
+
+        assert len(first) == 300
+        assert (
+            snapshot(Record, "user_id", "timestamp", "word_count", "submission_id")
+            == first
+        )
+
+    def test_records_spread_across_users_and_days(self):
+        generate("--users", "20", "--num-records", "2000", "--days", "60")
+
+        per_user = Record.objects.values("user_id").annotate(count=Count("id"))
+        assert User.objects.filter(username__startswith="synthetic-").count() == 20
+        assert sum(row["count"] for row in per_user) == 2000
+        assert len({row["count"] for row in per_user}) > 1
+        assert Record.objects.dates("timestamp", "day").count() > 30
+        assert not User.objects.get(username="synthetic-000001").has_usable_password()
+
+    def test_rerun_skips_existing_submissions(self):
+        """Test rerunning with the same seed reuses users and stores no duplicates"""
+        first = generate("--users", "3", "--num-records", "100")
+        rerun = generate("--users", "3", "--num-records", "100")
+
+        assert User.objects.count() == 3
+        assert Record.objects.count() == 100
+        assert "Successfully generated 100 test records" in first
+        assert "Skipped" not in first
+        assert "Successfully generated 0 test records" in rerun
+        assert "Skipped 100 records already stored" in rerun
+
+    def test_rollups_cover_generated_records(self):
+        """Test bulk-inserted records are rolled up like records created one by one"""
+        generate("--users", "4", "--num-records", "500", "--chunk-size", "64")
+        totals = RecordRollup.objects.values("granularity").annotate(
+            records=Sum("record_count"), words=Sum("total_word_count")
+        )
+        words = Record.objects.aggregate(words=Sum("word_count"))["words"]
+
+        assert len(totals) == 3
+        for row in totals:
+            assert (row["records"], row["words"]) == (500, words)
+        fields = ("user_id", "granularity", "period", "record_count")
+        generated = snapshot(RecordRollup, *fields)
+        RollupService.rebuild()
+        assert snapshot(RecordRollup, *fields) == generated
+
+    def test_single_user(self):
+        user = User.objects.create_user(username="generated")
+
+        output = generate("--user-id", str(user.id), "--num-records", "50")
+
+        assert Record.objects.filter(user=user).count() == 50
+        assert "Successfully generated 50 test records" in output
+
+    def test_unknown_user(self):
+        output = generate("--user-id", "999")
+
+        assert "User with ID 999 does not exist." in output
+        assert not Record.objects.exists()
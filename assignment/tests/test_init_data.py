@@ -0,0 +1,142 @@
+import io
+import json
+from io import StringIO
+
+import pytest
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
+
+from assignment.management.commands.init_data import iter_json_array
+from assignment.models import User
+
+ENTRIES = [
+    {"username": "ada", "email": "ada@example.com", "first_name": "Ada", "id": 9},
+    {"username": "grace", "email": "grace@example.com", "password": "secret123"},
+    {"username": "linus", "is_staff": True},
+]
+
+
+@pytest.mark.parametrize("buffer_size", [1, 7, 64 * 1024])
+def test_iter_json_array(buffer_size):
+    """Test elements are parsed across buffer boundaries, including numbers"""
+    values = [*ENTRIES, 12345, -1.5e3, "a, ]", [1, [2]], None, True]
+    text = "\n  " + json.dumps(values, indent=2) + "\n"
+
+    parsed = list(iter_json_array(io.StringIO(text), buffer_size=buffer_size))
+
+    assert parsed == values
+
+
+def test_iter_json_array_is_incremental():
+    """Test elements are yielded before the rest of the file is read"""
+    file = io.StringIO(json.dumps(ENTRIES) + "garbage that would not parse")
+    entries = iter_json_array(file, buffer_size=16)
+
+    assert next(entries) == ENTRIES[0]
+    assert file.tell() < len(file.getvalue()) / 2
+
+
+@pytest.mark.parametrize("text", ["", "{}", "[1 2]", '[{"a": 1}'])
+def test_iter_json_array_rejects_malformed(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.StringIO(text), buffer_size=4))
+
+
+@pytest.mark.django_db
+class TestInitData:
+    @pytest.fixture(autouse=True)
+    def fixture_file(self, tmp_path):
+        self.path = tmp_path / "users.json"
+        self.path.write_text(json.dumps(ENTRIES))
+
+    def load(self, *args):
+        out = StringIO()
+        call_command("init_data", file=str(self.path), *args, stdout=out)
+        return out.getvalue()
+
+    def test_loads_fixture_users(self):
+        """Test fixture users are loaded alongside the test accounts"""
+        User.objects.create_user(username="stale")
+
+        output = self.load("--chunk-size", "2")
+
+        assert "loaded successfully" in output
+        assert not User.objects.filter(username="stale").exists()
+        assert User.objects.count() == 3 + 6
+        ada = User.objects.get(username="ada")
+        assert (ada.email, ada.first_name) == ("ada@example.com", "Ada")
+        assert not ada.has_usable_password()
+        assert User.objects.get(username="grace").check_password("secret123")
+        assert User.objects.get(username="linus").is_staff
+        testuser = User.objects.get(username="testuser")
+        assert testuser.is_superuser
+        assert testuser.check_password("testpassword")
+        assert User.objects.get(username="testuser5").check_password("testpassword")
+
+    def test_shared_password_hash(self):
+        """Test --password-hash is stored for every loaded user as given"""
+        password_hash = make_password("shared")
+
+        self.load("--password-hash", password_hash)
+
+        loaded = User.objects.filter(username__in=["ada", "grace", "linus"])
+        assert {user.password for user in loaded} == {password_hash}
+        assert loaded.get(username="grace").check_password("shared")
+
+    def test_shared_password(self):
+        self.load("--password", "shared")
+
+        loaded = User.objects.filter(username__in=["ada", "grace", "linus"])
+        assert len({user.password for user in loaded}) == 1
+        assert loaded.get(username="ada").check_password("shared")
+
+    def test_invalid_password_hash(self):
+        """Test a bad hash fails before the existing users are deleted"""
+        User.objects.create_user(username="existing")
+
+        with pytest.raises(CommandError, match="Error loading data"):
+            self.load("--password-hash", "not-a-hash")
+
+        assert list(User.objects.values_list("username", flat=True)) == ["existing"]
+
+    @pytest.mark.parametrize(
+        "entries",
+        [
+            ENTRIES + [{"username": "ada"}],
+            ENTRIES + [{"username": "x" * 200}],
+            ENTRIES + [{"username": ""}],
+            ENTRIES + ["ada"],
+        ],
+    )
+    def test_invalid_fixture_loads_nothing(self, entries):
+        """Test a bad entry at the end fails before the existing users are deleted"""
+        User.objects.create_user(username="existing")
+        self.path.write_text(json.dumps(entries))
+
+        with pytest.raises(CommandError, match="Error loading data"):
+            self.load("--chunk-size", "1")
+
+        assert list(User.objects.values_list("username", flat=True)) == ["existing"]
+
+    def test_malformed_fixture_loads_nothing(self):
+        """Test a fixture cut off halfway fails before the existing users are deleted"""
+        User.objects.create_user(username="existing")
+        self.path.write_text(json.dumps(ENTRIES)[:-20])
+
+        with pytest.raises(CommandError, match="Error loading data"):
+            self.load("--chunk-size", "1")
+
+        assert list(User.objects.values_list("username", flat=True)) == ["existing"]
+
+    def test_unprivileged(self):
+        """Test --unprivileged ignores the fixture's staff and superuser flags"""
+        self.path.write_text(
+            json.dumps(
+                [{"username": "mallory", "is_staff": True, "is_superuser": True}]
+            )
+        )
+
+        self.load("--unprivileged")
+
+        mallory = User.objects.get(username="mallory")
+        assert not (mallory.is_staff or mallory.is_superuser)
@@ -0,0 +1,183 @@
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.jobs import JobRunner
+from assignment.management.commands import init_data
+from assignment.models import Job, User
+
+
+@pytest.fixture
+def fixture_file(tmp_path):
+    path = tmp_path / "users.json"
+    path.write_text(json.dumps([{"username": f"jobuser{i}"} for i in range(3)]))
+    return path
+
+
+@pytest.mark.django_db
+class TestJobs:
+    def setup_method(self):
+        self.client = APIClient()
+
+    def get_job(self, job_id):
+        return self.client.get(reverse("job", kwargs={"id": job_id}))
+
+    def test_init_data_queued(self, django_capture_on_commit_callbacks):
+        """Test /init_data/ answers at once with a queued job to poll"""
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = self.client.post(
+                reverse("initialize_data"), {"file": "users.json"}, format="json"
+            )
+
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        job = Job.objects.get(id=response.data["job_id"])
+        assert (job.command, job.options) == (
+            "init_data",
+            {"file": "users.json", "unprivileged": True},
+        )
+        assert response.data["status"] == Job.QUEUED
+        assert response.data["status_url"].endswith(f"/jobs/{job.id}")
+        # Started only once the job row is committed
+        assert len(callbacks) == 1
+        assert not User.objects.exists()
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            {"file": 1},
+            ["users.json"],
+            "users.json",
+            {"file": ""},
+            {"file": "/etc/passwd"},
+            {"file": "../../settings.json"},
+            {"file": "fixtures/../../users.json"},
+        ],
+    )
+    def test_init_data_invalid_body(self, body):
+        """Test a malformed body is rejected without queueing a job"""
+        response = self.client.post(reverse("initialize_data"), body, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "error" in response.data
+        assert not Job.objects.exists()
+
+    def test_job_succeeds(self, fixture_file):
+        """Test a finished job reports its result, progress and duration"""
+        job = JobRunner.submit("init_data", file=str(fixture_file))
+
+        JobRunner.run(job.id)
+        response = self.get_job(job.id)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["status"] == Job.SUCCEEDED
+        assert response.data["progress"].startswith("Mock data loaded successfully")
+        assert "All existing item data has been deleted" in response.data["output"]
+        assert response.data["duration_seconds"] >= 0
+        assert response.data["error"] == ""
+        assert User.objects.filter(username__startswith="jobuser").count() == 3
+
+    def test_job_fails(self):
+        job = JobRunner.submit("init_data", file="missing.json")
+
+        JobRunner.run(job.id)
+        response = self.get_job(job.id)
+
+        assert response.data["status"] == Job.FAILED
+        assert response.data["error"].startswith("Error loading data")
+        assert response.data["finished_at"] is not None
+
+    def test_job_runs_once(self, fixture_file):
+        job = JobRunner.submit("init_data", file=str(fixture_file))
+        JobRunner.run(job.id)
+        finished_at = Job.objects.get(id=job.id).finished_at
+
+        JobRunner.run(job.id)
+
+        assert Job.objects.get(id=job.id).finished_at == finished_at
+
+    def test_job_of_exited_worker_fails(self):
+        """Test a job whose process exited is reported failed, not running forever"""
+        process = subprocess.Popen([sys.executable, "-c", "pass"])
+        process.wait()
+        job = Job.objects.create(
+            command="init_data",
+            status=Job.RUNNING,
+            worker=f"{socket.gethostname()}:{process.pid}",
+        )
+
+        response = self.get_job(job.id)
+
+        assert response.data["status"] == Job.FAILED
+        assert "exited before the job finished" in response.data["error"]
+
+    def test_job_of_other_host_left_alone(self):
+        job = Job.objects.create(
+            command="init_data", status=Job.RUNNING, worker="elsewhere:1"
+        )
+
+        assert self.get_job(job.id).data["status"] == Job.RUNNING
+
+    def test_unknown_job(self):
+        response = self.get_job(uuid.uuid4())
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db(transaction=True)
+def test_job_runs_in_background(fixture_file):
+    """Test the submitted command runs on the runner's thread pool"""
+    job = JobRunner.submit("init_data", file=str(fixture_file))
+
+    deadline = time.monotonic() + 10
+    try:
+        while time.monotonic() < deadline:
+            job.refresh_from_db()
+            if job.status not in (Job.QUEUED, Job.RUNNING):
+                break
+            time.sleep(0.05)
+    finally:
+        JobRunner.shutdown()
+
+    assert job.status == Job.SUCCEEDED
+    assert User.objects.filter(username__startswith="jobuser").count() == 3
+
+
+@pytest.mark.django_db(transaction=True)
+def test_job_progress_while_running(fixture_file, monkeypatch):
+    """Test GET /jobs/<id> shows the latest progress line before the job finishes"""
+    monkeypatch.setattr("assignment.jobs.PROGRESS_INTERVAL", 0)
+    resume = threading.Event()
+    create_test_users = init_data.Command.create_test_users
+
+    def paused(command):
+        resume.wait(10)
+        create_test_users(command)
+
+    # Holds the job after the fixture users are loaded
+    monkeypatch.setattr(init_data.Command, "create_test_users", paused)
+    job = JobRunner.submit("init_data", file=str(fixture_file), chunk_size=1)
+    client = APIClient()
+
+    deadline = time.monotonic() + 10
+    try:
+        while time.monotonic() < deadline:
+            data = client.get(reverse("job", kwargs={"id": job.id})).data
+            if data["progress"] == "3 users loaded":
+                break
+            time.sleep(0.05)
+    finally:
+        resume.set()
+        JobRunner.shutdown()
+
+    assert (data["status"], data["progress"]) == (Job.RUNNING, "3 users loaded")
+    job.refresh_from_db()
+    assert job.status == Job.SUCCEEDED
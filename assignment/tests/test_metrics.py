@@ -0,0 +1,188 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment import metrics
+from assignment.metrics import Registry
+from assignment.models import Record, User
+
+
+def make_registry():
+    registry = Registry()
+    registry.counter("jobs_total", "Jobs.", ("queue",))
+    registry.histogram("job_seconds", "Job latency.", ("queue",), buckets=(0.1, 1))
+    return registry
+
+
+def sample_lines(exposition, prefix):
+    return [line for line in exposition.splitlines() if line.startswith(prefix)]
+
+
+class TestRegistry:
+    def test_exposition_format(self):
+        """Test counters and histograms render in the text exposition format"""
+        registry = make_registry()
+        registry.metrics["jobs_total"].inc(queue="a")
+        registry.metrics["jobs_total"].inc(2, queue="b")
+        for value in (0.05, 0.5, 3):
+            registry.metrics["job_seconds"].observe(value, queue="a")
+
+        assert registry.exposition().splitlines() == [
+            "# HELP jobs_total Jobs.",
+            "# TYPE jobs_total counter",
+            'jobs_total{queue="a"} 1',
+            'jobs_total{queue="b"} 2',
+            "# HELP job_seconds Job latency.",
+            "# TYPE job_seconds histogram",
+            'job_seconds_bucket{queue="a",le="0.1"} 1',
+            'job_seconds_bucket{queue="a",le="1.0"} 2',
+            'job_seconds_bucket{queue="a",le="+Inf"} 3',
+            'job_seconds_sum{queue="a"} 3.55',
+            'job_seconds_count{queue="a"} 3',
+        ]
+
+    def test_label_values_escaped(self):
+        registry = make_registry()
+        registry.metrics["jobs_total"].inc(queue='say "hi"\n')
+
+        assert 'jobs_total{queue="say \\"hi\\"\\n"} 1' in registry.exposition()
+
+    def test_processes_summed_through_directory(self, tmp_path):
+        """Test snapshots written by other processes are added to local values"""
+        local, other = make_registry(), make_registry()
+        with override_settings(METRICS_DIR=str(tmp_path)):
+            local.metrics["jobs_total"].inc(queue="a")
+            local.metrics["job_seconds"].observe(0.5, queue="a")
+            other.metrics["jobs_total"].inc(3, queue="a")
+            other.metrics["jobs_total"].inc(queue="b")
+            other.metrics["job_seconds"].observe(0.05, queue="a")
+            local.flush()
+            other.flush()
+            # Live values are used for the current process, not its file
+            local.metrics["jobs_total"].inc(queue="a")
+
+            totals = local.collect()
+
+        assert totals["jobs_total"] == {("a",): 5, ("b",): 1}
+        assert totals["job_seconds"][("a",)] == [1, 1, 0, 0.55]
+        assert len(list(tmp_path.iterdir())) == 2
+
+    @pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+    def test_forked_worker_starts_from_zero(self, tmp_path):
+        """Test a forked worker reports only its own values"""
+        registry = metrics.registry
+        registry.reset()
+        with override_settings(METRICS_DIR=str(tmp_path)):
+            metrics.records_ingested.inc(endpoint="single", result="created")
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    metrics.records_ingested.inc(endpoint="single", result="duplicate")
+                    registry.flush()
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+
+            totals = registry.collect()["records_ingested_total"]
+        registry.reset()
+
+        assert totals == {("single", "created"): 1, ("single", "duplicate"): 1}
+
+
+@pytest.mark.django_db
+class TestMetricsEndpoint:
+    def setup_method(self):
+        metrics.registry.reset()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="metricsuser")
+        base_time = timezone.make_aware(datetime(2024, 1, 1, 6, 0, 0))
+        for i in range(10):
+            Record.objects.create(
+                user=self.user,
+                word_count=10,
+                study_time_minutes=2,
+                timestamp=base_time + timedelta(hours=9 * i),
+                submission_id=f"metrics_{i}",
+            )
+        self.summary_url = reverse("summary", kwargs={"id": self.user.id})
+        self.summary_params = {
+            "from": "2024-01-01T00:00:00Z",
+            "to": "2024-01-05T00:00:00Z",
+            "granularity": "day",
+        }
+
+    def teardown_method(self):
+        metrics.registry.reset()
+
+    def scrape(self):
+        response = self.client.get(reverse("metrics"))
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"].startswith("text/plain; version=0.0.4")
+        return response.content.decode()
+
+    def test_requests_counted_by_route(self):
+        """Test requests are counted and timed per route and granularity"""
+        self.client.get(self.summary_url, self.summary_params)
+        self.client.get(self.summary_url, {"granularity": "day"})
+
+        exposition = self.scrape()
+
+        assert sample_lines(exposition, "http_requests_total{") == [
+            'http_requests_total{route="summary",method="GET",status="200"} 1',
+            'http_requests_total{route="summary",method="GET",status="400"} 1',
+        ]
+        assert (
+            'http_request_duration_seconds_count{route="summary",method="GET",'
+            'granularity="day"} 2'
+        ) in exposition
+
+    @pytest.mark.parametrize(
+        "use_rollups, source, rows", [(True, "rollups", 4), (False, "records", 10)]
+    )
+    @override_settings(SUMMARY_CACHE_ENABLED=False)
+    def test_summary_rows_scanned(self, use_rollups, source, rows):
+        with override_settings(SUMMARY_USE_ROLLUPS=use_rollups):
+            self.client.get(self.summary_url, self.summary_params)
+
+        totals = metrics.registry.collect()["summary_rows_scanned"]
+
+        assert totals[("day", source)][-1] == rows
+
+    def test_ingest_results_counted(self):
+        """Test created and duplicate submissions are counted per endpoint"""
+        record = {
+            "user_id": self.user.id,
+            "word_count": 5,
+            "study_time_minutes": 1,
+            "timestamp": "2024-03-01T10:00:00Z",
+        }
+        self.client.post(reverse("records_json"), record, format="json")
+        self.client.post(reverse("records_json"), record, format="json")
+        self.client.post(reverse("records_json_batch"), [record], format="json")
+
+        exposition = self.scrape()
+
+        assert sample_lines(exposition, "records_ingested_total{") == [
+            'records_ingested_total{endpoint="batch",result="duplicate"} 1',
+            'records_ingested_total{endpoint="single",result="created"} 1',
+            'records_ingested_total{endpoint="single",result="duplicate"} 1',
+        ]
+
+    def test_remote_clients_refused(self):
+        """Test the endpoint is only served to local addresses"""
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR="203.0.113.9")
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_disabled(self):
+        self.client.get(self.summary_url, self.summary_params)
+
+        assert metrics.registry.collect()["http_requests_total"] == {}
+        assert self.client.get(reverse("metrics")).status_code == 404
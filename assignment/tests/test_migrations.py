@@ -0,0 +1,64 @@
+import hashlib
+from datetime import UTC, datetime
+
+import pytest
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+BEFORE = [("assignment", "0005_record_covering_indexes")]
+AFTER = [("assignment", "0006_record_binary_submission_id")]
+
+
+def migrate(targets):
+    executor = MigrationExecutor(connection)
+    executor.loader.build_graph()
+    executor.migrate(targets)
+    return executor.loader.project_state(targets).apps
+
+
+@pytest.mark.django_db(transaction=True)
+class TestBinarySubmissionIdMigration:
+    def teardown_method(self):
+        migrate(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_round_trip(self):
+        """Test 0006 converts submission IDs and can be migrated backwards"""
+        apps = migrate(BEFORE)
+        User = apps.get_model("assignment", "User")
+        Record = apps.get_model("assignment", "Record")
+        user = User.objects.create(username="migrationuser")
+        hex_id = hashlib.sha256(b"record").hexdigest()
+        for submission_id in (hex_id, "legacy"):
+            Record.objects.create(
+                user_id=user.id,
+                word_count=1,
+                study_time_minutes=1,
+                timestamp=datetime(2024, 1, 1, tzinfo=UTC),
+                submission_id=submission_id,
+            )
+
+        apps = migrate(AFTER)
+        digests = set(
+            apps.get_model("assignment", "Record").objects.values_list(
+                "submission_id", flat=True
+            )
+        )
+        assert bytes.fromhex(hex_id)[:16] in digests
+
+        apps = migrate(BEFORE)
+        restored = set(
+            apps.get_model("assignment", "Record").objects.values_list(
+                "submission_id", flat=True
+            )
+        )
+        assert restored == {digest.hex() for digest in digests}
+
+        apps = migrate(AFTER)
+        assert (
+            set(
+                apps.get_model("assignment", "Record").objects.values_list(
+                    "submission_id", flat=True
+                )
+            )
+            == digests
+        )
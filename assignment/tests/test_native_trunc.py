@@ -0,0 +1,121 @@
+from datetime import UTC, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.db import connection
+from django.db.models import Count
+from django.db.models.functions import Trunc
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from assignment.expressions import PeriodTrunc, utc_offset_spans_between
+from assignment.models import Record, User
+from assignment.services import AggregationService
+
+TIMEZONES = ["UTC", "America/New_York", "Europe/London", "Asia/Kolkata"]
+
+
+@pytest.mark.django_db
+class TestPeriodTrunc:
+    def setup_method(self):
+        self.user = User.objects.create_user(username="truncuser")
+        timestamps = [
+            # Around the 2024 US and EU DST transitions
+            datetime(2024, 3, 10, 6, 59, 59, tzinfo=UTC),
+            datetime(2024, 3, 10, 7, 0, 0, tzinfo=UTC),
+            datetime(2024, 3, 31, 0, 59, 59, 999999, tzinfo=UTC),
+            datetime(2024, 3, 31, 1, 0, 0, tzinfo=UTC),
+            datetime(2024, 11, 3, 5, 30, 0, tzinfo=UTC),
+            datetime(2024, 11, 3, 6, 30, 0, tzinfo=UTC),
+            datetime(2024, 10, 31, 23, 45, 0, 500000, tzinfo=UTC),
+        ]
+        start = datetime(2024, 1, 1, tzinfo=UTC)
+        timestamps += [start + timedelta(hours=37 * i, minutes=i) for i in range(250)]
+        # bulk_create skips the rollup signals; these tests read raw records
+        Record.objects.bulk_create(
+            Record(
+                user=self.user,
+                word_count=10 + i,
+                study_time_minutes=1 + i % 5,
+                timestamp=timestamp,
+                submission_id=f"trunc_{i}",
+            )
+            for i, timestamp in enumerate(timestamps)
+        )
+        self.bounds = (start, datetime(2025, 1, 1, tzinfo=UTC))
+
+    def grouped(self, expression):
+        return list(
+            Record.objects.annotate(period=expression)
+            .values("period")
+            .annotate(count=Count("id"))
+            .order_by("period")
+        )
+
+    @pytest.mark.parametrize("tz", TIMEZONES)
+    @pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+    def test_matches_django_trunc(self, tz, granularity):
+        """Test native truncation groups exactly like Django's Trunc"""
+        with timezone.override(ZoneInfo(tz)):
+            expected = self.grouped(Trunc("timestamp", kind=granularity))
+            actual = self.grouped(
+                PeriodTrunc("timestamp", kind=granularity, bounds=self.bounds)
+            )
+
+        assert actual == expected
+        for row in actual:
+            assert row["period"].tzinfo == ZoneInfo(tz)
+
+    @pytest.mark.parametrize("tz", TIMEZONES)
+    def test_no_python_function_in_sql(self, tz):
+        """Test the generated SQL does not call back into Python"""
+        with timezone.override(ZoneInfo(tz)):
+            with CaptureQueriesContext(connection) as queries:
+                self.grouped(PeriodTrunc("timestamp", kind="day", bounds=self.bounds))
+
+        sql = queries.captured_queries[0]["sql"]
+        assert "strftime" in sql
+        assert "django_datetime_trunc" not in sql
+
+    def test_unbounded_dst_timezone_falls_back(self):
+        """Test a timezone with several offsets and no bounds uses Trunc"""
+        with timezone.override(ZoneInfo("America/New_York")):
+            with CaptureQueriesContext(connection) as queries:
+                self.grouped(PeriodTrunc("timestamp", kind="day"))
+
+        assert "django_datetime_trunc" in queries.captured_queries[0]["sql"]
+
+    @override_settings(SUMMARY_NATIVE_TRUNC=False)
+    def test_setting_disables_native_trunc(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.grouped(PeriodTrunc("timestamp", kind="day", bounds=self.bounds))
+
+        assert "django_datetime_trunc" in queries.captured_queries[0]["sql"]
+
+    def test_offset_spans_between(self):
+        """Test only the offsets in force during the bounds are returned"""
+        tzinfo = ZoneInfo("America/New_York")
+        winter = utc_offset_spans_between(
+            tzinfo,
+            datetime(2024, 1, 1, tzinfo=UTC),
+            datetime(2024, 2, 1, tzinfo=UTC),
+        )
+        year = utc_offset_spans_between(tzinfo, *self.bounds)
+
+        assert [offset for _, offset in winter] == [-18000]
+        assert [offset for _, offset in year] == [-18000, -14400, -18000]
+        assert year[1][0] == datetime(2024, 3, 10, 7, 0, tzinfo=UTC)
+        assert utc_offset_spans_between(ZoneInfo("UTC"))[0][1] == 0
+
+    @pytest.mark.parametrize("tz", TIMEZONES)
+    @override_settings(SUMMARY_USE_ROLLUPS=False)
+    def test_summary_matches_python_trunc(self, tz):
+        """Test get_summary is unchanged by native truncation"""
+        args = (self.user.id, *self.bounds, "hour")
+        with timezone.override(ZoneInfo(tz)):
+            with override_settings(SUMMARY_NATIVE_TRUNC=False):
+                expected = AggregationService.get_summary(*args)
+            actual = AggregationService.get_summary(*args)
+
+        assert actual == expected
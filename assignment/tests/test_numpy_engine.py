@@ -0,0 +1,81 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from django.test import override_settings
+from django.utils import timezone
+
+from assignment.models import Record, User
+from assignment.services import AggregationService, RollupService
+
+pytest.importorskip("numpy")
+
+
+@pytest.mark.django_db
+class TestNumpyEngine:
+    def setup_method(self):
+        self.user = User.objects.create_user(username="numpyuser")
+        rng = random.Random(42)
+        base_time = timezone.make_aware(datetime(2024, 2, 20, 0, 0, 0))
+        Record.objects.bulk_create(
+            Record(
+                user=self.user,
+                word_count=rng.randint(0, 500),
+                study_time_minutes=rng.choice([0, rng.randint(1, 90)]),
+                timestamp=base_time
+                + timedelta(minutes=rng.randint(0, 60 * 24 * 75), seconds=i),
+                submission_id=f"numpy_{i}",
+            )
+            for i in range(400)
+        )
+        # bulk_create skips the rollup signals
+        RollupService.rebuild(user_id=self.user.id)
+        self.from_date = timezone.make_aware(datetime(2024, 2, 25, 7, 30, 0))
+        self.to_date = timezone.make_aware(datetime(2024, 4, 20, 0, 0, 0))
+
+    def summaries(self, granularity, **options):
+        with override_settings(SUMMARY_ENGINE="orm", SUMMARY_USE_ROLLUPS=False):
+            expected = AggregationService.get_summary(
+                self.user.id, self.from_date, self.to_date, granularity, **options
+            )
+        with override_settings(SUMMARY_ENGINE="numpy"):
+            actual = AggregationService.get_summary(
+                self.user.id, self.from_date, self.to_date, granularity, **options
+            )
+        return expected, actual
+
+    @pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+    def test_matches_orm_engine(self, granularity):
+        """Test the NumPy engine returns exactly the ORM engine's periods"""
+        expected, actual = self.summaries(granularity)
+
+        assert len(actual) > 0
+        assert actual == expected
+
+    @pytest.mark.parametrize("method", ["sma", "ema", "wma"])
+    @pytest.mark.parametrize("window", [1, 4, 10])
+    def test_matches_orm_engine_windows(self, method, window):
+        """Test every moving-average method, including warm-up periods"""
+        expected, actual = self.summaries("day", window=window, method=method)
+
+        assert actual == expected
+
+    @pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+    def test_matches_orm_engine_across_dst(self, granularity):
+        """Test bucketing in a DST timezone (US DST starts 2024-03-10)"""
+        with timezone.override("America/New_York"):
+            expected, actual = self.summaries(granularity)
+
+        assert actual == expected
+
+    def test_empty_range(self):
+        """Test no records in range returns an empty list"""
+        with override_settings(SUMMARY_ENGINE="numpy"):
+            summary = AggregationService.get_summary(
+                self.user.id,
+                timezone.make_aware(datetime(2023, 1, 1)),
+                timezone.make_aware(datetime(2023, 2, 1)),
+                "day",
+            )
+
+        assert summary == []
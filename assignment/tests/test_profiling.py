@@ -0,0 +1,147 @@
+import pstats
+import tracemalloc
+from datetime import datetime
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.middleware import UserCache
+from assignment.models import Record, User
+from assignment.profiling import ProfileBudget, RequestProfile, safe_name
+
+SUMMARY_PARAMS = {
+    "from": "2024-01-01T00:00:00Z",
+    "to": "2024-01-03T00:00:00Z",
+    "granularity": "day",
+}
+
+
+def test_safe_name():
+    assert safe_name("summary") == "summary"
+    assert safe_name("../../etc/passwd") == "_etc_passwd"
+    assert safe_name("") == "_"
+    assert len(safe_name("a" * 100)) == 64
+
+
+@pytest.mark.django_db
+class TestProfilingMiddleware:
+    @pytest.fixture(autouse=True)
+    def profiling_settings(self, tmp_path, settings):
+        settings.PROFILING_ENABLED = True
+        settings.PROFILING_DIR = tmp_path
+        settings.PROFILING_ALLOWED_USERS = ["profiler"]
+        self.directory = tmp_path
+
+    def setup_method(self):
+        ProfileBudget.clear()
+        UserCache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="profiler")
+        User.objects.create_user(username="visitor")
+        Record.objects.create(
+            user=self.user,
+            word_count=10,
+            study_time_minutes=2,
+            timestamp=timezone.make_aware(datetime(2024, 1, 1, 12)),
+            submission_id="profile_1",
+        )
+        self.url = reverse("summary", kwargs={"id": self.user.id})
+
+    def teardown_method(self):
+        ProfileBudget.clear()
+        UserCache.clear()
+
+    def profiled_get(self, username="profiler", **headers):
+        # The mock login only runs for /api paths; log in through the session
+        self.client.force_login(User.objects.get(username=username))
+        return self.client.get(self.url, SUMMARY_PARAMS, HTTP_X_PROFILE="1", **headers)
+
+    def test_header_from_allowed_user(self):
+        """Test an allowed user's request is captured to .prof and allocation files"""
+        response = self.profiled_get(HTTP_X_REQUEST_ID="req-42")
+
+        assert response.status_code == status.HTTP_200_OK
+        name = response["X-Profile"]
+        assert name.endswith("-summary-req-42")
+        stats = pstats.Stats(str(self.directory / f"{name}.prof"))
+        functions = {function for _, _, function in stats.stats}
+        assert "get_summary" in functions
+        assert (self.directory / f"{name}.allocations.txt").read_text()
+        assert not tracemalloc.is_tracing()
+
+    def test_header_with_mock_login_header(self):
+        """Test the profile header works with the mock login header off /api"""
+        response = self.client.get(
+            self.url, SUMMARY_PARAMS, HTTP_X_PROFILE="1", HTTP_X_USER_NAME="profiler"
+        )
+
+        assert "X-Profile" in response
+        assert len(list(self.directory.glob("*.prof"))) == 1
+
+        response = self.client.get(
+            self.url, SUMMARY_PARAMS, HTTP_X_PROFILE="1", HTTP_X_USER_NAME="visitor"
+        )
+        assert "X-Profile" not in response
+
+    def test_header_from_other_user_ignored(self):
+        response = self.profiled_get(username="visitor")
+
+        assert "X-Profile" not in response
+        assert list(self.directory.iterdir()) == []
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_requests(self):
+        """Test sampled requests are captured without the header"""
+        response = self.client.get(self.url, SUMMARY_PARAMS)
+
+        assert "X-Profile" in response
+        assert len(list(self.directory.glob("*.prof"))) == 1
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_MAX_PER_MINUTE=2)
+    def test_captures_capped_per_minute(self):
+        """Test PROFILING_MAX_PER_MINUTE bounds captures however triggered"""
+        responses = [self.client.get(self.url, SUMMARY_PARAMS) for _ in range(4)]
+
+        assert ["X-Profile" in response for response in responses] == [
+            True,
+            True,
+            False,
+            False,
+        ]
+
+    def test_one_capture_at_a_time(self):
+        """Test a request is not captured while another capture is running"""
+        running = RequestProfile()
+        assert running.start()
+        try:
+            response = self.profiled_get()
+        finally:
+            running.stop("running")
+
+        assert "X-Profile" not in response
+        assert response.status_code == status.HTTP_200_OK
+        # The capture that could not start does not count against the budget
+        assert not ProfileBudget._started
+
+    def test_streamed_response_captured_until_exhausted(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            self.url, {**SUMMARY_PARAMS, "stream": "1"}, HTTP_X_PROFILE="1"
+        )
+        name = response["X-Profile"]
+        assert not (self.directory / f"{name}.prof").exists()
+
+        b"".join(response.streaming_content)
+
+        assert (self.directory / f"{name}.prof").exists()
+
+    @override_settings(PROFILING_ENABLED=False)
+    def test_disabled(self):
+        response = self.profiled_get()
+
+        assert "X-Profile" not in response
+        assert list(self.directory.iterdir()) == []
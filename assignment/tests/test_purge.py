@@ -0,0 +1,171 @@
+from datetime import datetime, timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from assignment.cache import RecentSubmissions, SummaryCache
+from assignment.models import Record, RecordRollup, User
+from assignment.services import PurgeService, RollupService
+
+ROLLUP_FIELDS = (
+    "user_id",
+    "granularity",
+    "period",
+    "total_word_count",
+    "total_study_time_minutes",
+    "record_count",
+)
+
+
+def rollups():
+    return sorted(RecordRollup.objects.values_list(*ROLLUP_FIELDS))
+
+
+@pytest.mark.django_db
+class TestPurgeService:
+    def setup_method(self):
+        RecentSubmissions.clear()
+        self.users = [User.objects.create_user(username=f"purge{i}") for i in range(2)]
+        self.start = timezone.make_aware(datetime(2024, 1, 30, 22))
+        for user in self.users:
+            for i in range(40):
+                Record.objects.create(
+                    user=user,
+                    word_count=10 + i,
+                    study_time_minutes=1 + i % 5,
+                    timestamp=self.start + timedelta(hours=5 * i),
+                    submission_id=f"purge_{user.id}_{i}",
+                )
+
+    def teardown_method(self):
+        RecentSubmissions.clear()
+
+    def test_time_range_keeps_rollups_consistent(self):
+        """Test a partial purge leaves rollups equal to a rebuild"""
+        user = self.users[0]
+        from_date = self.start + timedelta(hours=12)
+        to_date = self.start + timedelta(days=4, hours=3)
+        expected = Record.objects.filter(
+            user=user, timestamp__gte=from_date, timestamp__lt=to_date
+        ).count()
+
+        deleted = PurgeService.purge_records(
+            [user.id], from_date=from_date, to_date=to_date, batch_size=7
+        )
+
+        assert deleted == expected
+        assert Record.objects.filter(user=user).count() == 40 - expected
+        assert Record.objects.filter(user=self.users[1]).count() == 40
+        purged = rollups()
+        RollupService.rebuild()
+        assert purged == rollups()
+
+    def test_batches_and_progress(self):
+        """Test each batch is one transaction reported to the progress callback"""
+        reported = []
+
+        with CaptureQueriesContext(connection) as queries:
+            PurgeService.purge_records(
+                [self.users[0].id], batch_size=15, progress=reported.append
+            )
+
+        assert reported == [15, 30, 40]
+        deletes = [
+            q for q in queries if q["sql"].startswith('DELETE FROM "assignment_record"')
+        ]
+        assert len(deletes) == 3
+
+    def test_caches_invalidated(self, django_capture_on_commit_callbacks):
+        """Test purged submissions are forgotten and summaries invalidated"""
+        user = self.users[0]
+        version = SummaryCache.version(user.id)
+        record = Record.objects.filter(user=user).first()
+        other = Record.objects.filter(user=self.users[1]).first()
+        with django_capture_on_commit_callbacks(execute=True):
+            RecentSubmissions.add(record.submission_id, record.id)
+            RecentSubmissions.add(other.submission_id, other.id)
+
+        PurgeService.purge_records([user.id])
+
+        assert SummaryCache.version(user.id) != version
+        assert RecentSubmissions.get(record.submission_id) is None
+        assert RecentSubmissions.get(other.submission_id) == other.id
+
+    def test_many_user_ids(self):
+        """Test more user IDs than SQLite's variable limit are purged in groups"""
+        user_ids = [*range(100_000, 140_000), *(user.id for user in self.users)]
+        reported = []
+
+        with CaptureQueriesContext(connection) as queries:
+            records, users = PurgeService.purge_users(
+                user_ids, batch_size=30, progress=reported.append
+            )
+
+        assert (records, users) == (80, 2)
+        assert reported == [30, 60, 80]
+        assert not Record.objects.exists()
+        assert max(q["sql"].count(",") for q in queries) < 1000
+
+    def test_purge_users(self):
+        records, users = PurgeService.purge_users([self.users[0].id], batch_size=25)
+
+        assert (records, users) == (40, 1)
+        assert list(User.objects.all()) == [self.users[1]]
+        assert not RecordRollup.objects.filter(user_id=self.users[0].id).exists()
+        assert Record.objects.count() == 40
+
+    def test_purge_all_users(self):
+        assert PurgeService.purge_users() == (80, 2)
+        assert not RecordRollup.objects.exists()
+
+
+@pytest.mark.django_db
+class TestPurgeDataCommand:
+    def setup_method(self):
+        self.user = User.objects.create_user(username="purgecmd")
+        for day in range(1, 5):
+            Record.objects.create(
+                user=self.user,
+                word_count=day,
+                study_time_minutes=1,
+                timestamp=timezone.make_aware(datetime(2024, 3, day, 12)),
+                submission_id=f"purgecmd_{day}",
+            )
+
+    def purge(self, *args):
+        out = StringIO()
+        call_command("purge_data", *args, stdout=out)
+        return out.getvalue()
+
+    def test_range(self):
+        output = self.purge(
+            "--user-id", str(self.user.id), "--from", "2024-03-02", "--to", "2024-03-04"
+        )
+
+        assert "Deleted 2 records and 0 users" in output
+        assert sorted(Record.objects.values_list("word_count", flat=True)) == [1, 4]
+
+    def test_delete_users(self):
+        output = self.purge("--all", "--delete-users", "--batch-size", "3")
+
+        assert "3 records deleted" in output
+        assert "Deleted 4 records and 1 users" in output
+        assert not User.objects.exists()
+
+    @pytest.mark.parametrize(
+        "args",
+        [
+            (),
+            ("--all", "--user-id", "1"),
+            ("--all", "--delete-users", "--from", "2024-03-02"),
+        ],
+    )
+    def test_invalid_arguments(self, args):
+        with pytest.raises(CommandError):
+            self.purge(*args)
+
+        assert Record.objects.count() == 4
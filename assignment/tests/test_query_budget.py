@@ -0,0 +1,192 @@
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.cache import RecentSubmissions
+from assignment.middleware import UserCache
+from assignment.models import Record, User
+
+# Maximum number of queries per request, savepoints included. Raising one of
+# these should be a deliberate decision, not the side effect of an
+# innocent-looking change.
+# User lookup, savepoint, insert, one rollup upsert for all granularities and
+# the savepoint release
+RECORD_CREATE_BUDGET = 5
+# User lookup, rejected insert and the lookup of the existing record
+RECORD_DUPLICATE_BUDGET = 6
+# User lookup, partial edge periods, then the history and range queries from
+# rollups or records. The same for any window.
+SUMMARY_BUDGET = {True: 4, False: 4}
+SUMMARY_UNKNOWN_USER_BUDGET = 1
+USER_ME_BUDGET = 1
+
+SUMMARY_PARAMS = {"from": "2024-01-03T00:00:00Z", "to": "2024-01-12T00:00:00Z"}
+
+
+@pytest.mark.django_db
+class TestQueryBudget:
+    def setup_method(self):
+        RecentSubmissions.clear()
+        UserCache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="budgetuser", email="budget@example.com"
+        )
+        base_time = timezone.make_aware(datetime(2024, 1, 1, 0, 20, 0))
+        for i in range(40):
+            Record.objects.create(
+                user=self.user,
+                word_count=10 + i,
+                study_time_minutes=i % 7,
+                timestamp=base_time + timedelta(hours=7 * i),
+                submission_id=f"budget_{i}",
+            )
+        self.record_data = {
+            "user_id": self.user.id,
+            "word_count": 25,
+            "study_time_minutes": 5,
+            "timestamp": "2024-02-01T10:00:00Z",
+        }
+
+    def teardown_method(self):
+        RecentSubmissions.clear()
+        UserCache.clear()
+
+    def request(self, method, url, **kwargs):
+        """
+        Runs one request and returns (response, queries), checking that the
+        query count header agrees with the queries actually executed.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, **kwargs)
+        assert int(response["X-DB-Query-Count"]) == len(queries)
+        assert float(response["X-DB-Time-Ms"]) >= 0
+        return response, len(queries)
+
+    def test_record_create(self):
+        """Test creating a record stays within its query budget"""
+        response, queries = self.request(
+            "post", reverse("records_json"), data=self.record_data, format="json"
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert queries <= RECORD_CREATE_BUDGET
+
+    def test_record_duplicate(self):
+        """Test a duplicate unknown to the in-memory filter stays within budget"""
+        self.client.post(reverse("records_json"), self.record_data, format="json")
+
+        response, queries = self.request(
+            "post", reverse("records_json"), data=self.record_data, format="json"
+        )
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert queries <= RECORD_DUPLICATE_BUDGET
+
+    @pytest.mark.parametrize("use_rollups", [True, False])
+    @pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+    def test_summary(self, granularity, use_rollups):
+        """Test a summary is one user lookup plus a fixed number of queries"""
+        params = {**SUMMARY_PARAMS, "granularity": granularity}
+        with override_settings(
+            SUMMARY_USE_ROLLUPS=use_rollups, SUMMARY_CACHE_ENABLED=False
+        ):
+            response, queries = self.request(
+                "get", reverse("summary", kwargs={"id": self.user.id}), data=params
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["summary"]
+        assert queries <= SUMMARY_BUDGET[use_rollups]
+
+    @pytest.mark.parametrize("engine", ["orm", "sql_window"])
+    @pytest.mark.parametrize("use_rollups", [True, False])
+    def test_summary_large_window(self, use_rollups, engine):
+        """Test the warm-up before the range is fetched in one query"""
+        params = {**SUMMARY_PARAMS, "granularity": "hour", "window": 365}
+        with override_settings(
+            SUMMARY_USE_ROLLUPS=use_rollups,
+            SUMMARY_CACHE_ENABLED=False,
+            SUMMARY_ENGINE=engine,
+        ):
+            response, queries = self.request(
+                "get", reverse("summary", kwargs={"id": self.user.id}), data=params
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data["summary"]
+        assert queries <= SUMMARY_BUDGET[use_rollups]
+
+    @override_settings(SUMMARY_CACHE_ENABLED=False)
+    def test_summary_unknown_user(self):
+        """Test an unknown user is rejected after a single lookup"""
+        response, queries = self.request(
+            "get",
+            reverse("summary", kwargs={"id": 9999}),
+            data={**SUMMARY_PARAMS, "granularity": "day"},
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert queries <= SUMMARY_UNKNOWN_USER_BUDGET
+
+    def test_user_me(self):
+        """Test /api/v1/user/me/ stays within its query budget"""
+        response, queries = self.request(
+            "get", reverse("user-me"), HTTP_X_USER_NAME="budgetuser"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert queries <= USER_ME_BUDGET
+
+
+@pytest.mark.django_db
+class TestQueryCountMiddleware:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="statsuser")
+
+    def test_logs_query_stats(self, caplog):
+        """Test each request logs its query count and database time"""
+        with caplog.at_level(logging.INFO, logger="assignment.middleware"):
+            response = self.client.get(
+                reverse("summary", kwargs={"id": self.user.id}),
+                {**SUMMARY_PARAMS, "granularity": "day"},
+            )
+
+        records = [r for r in caplog.records if hasattr(r, "db_queries")]
+        assert len(records) == 1
+        assert records[0].db_queries == int(response["X-DB-Query-Count"])
+        assert records[0].db_time_ms >= 0
+        assert records[0].path == reverse("summary", kwargs={"id": self.user.id})
+
+    def test_streamed_response_logged_when_consumed(self, caplog):
+        """Test streamed responses are measured until the stream is exhausted"""
+        url = reverse("summary", kwargs={"id": self.user.id})
+        with caplog.at_level(logging.INFO, logger="assignment.middleware"):
+            response = self.client.get(
+                url, {**SUMMARY_PARAMS, "granularity": "day", "stream": "1"}
+            )
+            assert not any(hasattr(r, "db_queries") for r in caplog.records)
+            b"".join(response.streaming_content)
+
+        records = [r for r in caplog.records if hasattr(r, "db_queries")]
+        assert len(records) == 1
+        assert records[0].db_queries >= 1
+        assert "X-DB-Query-Count" not in response
+        assert not connection.execute_wrappers
+
+    @override_settings(QUERY_STATS_ENABLED=False)
+    def test_disabled(self):
+        """Test QUERY_STATS_ENABLED = False leaves responses untouched"""
+        response = self.client.get(reverse("summary", kwargs={"id": self.user.id}))
+
+        assert "X-DB-Query-Count" not in response
+        assert not connection.execute_wrappers
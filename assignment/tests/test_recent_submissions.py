@@ -0,0 +1,131 @@
+from datetime import UTC, datetime
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.cache import RecentSubmissions
+from assignment.models import Record, User
+from assignment.services import build_submission_id
+
+
+@pytest.mark.django_db
+class TestIdempotentInsert:
+    def setup_method(self):
+        RecentSubmissions.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="retryuser")
+        self.data = {
+            "user_id": self.user.id,
+            "word_count": 42,
+            "study_time_minutes": 7,
+            "timestamp": "2024-06-01T09:30:00Z",
+        }
+        self.submission_id = build_submission_id(
+            self.user.id, datetime(2024, 6, 1, 9, 30, tzinfo=UTC), 42, 7
+        )
+
+    def teardown_method(self):
+        RecentSubmissions.clear()
+
+    def post(self):
+        return self.client.post(reverse("records_json"), self.data, format="json")
+
+    def test_new_submission_does_not_read_records(self):
+        """Test a new submission is inserted without a duplicate lookup"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post()
+
+        assert response.status_code == status.HTTP_201_CREATED
+        record_reads = [
+            q["sql"]
+            for q in queries.captured_queries
+            if q["sql"].startswith("SELECT") and '"assignment_record"' in q["sql"]
+        ]
+        assert record_reads == []
+
+    def test_duplicate_caught_by_unique_index(self):
+        """Test a duplicate missed by the filter returns the existing record"""
+        existing = Record.objects.create(
+            user=self.user,
+            word_count=42,
+            study_time_minutes=7,
+            timestamp=datetime(2024, 6, 1, 9, 30, tzinfo=UTC),
+            submission_id=self.submission_id,
+        )
+
+        response = self.post()
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.data["id"] == existing.id
+        assert Record.objects.count() == 1
+
+    def test_retry_answered_from_memory(
+        self, django_capture_on_commit_callbacks, django_assert_num_queries
+    ):
+        """Test a retried submission is answered with one existence check"""
+        with django_capture_on_commit_callbacks(execute=True):
+            first = self.post()
+
+        with django_assert_num_queries(1):
+            retry = self.post()
+
+        assert retry.status_code == status.HTTP_201_CREATED
+        assert retry.data == first.data
+        assert Record.objects.count() == 1
+
+    def test_uncommitted_insert_not_remembered(self):
+        """Test submissions are only remembered once their transaction commits"""
+        self.post()
+
+        assert RecentSubmissions.get(self.submission_id) is None
+
+    def test_deleted_record_forgotten(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self.post()
+        assert RecentSubmissions.get(self.submission_id) == response.data["id"]
+
+        Record.objects.all().delete()
+
+        assert RecentSubmissions.get(self.submission_id) is None
+        assert self.post().data["id"] != response.data["id"]
+
+    def test_record_deleted_elsewhere_stored_again(
+        self, django_capture_on_commit_callbacks
+    ):
+        """Test an entry outliving a purge in another process is not trusted"""
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self.post()
+        # A DELETE from another process sends no signal to this one
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM assignment_record")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            retry = self.post()
+
+        assert retry.status_code == status.HTTP_201_CREATED
+        assert retry.data["id"] != response.data["id"]
+        assert Record.objects.filter(id=retry.data["id"]).exists()
+        assert RecentSubmissions.get(self.submission_id) == retry.data["id"]
+
+    @override_settings(RECENT_SUBMISSIONS_SIZE=1)
+    def test_filter_is_bounded(self, django_capture_on_commit_callbacks):
+        """Test newer submissions overwrite older ones in a full table"""
+        with django_capture_on_commit_callbacks(execute=True):
+            RecentSubmissions.add("a" * 64, 1)
+            RecentSubmissions.add("b" * 64, 2)
+
+        assert RecentSubmissions.get("a" * 64) is None
+        assert RecentSubmissions.get("b" * 64) == 2
+        assert len(RecentSubmissions._slots) == 1
+
+    @override_settings(RECENT_SUBMISSIONS_SIZE=0)
+    def test_filter_disabled(self, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            self.post()
+
+        assert RecentSubmissions.get(self.submission_id) is None
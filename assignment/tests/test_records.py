@@ -4,7 +4,8 @@ from rest_framework import status
 from rest_framework.test import APIClient
 from datetime import datetime, timedelta
 from django.utils import timezone
-from assignment.models import User, Record
+from assignment.models import User, Record, RecordRollup
+from assignment.services import RecordIngestService
 import json
 
 @pytest.mark.django_db
@@ -642,3 +643,119 @@ class TestSummaryView:
         
         assert response.status_code == status.HTTP_200_OK
         assert response.data['summary'] == []  # Should return empty list, not error
+
+
+@pytest.mark.django_db
+class TestRecordBatchView:
+    """Test cases for recordsjson/batch endpoint"""
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username='batchuser')
+        self.url = reverse('records_json_batch')
+
+    def make_items(self, count):
+        return [
+            {
+                'user_id': self.user.id,
+                'word_count': 100 + i,
+                'study_time_minutes': 30,
+                'timestamp': f'2024-01-01T{i % 24:02d}:{i % 60:02d}:00Z'
+            } for i in range(count)
+        ]
+
+    def test_batch_create_json_array(self):
+        """Test batch creation from a JSON array"""
+        items = self.make_items(10)
+
+        response = self.client.post(self.url, items, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 10
+        assert response.data['duplicates'] == 0
+        assert response.data['errors'] == 0
+        assert [r['status'] for r in response.data['results']] == ['created'] * 10
+        assert Record.objects.filter(user=self.user).count() == 10
+
+        ids = {r['id'] for r in response.data['results']}
+        assert ids == set(Record.objects.filter(user=self.user).values_list('id', flat=True))
+
+    def test_batch_create_ndjson(self):
+        """Test batch creation from an NDJSON body"""
+        items = self.make_items(3)
+        body = '\n'.join(json.dumps(item) for item in items) + '\n\n'
+
+        response = self.client.post(self.url, body, content_type='application/x-ndjson')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 3
+
+    def test_batch_duplicates_match_single_endpoint(self):
+        """Test duplicates against existing records and within the batch"""
+        items = self.make_items(2)
+        single = self.client.post(reverse('records_json'), items[0], format='json')
+
+        response = self.client.post(self.url, items + [items[1]], format='json')
+
+        results = response.data['results']
+        assert results[0] == {'index': 0, 'status': 'duplicate', 'id': single.data['id']}
+        assert results[1]['status'] == 'created'
+        assert results[2] == {'index': 2, 'status': 'duplicate', 'id': results[1]['id']}
+        assert Record.objects.filter(user=self.user).count() == 2
+
+    def test_batch_per_item_errors(self):
+        """Test invalid items are reported without rejecting the batch"""
+        items = self.make_items(1) + [
+            {'user_id': 9999, 'word_count': 1, 'study_time_minutes': 1},
+            {'user_id': self.user.id, 'word_count': -1, 'study_time_minutes': 1},
+        ]
+
+        response = self.client.post(self.url, items, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 1
+        assert response.data['errors'] == 2
+        assert 'user_id' in response.data['results'][1]['errors']
+        assert 'word_count' in response.data['results'][2]['errors']
+
+    def test_batch_updates_rollups(self):
+        """Test bulk inserted records are reflected in summaries"""
+        self.client.post(self.url, self.make_items(5), format='json')
+
+        response = self.client.get(
+            reverse('summary', kwargs={'id': self.user.id}),
+            {'from': '2024-01-01T00:00:00Z', 'to': '2024-01-02T00:00:00Z', 'granularity': 'day'}
+        )
+
+        assert response.data['summary'][0]['record_count'] == 5
+        assert response.data['summary'][0]['total_word_count'] == sum(range(100, 105))
+
+    def test_batch_concurrent_insert_is_duplicate(self, monkeypatch):
+        """Test a row inserted by another request mid-batch is not counted twice"""
+        items = self.make_items(1)
+        insert_new = RecordIngestService._insert_new
+        # Both inserts stamp the same created_at
+        now = timezone.now()
+        monkeypatch.setattr(timezone, 'now', lambda: now)
+
+        def insert_concurrently(records):
+            # Lands between the request's parsing and its own insert
+            other = self.client.post(reverse('records_json'), items[0], format='json')
+            self.concurrent_id = other.data['id']
+            return insert_new(records)
+
+        monkeypatch.setattr(RecordIngestService, '_insert_new', insert_concurrently)
+        response = self.client.post(self.url, items, format='json')
+
+        assert response.data['results'][0] == {
+            'index': 0, 'status': 'duplicate', 'id': self.concurrent_id
+        }
+        assert Record.objects.filter(user=self.user).count() == 1
+        rollups = RecordRollup.objects.filter(user=self.user)
+        assert {rollup.record_count for rollup in rollups} == {1}
+
+    def test_batch_rejects_non_list_body(self):
+        """Test a single object body is rejected"""
+        response = self.client.post(self.url, self.make_items(1)[0], format='json')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'error' in response.data
@@ -0,0 +1,121 @@
+import pytest
+from datetime import datetime, timedelta
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.models import Record, RecordRollup, User
+from assignment.services import AggregationService
+
+
+def make_record(user, timestamp, word_count, study_time_minutes, suffix):
+    return Record.objects.create(
+        user=user,
+        word_count=word_count,
+        study_time_minutes=study_time_minutes,
+        timestamp=timestamp,
+        submission_id=f"rollup_{user.id}_{suffix}",
+    )
+
+
+@pytest.mark.django_db
+class TestRecordRollups:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="rollupuser")
+        base_time = timezone.make_aware(datetime(2024, 1, 30, 22, 15, 0))
+        for i in range(12):
+            make_record(
+                self.user,
+                base_time + timedelta(hours=7 * i, minutes=i),
+                100 + i,
+                20 + i,
+                i,
+            )
+
+    def test_rollups_updated_on_serializer_insert(self):
+        """Records created through /recordsjson land in every rollup granularity"""
+        new_user = User.objects.create_user(username="serializeruser")
+        response = self.client.post(
+            reverse("records_json"),
+            {
+                "user_id": new_user.id,
+                "word_count": 40,
+                "study_time_minutes": 10,
+                "timestamp": "2024-03-05T08:30:00Z",
+            },
+            format="json",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+        rollups = RecordRollup.objects.filter(user=new_user)
+        assert {r.granularity for r in rollups} == {"hour", "day", "month"}
+        for rollup in rollups:
+            assert rollup.total_word_count == 40
+            assert rollup.total_study_time_minutes == 10
+            assert rollup.record_count == 1
+
+        # A duplicate submission must not be counted twice
+        self.client.post(
+            reverse("records_json"),
+            {
+                "user_id": new_user.id,
+                "word_count": 40,
+                "study_time_minutes": 10,
+                "timestamp": "2024-03-05T08:30:00Z",
+            },
+            format="json",
+        )
+        assert (
+            RecordRollup.objects.get(user=new_user, granularity="day").record_count == 1
+        )
+
+    def test_rollups_updated_on_delete(self):
+        """Deleting records removes them from the rollups"""
+        Record.objects.filter(user=self.user).delete()
+        assert not RecordRollup.objects.filter(user=self.user).exists()
+
+    @pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+    @pytest.mark.parametrize(
+        "from_date,to_date",
+        [
+            ("2024-01-01T00:00:00Z", "2024-03-01T00:00:00Z"),
+            ("2024-01-31T03:20:00Z", "2024-02-02T17:45:00Z"),
+            ("2024-01-31T05:00:00Z", "2024-01-31T05:59:59Z"),
+        ],
+    )
+    def test_rollup_summary_matches_raw_summary(self, granularity, from_date, to_date):
+        """Rollup-backed summaries match a full scan of the raw records"""
+        from_date = datetime.fromisoformat(from_date)
+        to_date = datetime.fromisoformat(to_date)
+
+        with override_settings(SUMMARY_USE_ROLLUPS=False):
+            expected = AggregationService.get_summary(
+                self.user.id, from_date, to_date, granularity
+            )
+        actual = AggregationService.get_summary(
+            self.user.id, from_date, to_date, granularity
+        )
+
+        assert actual == expected
+
+    def test_rebuild_rollups_command(self):
+        """rebuild_rollups restores rollups from the raw records"""
+        expected = sorted(
+            RecordRollup.objects.filter(user=self.user).values_list(
+                "granularity", "period", "total_word_count", "record_count"
+            )
+        )
+        RecordRollup.objects.all().delete()
+
+        call_command("rebuild_rollups", user_id=self.user.id)
+
+        actual = sorted(
+            RecordRollup.objects.filter(user=self.user).values_list(
+                "granularity", "period", "total_word_count", "record_count"
+            )
+        )
+        assert actual == expected
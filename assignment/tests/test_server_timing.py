@@ -0,0 +1,151 @@
+import logging
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment import timing
+from assignment.models import Record, User
+from assignment.timing import ServerTiming
+
+SUMMARY_PARAMS = {
+    "from": "2024-01-02T00:00:00Z",
+    "to": "2024-01-10T00:00:00Z",
+    "granularity": "day",
+}
+
+
+def parse_server_timing(header):
+    metrics = {}
+    for metric in header.split(", "):
+        name, duration = metric.split(";dur=")
+        metrics[name] = float(duration)
+    return metrics
+
+
+class TestServerTiming:
+    def test_nested_phases_are_exclusive(self):
+        """Test time spent in a nested phase is not counted for its parent"""
+        timer = ServerTiming()
+        with timer.phase("outer"):
+            time.sleep(0.01)
+            with timer.phase("inner"):
+                time.sleep(0.02)
+
+        durations = timer.milliseconds()
+        assert 10 <= durations["outer"] < 20
+        assert durations["inner"] >= 20
+
+    def test_iterate_times_item_production(self):
+        """Test iterate() counts producing items, not consuming them"""
+
+        def produce():
+            for i in range(3):
+                time.sleep(0.005)
+                yield i
+
+        timer = ServerTiming()
+        for _ in timer.iterate("produce", produce()):
+            time.sleep(0.01)
+
+        assert 15 <= timer.milliseconds()["produce"] < 30
+
+    def test_hooks_without_timer(self):
+        """Test the module-level hooks are no-ops without an active timer"""
+        items = [1, 2, 3]
+
+        assert timing.iterate("sql", items) is items
+        assert timing.phase("sql") is timing.phase("render")
+
+    def test_hooks_record_on_active_timer(self):
+        timer = ServerTiming()
+        with timer.activate():
+            with timing.phase("parse"):
+                pass
+            list(timing.iterate("sql", range(3)))
+
+        assert set(timer.milliseconds()) == {"parse", "sql"}
+        assert timing.iterate("sql", []) == []
+
+
+@pytest.mark.django_db
+class TestServerTimingMiddleware:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="timinguser")
+        base_time = timezone.make_aware(datetime(2024, 1, 1, 8, 0, 0))
+        for i in range(20):
+            Record.objects.create(
+                user=self.user,
+                word_count=10 + i,
+                study_time_minutes=5,
+                timestamp=base_time + timedelta(hours=11 * i),
+                submission_id=f"timing_{i}",
+            )
+        self.url = reverse("summary", kwargs={"id": self.user.id})
+
+    @pytest.mark.parametrize("use_rollups", [True, False])
+    @override_settings(SUMMARY_CACHE_ENABLED=False)
+    def test_summary_phases(self, use_rollups):
+        """Test a summary reports each phase and the total"""
+        with override_settings(SUMMARY_USE_ROLLUPS=use_rollups):
+            response = self.client.get(self.url, SUMMARY_PARAMS)
+
+        assert response.status_code == status.HTTP_200_OK
+        metrics = parse_server_timing(response["Server-Timing"])
+        assert list(metrics) == ["parse", "user", "metrics", "sql", "render", "total"]
+        phases = sum(ms for name, ms in metrics.items() if name != "total")
+        assert phases <= metrics["total"] + 0.05
+
+    def test_cache_hit_phases(self):
+        """Test a cached summary reports the cache lookup instead of the work"""
+        self.client.get(self.url, SUMMARY_PARAMS)
+        response = self.client.get(self.url, SUMMARY_PARAMS)
+
+        metrics = parse_server_timing(response["Server-Timing"])
+        assert set(metrics) == {"parse", "cache", "render", "total"}
+
+    def test_log_fields(self, caplog):
+        """Test each phase is logged as its own field"""
+        with caplog.at_level(logging.INFO, logger="assignment.middleware"):
+            self.client.get(self.url, SUMMARY_PARAMS)
+
+        records = [r for r in caplog.records if hasattr(r, "total_ms")]
+        assert len(records) == 1
+        assert records[0].parse_ms >= 0
+        assert records[0].sql_ms >= 0
+        assert records[0].render_ms >= 0
+
+    def test_streamed_summary(self, caplog):
+        """Test streamed summaries time the phases run while streaming"""
+        with caplog.at_level(logging.INFO, logger="assignment.middleware"):
+            response = self.client.get(self.url, {**SUMMARY_PARAMS, "stream": "1"})
+            b"".join(response.streaming_content)
+
+        assert set(parse_server_timing(response["Server-Timing"])) == {
+            "parse",
+            "user",
+        }
+        records = [r for r in caplog.records if hasattr(r, "total_ms")]
+        assert len(records) == 1
+        for field in ("metrics_ms", "sql_ms", "render_ms"):
+            assert getattr(records[0], field) >= 0
+
+    def test_untimed_endpoints_have_no_header(self):
+        """Test requests that record no phase get no Server-Timing header"""
+        response = self.client.get(reverse("user-me"), HTTP_X_USER_NAME="timinguser")
+
+        assert "Server-Timing" not in response
+
+    @override_settings(SERVER_TIMING_ENABLED=False)
+    def test_disabled(self):
+        """Test SERVER_TIMING_ENABLED = False sends no header"""
+        response = self.client.get(self.url, SUMMARY_PARAMS)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "Server-Timing" not in response
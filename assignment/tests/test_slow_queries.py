@@ -0,0 +1,112 @@
+from datetime import datetime
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.models import Record, User
+from assignment.slow_queries import SlowQueryLog, SlowQueryWrapper, explain
+
+SUMMARY_PARAMS = {
+    "from": "2024-01-01T00:00:00Z",
+    "to": "2024-01-03T00:00:00Z",
+    "granularity": "day",
+}
+
+
+@pytest.mark.django_db
+class TestSlowQueryLog:
+    @pytest.fixture(autouse=True)
+    def log_settings(self, tmp_path, settings):
+        settings.SLOW_QUERY_LOG_FILE = tmp_path / "slow_queries.log"
+        settings.SLOW_QUERY_THRESHOLD_MS = 0
+        self.directory = tmp_path
+
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="slowuser")
+        Record.objects.create(
+            user=self.user,
+            word_count=10,
+            study_time_minutes=2,
+            timestamp=timezone.make_aware(datetime(2024, 1, 1, 12)),
+            submission_id="slow_1",
+        )
+
+    def test_request_queries_logged_with_view_and_plan(self):
+        """Test slow queries are logged with params, view and query plan"""
+        url = reverse("summary", kwargs={"id": self.user.id})
+        response = self.client.get(url, SUMMARY_PARAMS)
+        assert response.status_code == status.HTTP_200_OK
+
+        entries = list(SlowQueryLog.read())
+
+        assert entries
+        user_lookup = next(e for e in entries if '"assignment_user"' in e["sql"])
+        assert user_lookup["view"] == "assignment.views.SummaryView"
+        assert user_lookup["request"].startswith(f"GET {url}?")
+        assert user_lookup["params"] == [self.user.id]
+        assert user_lookup["plan"]
+        assert not any(e["sql"].startswith("EXPLAIN") for e in entries)
+
+    def test_failed_explain_leaves_transaction_usable(self):
+        """Test a statement that cannot be explained is rolled back to a savepoint"""
+        with transaction.atomic():
+            plan = explain(connection, "SELECT * FROM missing_table", [])
+
+            assert plan is None
+            assert User.objects.filter(username="slowuser").exists()
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=10_000)
+    def test_fast_queries_not_logged(self):
+        self.client.get(reverse("summary", kwargs={"id": self.user.id}), SUMMARY_PARAMS)
+
+        assert list(SlowQueryLog.read()) == []
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=None)
+    def test_disabled(self):
+        self.client.get(reverse("summary", kwargs={"id": self.user.id}), SUMMARY_PARAMS)
+
+        assert not (self.directory / "slow_queries.log").exists()
+
+    @override_settings(SLOW_QUERY_LOG_MAX_BYTES=1000, SLOW_QUERY_LOG_BACKUP_COUNT=50)
+    def test_log_rotates(self):
+        """Test the log rotates and is read back across rotated files in order"""
+        wrapper = SlowQueryWrapper(0, caller=lambda: {"view": "test"})
+        with connection.execute_wrapper(wrapper):
+            for word_count in range(10):
+                Record.objects.filter(word_count=word_count).count()
+
+        entries = list(SlowQueryLog.read())
+
+        assert len(list(self.directory.glob("slow_queries.log.*"))) > 1
+        assert [entry["params"][0] for entry in entries] == list(range(10))
+
+    def test_report_flags_full_scans(self):
+        """Test the report ranks statements and flags unindexed scans"""
+        wrapper = SlowQueryWrapper(0, caller=lambda: {"view": "test"})
+        with connection.execute_wrapper(wrapper):
+            Record.objects.filter(word_count=10).count()
+            Record.objects.filter(word_count=10).count()
+            Record.objects.filter(user=self.user).exists()
+
+        out = StringIO()
+        call_command("slow_query_report", "--full-scans", stdout=out)
+        report = out.getvalue()
+
+        assert report.count("FULL SCAN") == 1
+        assert report.startswith("2x")
+        assert '"word_count" = %s' in report
+        assert "SCAN assignment_record" in report
+
+    def test_report_without_entries(self):
+        out = StringIO()
+        call_command("slow_query_report", stdout=out)
+
+        assert "No slow queries logged" in out.getvalue()
@@ -0,0 +1,77 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from assignment.models import Record, User
+from assignment.services import AggregationService
+
+
+@pytest.mark.django_db
+class TestSqlWindowEngine:
+    def setup_method(self):
+        self.user = User.objects.create_user(username="windowsqluser")
+        rng = random.Random(3)
+        base_time = timezone.make_aware(datetime(2024, 1, 1, 0, 0, 0))
+        for i in range(150):
+            Record.objects.create(
+                user=self.user,
+                word_count=rng.randint(0, 400),
+                study_time_minutes=rng.randint(0, 60),
+                timestamp=base_time
+                + timedelta(minutes=rng.randint(0, 60 * 24 * 120), seconds=i),
+                submission_id=f"sqlwindow_{i}",
+            )
+
+    def summaries(self, from_date, to_date, granularity, window):
+        from_date = timezone.make_aware(from_date)
+        to_date = timezone.make_aware(to_date)
+        with override_settings(SUMMARY_ENGINE="orm", SUMMARY_USE_ROLLUPS=False):
+            expected = AggregationService.get_summary(
+                self.user.id, from_date, to_date, granularity, window=window
+            )
+        with override_settings(SUMMARY_ENGINE="sql_window"):
+            actual = AggregationService.get_summary(
+                self.user.id, from_date, to_date, granularity, window=window
+            )
+        return expected, actual
+
+    @pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+    @pytest.mark.parametrize("window", [1, 3, 8])
+    def test_matches_python_moving_average(self, granularity, window):
+        """Test database window sums match the Python implementation exactly"""
+        expected, actual = self.summaries(
+            datetime(2024, 2, 10, 13, 30), datetime(2024, 4, 1), granularity, window
+        )
+
+        assert len(actual) > 0
+        assert actual == expected
+
+    def test_range_without_history(self):
+        """Test the first periods stay None without enough earlier data"""
+        expected, actual = self.summaries(
+            datetime(2023, 12, 1), datetime(2024, 1, 3), "day", 3
+        )
+
+        assert actual == expected
+        assert actual[0]["moving_avg_word_count"] is None
+
+    def test_moving_average_computed_in_sql(self):
+        """Test the grouped query carries the window frame"""
+        with override_settings(SUMMARY_ENGINE="sql_window"):
+            with CaptureQueriesContext(connection) as queries:
+                AggregationService.get_summary(
+                    self.user.id,
+                    timezone.make_aware(datetime(2024, 2, 1)),
+                    timezone.make_aware(datetime(2024, 3, 1)),
+                    "day",
+                )
+
+        assert any(
+            "ROWS BETWEEN 2 PRECEDING AND CURRENT ROW" in query["sql"]
+            for query in queries.captured_queries
+        )
@@ -0,0 +1,78 @@
+import hashlib
+from datetime import UTC, datetime
+
+import pytest
+from django.db import connection
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.models import Record, User, submission_digest
+from assignment.services import build_submission_id
+
+
+def test_submission_digest():
+    """Test hex digests are halved and other strings are hashed"""
+    hex_digest = hashlib.sha256(b"record").hexdigest()
+
+    assert submission_digest(hex_digest) == bytes.fromhex(hex_digest)[:16]
+    assert submission_digest("sub_1_2") == hashlib.sha256(b"sub_1_2").digest()[:16]
+    assert submission_digest("z" * 64) == hashlib.sha256(b"z" * 64).digest()[:16]
+    assert submission_digest(b"\x00" * 16) == b"\x00" * 16
+    assert submission_digest(memoryview(b"\x01" * 16)) == b"\x01" * 16
+    assert submission_digest(None) is None
+
+
+@pytest.mark.django_db
+class TestBinarySubmissionId:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="digestuser")
+
+    def test_stored_as_16_bytes(self):
+        """Test records store the compact digest and can be found by hex ID"""
+        timestamp = datetime(2024, 5, 1, 12, tzinfo=UTC)
+        hex_id = build_submission_id(self.user.id, timestamp, 10, 5)
+        record = Record.objects.create(
+            user=self.user,
+            word_count=10,
+            study_time_minutes=5,
+            timestamp=timestamp,
+            submission_id=hex_id,
+        )
+        record.refresh_from_db()
+
+        assert record.submission_id == bytes.fromhex(hex_id)[:16]
+        assert Record.objects.get(submission_id=hex_id) == record
+        assert Record.objects.filter(submission_id__in=[hex_id, "other"]).count() == 1
+
+    def test_duplicate_submission_returns_existing_record(self):
+        """Test the serializer still deduplicates identical submissions"""
+        data = {
+            "user_id": self.user.id,
+            "word_count": 30,
+            "study_time_minutes": 6,
+            "timestamp": "2024-05-01T12:00:00Z",
+        }
+        first = self.client.post(reverse("records_json"), data, format="json")
+        second = self.client.post(reverse("records_json"), data, format="json")
+
+        assert first.status_code == status.HTTP_201_CREATED
+        assert second.data["id"] == first.data["id"]
+        assert Record.objects.filter(user=self.user).count() == 1
+
+    def test_single_submission_id_index(self):
+        """Test submission_id is covered by exactly one (unique) index"""
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, Record._meta.db_table
+            )
+
+        indexes = [
+            constraint
+            for constraint in constraints.values()
+            if "submission_id" in constraint["columns"]
+        ]
+        assert len(indexes) == 1
+        assert indexes[0]["unique"]
+        assert indexes[0]["columns"] == ["submission_id"]
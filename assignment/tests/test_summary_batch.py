@@ -0,0 +1,105 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.models import Record, User
+
+
+def read_json(response):
+    return json.loads(b"".join(response.streaming_content))
+
+
+@pytest.mark.django_db
+class TestSummaryBatchView:
+    def setup_method(self):
+        self.client = APIClient()
+        self.url = reverse("summary_batch")
+        base_time = timezone.make_aware(datetime(2024, 1, 1, 10, 30, 0))
+        self.users = []
+        for u in range(4):
+            user = User.objects.create_user(
+                username=f"batchsummary{u}", email=f"batch{u}@example.com"
+            )
+            self.users.append(user)
+            # The first user has no records
+            for i in range(u * 3):
+                Record.objects.create(
+                    user=user,
+                    word_count=10 * (u + 1) + i,
+                    study_time_minutes=5 + i,
+                    timestamp=base_time + timedelta(hours=13 * i),
+                    submission_id=f"batchsummary_{u}_{i}",
+                )
+        self.params = {
+            "from": "2024-01-01T06:00:00Z",
+            "to": "2024-01-05T12:00:00Z",
+            "granularity": "day",
+        }
+
+    def single_summary(self, user):
+        response = self.client.get(
+            reverse("summary", kwargs={"id": user.id}), self.params
+        )
+        return json.loads(response.content)["summary"]
+
+    @pytest.mark.parametrize("use_rollups", [True, False])
+    def test_matches_single_user_endpoint(self, use_rollups):
+        """Test every user's summary equals /users/<id>/summary"""
+        with override_settings(SUMMARY_USE_ROLLUPS=use_rollups):
+            response = self.client.post(
+                self.url,
+                {**self.params, "user_ids": [u.id for u in self.users] + [9999]},
+                format="json",
+            )
+
+            assert response.status_code == status.HTTP_200_OK
+            data = read_json(response)
+            assert list(data["users"]) == [str(u.id) for u in self.users]
+            for user in self.users:
+                entry = data["users"][str(user.id)]
+                assert entry["user_email"] == user.email
+                assert entry["summary"] == self.single_summary(user)
+
+        assert data["users"][str(self.users[0].id)]["summary"] == []
+
+    def test_all_users_when_ids_omitted(self):
+        response = self.client.post(self.url, self.params, format="json")
+
+        assert set(read_json(response)["users"]) == {str(u.id) for u in self.users}
+
+    @pytest.mark.parametrize("use_rollups", [True, False])
+    def test_query_count_independent_of_user_count(
+        self, use_rollups, django_assert_max_num_queries
+    ):
+        """Test summarising many users costs a handful of queries"""
+        with override_settings(SUMMARY_USE_ROLLUPS=use_rollups):
+            with django_assert_max_num_queries(4):
+                response = self.client.post(
+                    self.url,
+                    {**self.params, "window": 2},
+                    format="json",
+                )
+                read_json(response)
+
+    @pytest.mark.parametrize(
+        "body",
+        [
+            {"to": "2024-01-05"},
+            {"from": "2024-01-01", "to": "2024-01-05", "user_ids": "1,2"},
+            {"from": "2024-01-01", "to": "2024-01-05", "granularity": "week"},
+            {"from": "2024-01-01", "to": "2024-01-05", "user_ids": [True]},
+            [1, 2],
+            "2024-01-01",
+        ],
+    )
+    def test_invalid_parameters(self, body):
+        response = self.client.post(self.url, body, format="json")
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "error" in response.data
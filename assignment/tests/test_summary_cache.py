@@ -0,0 +1,107 @@
+import pytest
+from datetime import datetime
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.models import Record, User
+
+
+@pytest.mark.django_db
+class TestSummaryCache:
+    def setup_method(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="cacheuser")
+        Record.objects.create(
+            user=self.user,
+            word_count=100,
+            study_time_minutes=30,
+            timestamp=timezone.make_aware(datetime(2024, 1, 1, 10, 0, 0)),
+            submission_id="cache_1",
+        )
+        self.url = reverse("summary", kwargs={"id": self.user.id})
+        self.params = {
+            "from": "2024-01-01T00:00:00Z",
+            "to": "2024-01-04T00:00:00Z",
+            "granularity": "day",
+        }
+
+    def test_repeat_request_served_without_queries(self, django_assert_num_queries):
+        """Test an identical request is answered from the cache"""
+        first = self.client.get(self.url, self.params)
+
+        with django_assert_num_queries(0):
+            second = self.client.get(self.url, self.params)
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.data == first.data
+
+    def test_new_record_invalidates_cache(self):
+        """Test writing a record for the user is visible immediately"""
+        self.client.get(self.url, self.params)
+
+        self.client.post(
+            reverse("records_json"),
+            {
+                "user_id": self.user.id,
+                "word_count": 50,
+                "study_time_minutes": 10,
+                "timestamp": "2024-01-01T12:00:00Z",
+            },
+            format="json",
+        )
+        response = self.client.get(self.url, self.params)
+
+        assert response.data["summary"][0]["total_word_count"] == 150
+
+    def test_batch_insert_invalidates_cache(self):
+        """Test the bulk ingestion path bumps the user's data version"""
+        self.client.get(self.url, self.params)
+
+        self.client.post(
+            reverse("records_json_batch"),
+            [
+                {
+                    "user_id": self.user.id,
+                    "word_count": 25,
+                    "study_time_minutes": 5,
+                    "timestamp": "2024-01-02T12:00:00Z",
+                }
+            ],
+            format="json",
+        )
+        response = self.client.get(self.url, self.params)
+
+        assert [p["total_word_count"] for p in response.data["summary"]] == [100, 25]
+
+    def test_other_user_writes_keep_cache(self, django_assert_num_queries):
+        """Test writes for another user do not invalidate this user's entries"""
+        other = User.objects.create_user(username="othercacheuser")
+        self.client.get(self.url, self.params)
+
+        Record.objects.create(
+            user=other,
+            word_count=1,
+            study_time_minutes=1,
+            timestamp=timezone.make_aware(datetime(2024, 1, 1, 11, 0, 0)),
+            submission_id="cache_other_1",
+        )
+
+        with django_assert_num_queries(0):
+            self.client.get(self.url, self.params)
+
+    @override_settings(SUMMARY_CACHE_ENABLED=False)
+    def test_cache_disabled(self):
+        """Test every request hits the database when caching is disabled"""
+        self.client.get(self.url, self.params)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, self.params)
+
+        assert len(queries) > 0
@@ -0,0 +1,135 @@
+import json
+from datetime import datetime, timedelta
+from io import StringIO
+from zoneinfo import ZoneInfo
+
+import pytest
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from assignment.encoders import encode_periods
+from assignment.models import Record, User
+from assignment.serializers import SummarySerializer
+from assignment.services import AggregationService
+
+
+def serializer_json(periods):
+    return JSONRenderer().render(SummarySerializer(periods, many=True).data).decode()
+
+
+@pytest.mark.django_db
+class TestSummaryFastRender:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="renderuser", email="rénder@example.com"
+        )
+        base_time = timezone.make_aware(datetime(2024, 3, 8, 21, 10, 0))
+        for i in range(40):
+            Record.objects.create(
+                user=self.user,
+                word_count=7 + 13 * i,
+                study_time_minutes=i % 9,
+                timestamp=base_time + timedelta(hours=4 * i, minutes=7 * i),
+                submission_id=f"render_{i}",
+            )
+        self.url = reverse("summary", kwargs={"id": self.user.id})
+        self.params = {"from": "2024-03-01", "to": "2024-03-20", "granularity": "hour"}
+
+    @pytest.mark.parametrize("tz", ["UTC", "America/New_York", "Asia/Kolkata"])
+    @pytest.mark.parametrize("granularity", ["hour", "day", "month"])
+    def test_encode_periods_matches_serializer(self, tz, granularity):
+        """Test the encoder output equals the rendered SummarySerializer data"""
+        with timezone.override(ZoneInfo(tz)):
+            periods = AggregationService.get_summary(
+                self.user.id,
+                timezone.make_aware(datetime(2024, 3, 1)),
+                timezone.make_aware(datetime(2024, 3, 20)),
+                granularity,
+            )
+            assert periods
+            assert encode_periods(periods) == serializer_json(periods)
+
+    def test_encode_periods_edge_values(self):
+        """Test nulls, integral floats and large totals are encoded identically"""
+        start = timezone.make_aware(datetime(2024, 1, 1))
+        periods = [
+            {
+                "start_date": start,
+                "end_date": start + timedelta(days=1),
+                "total_word_count": 10**12,
+                "total_study_time_minutes": 0,
+                "average_words_per_minute": 0,
+                "moving_avg_word_count": None,
+                "moving_avg_study_time": 3,
+                "record_count": 1,
+            },
+            {
+                "start_date": start + timedelta(days=1),
+                "end_date": start + timedelta(days=2),
+                "total_word_count": 1,
+                "total_study_time_minutes": 3,
+                "average_words_per_minute": 0.33,
+                "moving_avg_word_count": 1e-05,
+                "moving_avg_study_time": 123456789.12,
+                "record_count": 2,
+            },
+        ]
+
+        assert encode_periods(periods) == serializer_json(periods)
+        assert encode_periods([]) == "[]"
+
+    @pytest.mark.parametrize("stream", ["false", "true"])
+    def test_summary_response_matches_serializer(self, stream):
+        """Test the summary endpoint returns the same document with either renderer"""
+        params = {**self.params, "stream": stream}
+        with override_settings(SUMMARY_FAST_RENDER=False):
+            expected = self.client.get(self.url, params)
+        actual = self.client.get(self.url, params)
+
+        assert actual.status_code == status.HTTP_200_OK
+        if stream == "true":
+            assert json.loads(b"".join(actual.streaming_content)) == json.loads(
+                b"".join(expected.streaming_content)
+            )
+        else:
+            assert actual.content == expected.content
+            assert actual["Content-Type"] == expected["Content-Type"]
+
+    def test_cached_summary_matches_serializer(self):
+        """Test a cache hit renders the same document as the first response"""
+        first = self.client.get(self.url, self.params)
+        second = self.client.get(self.url, self.params)
+
+        assert second.content == first.content
+
+    def test_batch_summary_matches_serializer(self):
+        """Test /users/summary returns the same document with either renderer"""
+        body = {**self.params, "user_ids": [self.user.id]}
+        with override_settings(SUMMARY_FAST_RENDER=False):
+            expected = self.client.post(reverse("summary_batch"), body, format="json")
+        actual = self.client.post(reverse("summary_batch"), body, format="json")
+
+        assert json.loads(b"".join(actual.streaming_content)) == json.loads(
+            b"".join(expected.streaming_content)
+        )
+
+    def test_browsable_api_renders_summary(self):
+        """Test the browsable API still renders summary data"""
+        response = self.client.get(self.url, self.params, HTTP_ACCEPT="text/html")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert "average_words_per_minute" in response.content.decode()
+
+    def test_benchmark_summary_render_command(self):
+        """Test the render micro-benchmark runs and reports both encoders"""
+        out = StringIO()
+        call_command("benchmark_summary_render", sizes=[10], repeat=1, stdout=out)
+
+        assert "serializer=" in out.getvalue()
+        assert "encoder=" in out.getvalue()
@@ -0,0 +1,79 @@
+import inspect
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.models import Record, User
+from assignment.services import AggregationService
+
+
+@pytest.mark.django_db
+class TestSummaryStreaming:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(
+            username="streamuser", email="stream@example.com"
+        )
+        base_time = timezone.make_aware(datetime(2024, 1, 1, 0, 20, 0))
+        for i in range(60):
+            Record.objects.create(
+                user=self.user,
+                word_count=10 + i,
+                study_time_minutes=i % 7,
+                timestamp=base_time + timedelta(hours=5 * i),
+                submission_id=f"stream_{i}",
+            )
+        self.url = reverse("summary", kwargs={"id": self.user.id})
+        self.params = {
+            "from": "2024-01-02T03:30:00Z",
+            "to": "2024-01-12T00:00:00Z",
+            "granularity": "hour",
+        }
+
+    @pytest.mark.parametrize("use_rollups", [True, False])
+    @pytest.mark.parametrize("method", ["sma", "ema"])
+    def test_stream_matches_buffered_response(self, use_rollups, method):
+        """Test ?stream=true returns the same JSON document"""
+        params = {**self.params, "method": method}
+        with override_settings(SUMMARY_USE_ROLLUPS=use_rollups):
+            buffered = self.client.get(self.url, params)
+            streamed = self.client.get(self.url, {**params, "stream": "true"})
+
+        assert streamed.status_code == status.HTTP_200_OK
+        assert streamed.streaming
+        body = json.loads(b"".join(streamed.streaming_content))
+        assert body == json.loads(buffered.content)
+        assert len(body["summary"]) > 0
+
+    def test_stream_empty_summary(self):
+        response = self.client.get(
+            self.url,
+            {"from": "2023-01-01", "to": "2023-02-01", "stream": "1"},
+        )
+
+        assert json.loads(b"".join(response.streaming_content))["summary"] == []
+
+    def test_stream_unknown_user(self):
+        response = self.client.get(
+            reverse("summary", kwargs={"id": 9999}), {**self.params, "stream": "1"}
+        )
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_iter_summary_is_lazy(self):
+        periods = AggregationService.iter_summary(
+            self.user.id,
+            datetime.fromisoformat("2024-01-01T00:00:00+00:00"),
+            datetime.fromisoformat("2024-02-01T00:00:00+00:00"),
+            "hour",
+        )
+
+        assert inspect.isgenerator(periods)
+        first = next(periods)
+        assert first["record_count"] == 1
@@ -1,9 +1,13 @@
 import pytest
 from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from assignment.middleware import UserCache
+
 User = get_user_model()
 
 
@@ -34,3 +38,62 @@ class TestUserMeEndpoint:
 
         assert response.status_code == status.HTTP_401_UNAUTHORIZED
         assert response.data == {"error": "User not authenticated"}
+
+
+@pytest.mark.django_db
+class TestStatelessMockLogin:
+    def setup_method(self):
+        UserCache.clear()
+        self.client = APIClient()
+        self.url = reverse("user-me")
+        self.user = User.objects.create_user(username="cacheduser")
+
+    def teardown_method(self):
+        UserCache.clear()
+
+    def test_cached_authentication_runs_no_queries(self, django_assert_num_queries):
+        """Test repeat requests authenticate without touching the database"""
+        self.client.get(self.url, HTTP_X_USER_NAME="cacheduser")
+
+        with django_assert_num_queries(0):
+            response = self.client.get(self.url, HTTP_X_USER_NAME="cacheduser")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == {"username": "cacheduser"}
+        assert not Session.objects.exists()
+
+    def test_cache_invalidated_on_user_save_and_delete(self):
+        """Test renamed and deleted users are not served from the cache"""
+        self.client.get(self.url, HTTP_X_USER_NAME="cacheduser")
+
+        self.user.username = "renameduser"
+        self.user.save()
+        assert (
+            self.client.get(self.url, HTTP_X_USER_NAME="cacheduser").status_code
+            == status.HTTP_401_UNAUTHORIZED
+        )
+        assert self.client.get(self.url, HTTP_X_USER_NAME="renameduser").data == {
+            "username": "renameduser"
+        }
+
+        self.user.delete()
+        assert (
+            self.client.get(self.url, HTTP_X_USER_NAME="renameduser").status_code
+            == status.HTTP_401_UNAUTHORIZED
+        )
+
+    @override_settings(MOCK_LOGIN_CACHE_SIZE=1)
+    def test_cache_is_bounded(self):
+        User.objects.create_user(username="otheruser")
+        self.client.get(self.url, HTTP_X_USER_NAME="cacheduser")
+        self.client.get(self.url, HTTP_X_USER_NAME="otheruser")
+
+        assert list(UserCache._users) == ["otheruser"]
+
+    @override_settings(MOCK_LOGIN_STATELESS=False)
+    def test_session_login_mode(self):
+        """Test the session login can still be selected"""
+        response = self.client.get(self.url, HTTP_X_USER_NAME="cacheduser")
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Session.objects.exists()
@@ -0,0 +1,130 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from assignment.models import Record, User
+from assignment.windows import moving_average
+
+
+def naive_sma(values, window):
+    return [
+        sum(values[i - window + 1 : i + 1]) / window if i >= window - 1 else None
+        for i in range(len(values))
+    ]
+
+
+def naive_wma(values, window):
+    weights = range(1, window + 1)
+    return [
+        sum(w * v for w, v in zip(weights, values[i - window + 1 : i + 1]))
+        / sum(weights)
+        if i >= window - 1
+        else None
+        for i in range(len(values))
+    ]
+
+
+class TestMovingAverage:
+    values = [random.Random(7).randint(0, 1000) for _ in range(50)]
+
+    @pytest.mark.parametrize("window", [1, 2, 3, 7, 50, 60])
+    def test_sma_matches_definition(self, window):
+        assert moving_average(self.values, window, "sma") == naive_sma(
+            self.values, window
+        )
+
+    @pytest.mark.parametrize("window", [1, 2, 3, 7, 50, 60])
+    def test_wma_matches_definition(self, window):
+        assert moving_average(self.values, window, "wma") == naive_wma(
+            self.values, window
+        )
+
+    def test_ema(self):
+        result = moving_average([3, 6, 9, 12], 3, "ema")
+
+        assert result[:2] == [None, None]
+        assert result[2] == 6
+        assert result[3] == pytest.approx(0.5 * 12 + 0.5 * 6)
+
+    def test_unknown_method(self):
+        with pytest.raises(ValueError):
+            moving_average([1, 2, 3], 3, "median")
+
+
+@pytest.mark.django_db
+class TestSummaryWindows:
+    def setup_method(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(username="windowuser")
+        base_time = timezone.make_aware(datetime(2024, 1, 1, 10, 0, 0))
+        for i in range(10):
+            Record.objects.create(
+                user=self.user,
+                word_count=100 + i * 10,
+                study_time_minutes=30 + i,
+                timestamp=base_time + timedelta(days=i),
+                submission_id=f"window_{i}",
+            )
+        self.url = reverse("summary", kwargs={"id": self.user.id})
+
+    def test_lookback_fills_first_periods(self):
+        """Test the periods before "from" are used to warm up the average"""
+        response = self.client.get(
+            self.url,
+            {"from": "2024-01-05", "to": "2024-01-07", "granularity": "day"},
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        first = response.data["summary"][0]
+        # Jan 3, 4 and 5 have 120, 130 and 140 words
+        assert first["moving_avg_word_count"] == 130.0
+        assert response.data["moving_average"] == {"method": "sma", "window": 3}
+
+    def test_insufficient_history_returns_none(self):
+        response = self.client.get(
+            self.url,
+            {
+                "from": "2024-01-01",
+                "to": "2024-01-03",
+                "granularity": "day",
+                "window": 5,
+            },
+        )
+
+        assert all(p["moving_avg_word_count"] is None for p in response.data["summary"])
+
+    @pytest.mark.parametrize("method", ["sma", "ema", "wma"])
+    def test_methods_match_reference(self, method):
+        response = self.client.get(
+            self.url,
+            {
+                "from": "2024-01-06",
+                "to": "2024-01-11",
+                "granularity": "day",
+                "window": 4,
+                "method": method,
+            },
+        )
+
+        word_counts = [100 + i * 10 for i in range(10)]
+        expected = moving_average(word_counts, 4, method)[5:]
+        assert [p["moving_avg_word_count"] for p in response.data["summary"]] == [
+            round(value, 2) for value in expected
+        ]
+
+    @pytest.mark.parametrize(
+        "params",
+        [{"window": 0}, {"window": "abc"}, {"window": 10_000}, {"method": "median"}],
+    )
+    def test_invalid_parameters(self, params):
+        response = self.client.get(
+            self.url, {"from": "2024-01-01", "to": "2024-01-03", **params}
+        )
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "error" in response.data
@@ -0,0 +1,117 @@
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from time import perf_counter
+
+_current = ContextVar("server_timing", default=None)
+
+# Returned by phase() while no timer is active, so disabled timing costs a
+# context variable lookup per call site.
+_NO_PHASE = nullcontext()
+
+
+class ServerTiming:
+    """
+    Accumulates wall-clock time per named phase of one request. Phases nest
+    and are exclusive: while a nested phase runs the enclosing one is paused,
+    so e.g. the SQL fetched while the metric loop pulls periods is counted
+    as "sql" and not also as "metrics".
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        # The bottom None entry collects time outside any phase, so switching
+        # phases never has to check for an empty stack.
+        self._stack = [None]
+        self._mark = perf_counter()
+
+    def start(self, name):
+        now = perf_counter()
+        self.durations[self._stack[-1]] += now - self._mark
+        self._stack.append(name)
+        self._mark = now
+
+    def stop(self):
+        now = perf_counter()
+        self.durations[self._stack.pop()] += now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def phase(self, name):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop()
+
+    def iterate(self, name, iterable):
+        """
+        Yields from `iterable`, counting the time spent producing each item
+        (not the time the consumer spends on it) as `name`.
+        """
+        # start()/stop() inlined: this runs once per item of long streams
+        iterator = iter(iterable)
+        durations = self.durations
+        stack = self._stack
+        while True:
+            now = perf_counter()
+            durations[stack[-1]] += now - self._mark
+            stack.append(name)
+            self._mark = now
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                now = perf_counter()
+                durations[stack.pop()] += now - self._mark
+                self._mark = now
+            yield item
+
+    def milliseconds(self):
+        return {
+            name: round(seconds * 1000, 2)
+            for name, seconds in self.durations.items()
+            if name is not None
+        }
+
+    def header(self):
+        """The Server-Timing header value, e.g. "sql;dur=1.25, render;dur=0.40"."""
+        return ", ".join(
+            f"{name};dur={ms:.2f}" for name, ms in self.milliseconds().items()
+        )
+
+    @contextmanager
+    def activate(self):
+        token = self.enter()
+        try:
+            yield self
+        finally:
+            self.exit(token)
+
+    def enter(self):
+        """Makes this the current timer; returns the token for exit()."""
+        return _current.set(self)
+
+    @staticmethod
+    def exit(token):
+        _current.reset(token)
+
+
+def phase(name):
+    """Times a block as `name` on the request's timer, if there is one."""
+    timer = _current.get()
+    if timer is None:
+        return _NO_PHASE
+    return timer.phase(name)
+
+
+def iterate(name, iterable):
+    """
+    Times the production of each item of `iterable` as `name` on the
+    request's timer. Returns `iterable` itself when there is no timer.
+    """
+    timer = _current.get()
+    if timer is None:
+        return iterable
+    return timer.iterate(name, iterable)
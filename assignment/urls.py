@@ -17,7 +17,17 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from assignment.views import initialize_data, UserViewSet, RecordView, SummaryView
+from assignment.views import (
+    initialize_data,
+    JobView,
+    UserViewSet,
+    RecordView,
+    RecordBatchView,
+    SummaryView,
+    SummaryBatchView,
+    metrics_view,
+    export_records,
+)
 from rest_framework.routers import DefaultRouter
 
 
@@ -28,6 +38,11 @@ urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/v1/", include(router.urls)),
     path("init_data/", initialize_data, name="initialize_data"),
+    path("jobs/<uuid:id>", JobView.as_view(), name="job"),
     path("recordsjson", RecordView.as_view(), name="records_json"),
+    path("recordsjson/batch", RecordBatchView.as_view(), name="records_json_batch"),
     path("users/<int:id>/summary", SummaryView.as_view(), name="summary"),
+    path("users/summary", SummaryBatchView.as_view(), name="summary_batch"),
+    path("users/<int:id>/records/export", export_records, name="records_export"),
+    path("metrics", metrics_view, name="metrics"),
 ]
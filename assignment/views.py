@@ -1,27 +1,103 @@
 from rest_framework import status, viewsets
 from rest_framework.decorators import api_view, action
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
-from django.core.management import call_command
+from rest_framework.utils.encoders import JSONEncoder
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.urls import reverse
 from rest_framework.views import APIView
-from assignment.serializers import RecordSerializer, SummarySerializer
-from assignment.services import AggregationService
-from assignment.models import User
+from assignment.cache import SummaryCache
+from assignment.encoders import (
+    SummaryJSONRenderer,
+    SummaryPeriods,
+    encode_periods,
+    iter_encoded_periods,
+)
+from assignment.parsers import NDJSONParser
+from assignment.serializers import JobSerializer, RecordSerializer, SummarySerializer
+from assignment.services import AggregationService, RecordIngestService
+from assignment import exports, metrics, timing
+from assignment.windows import METHODS
+from assignment.jobs import JobRunner
+from assignment.models import Job, User
 from datetime import datetime
+from pathlib import PurePath
+import json
 from django.utils import timezone
 
 
 @api_view(["POST"])
 def initialize_data(request):
-    try:
-        file_name = request.data.get("file", "MOCK_DATA.json")
-        print(f"Initializing data from {file_name}")
-        call_command("init_data", file=file_name)
+    """
+    POST: Runs init_data as a background job; poll the returned status_url.
+    """
+    if not isinstance(request.data, dict):
         return Response(
-            {"message": f"Data initialized successfully from {file_name}"},
-            status=status.HTTP_200_OK,
+            {"error": "Request body must be a JSON object"},
+            status=status.HTTP_400_BAD_REQUEST,
         )
-    except Exception as e:
-        return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    file_name = request.data.get("file", "MOCK_DATA.json")
+    if not isinstance(file_name, str):
+        return Response(
+            {"error": "file must be a string"}, status=status.HTTP_400_BAD_REQUEST
+        )
+    # Only fixtures next to the command; an absolute path would load any
+    # JSON file readable by the server
+    path = PurePath(file_name)
+    if not file_name or path.is_absolute() or ".." in path.parts:
+        return Response(
+            {"error": "file must be a relative path without '..'"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    # Fixture users never get staff or superuser rights over HTTP
+    job = JobRunner.submit("init_data", file=file_name, unprivileged=True)
+    return Response(
+        {
+            "message": f"Data initialization from {file_name} queued",
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": request.build_absolute_uri(
+                reverse("job", kwargs={"id": job.id})
+            ),
+        },
+        status=status.HTTP_202_ACCEPTED,
+    )
+
+
+class JobView(APIView):
+    """
+    ViewSet for background job status.
+    """
+
+    def get(self, request, id):
+        """
+        GET: Job status, progress, duration and result
+        """
+        try:
+            job = Job.objects.get(id=id)
+        except Job.DoesNotExist:
+            return Response(
+                {"error": "Job not found"}, status=status.HTTP_404_NOT_FOUND
+            )
+        return Response(JobSerializer(JobRunner.refresh(job)).data)
+
+
+def metrics_view(request):
+    """
+    GET: metrics of all worker processes in the Prometheus text format, for
+    the local addresses in METRICS_ALLOWED_IPS only.
+    """
+    allowed = getattr(settings, "METRICS_ALLOWED_IPS", ["127.0.0.1", "::1"])
+    if not metrics.is_enabled() or request.META.get("REMOTE_ADDR") not in allowed:
+        return HttpResponse(status=status.HTTP_404_NOT_FOUND)
+    metrics.registry.flush()
+    return HttpResponse(
+        metrics.registry.exposition(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
 
 
 class UserViewSet(viewsets.ViewSet):
@@ -60,7 +136,7 @@ class RecordView(APIView):
             return Response(
                 {
                     "id": record.id,
-                    "user_id": record.user.id,
+                    "user_id": record.user_id,
                     "word_count": record.word_count,
                     "study_time_minutes": record.study_time_minutes,
                     "timestamp": record.timestamp,
@@ -71,83 +147,307 @@ class RecordView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SummaryView(APIView):
+class RecordBatchView(APIView):
     """
-    ViewSet for User Summary operations.
+    ViewSet for batch Record ingestion.
     """
 
-    def get(self, request, id):
+    parser_classes = [JSONParser, NDJSONParser]
+
+    def post(self, request):
         """
-        GET: User Summary
+        POST: Batch Log Registration (JSON array or NDJSON body)
         """
-        from_date_str = request.GET.get("from")
-        to_date_str = request.GET.get("to")
-        granularity = request.GET.get("granularity", "day")
-
-        if not from_date_str or not to_date_str:
+        items = request.data
+        if not isinstance(items, list):
             return Response(
-                {"error": '"from" and "to" parameters are required'},
+                {"error": "Request body must be a JSON array or NDJSON records"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        if granularity not in ["hour", "day", "month"]:
+        max_size = getattr(settings, "RECORD_BATCH_MAX_SIZE", 5000)
+        if len(items) > max_size:
             return Response(
-                {"error": "Granularity must be hour, day, or month"},
+                {"error": f"Batch size must not exceed {max_size} records"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        results = [None] * len(items)
+        valid_indexes = []
+        entries = []
+        for index, item in enumerate(items):
+            serializer = RecordSerializer(data=item)
+            if serializer.is_valid():
+                valid_indexes.append(index)
+                entries.append(serializer.validated_data)
+            else:
+                results[index] = {
+                    "index": index,
+                    "status": "error",
+                    "errors": serializer.errors,
+                }
+
+        ingested = RecordIngestService.bulk_ingest(
+            entries, chunk_size=getattr(settings, "RECORD_BATCH_CHUNK_SIZE", 500)
+        )
+        for index, (item_status, payload) in zip(valid_indexes, ingested):
+            if item_status == "error":
+                results[index] = {
+                    "index": index,
+                    "status": item_status,
+                    "errors": payload,
+                }
+            else:
+                results[index] = {"index": index, "status": item_status, "id": payload}
+
+        counts = {"created": 0, "duplicate": 0, "error": 0}
+        for result in results:
+            counts[result["status"]] += 1
+
+        return Response(
+            {
+                "created": counts["created"],
+                "duplicates": counts["duplicate"],
+                "errors": counts["error"],
+                "results": results,
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+def stream_json(header, key, members, brackets="[]"):
+    """
+    Yields `header` serialized as a JSON object with one extra `key` whose
+    array (or object, with brackets="{}") value is built from the already
+    encoded `members` as they arrive.
+    """
+    yield json.dumps(header)[:-1] + f", {json.dumps(key)}: {brackets[0]}"
+    separator = ""
+    for member in members:
+        yield separator + member
+        separator = ", "
+    yield brackets[1] + "}"
+
+
+def parse_date(date_str):
+    try:
+        return datetime.fromisoformat(date_str.replace("Z", "+00:00"))
+    except ValueError:
+        for fmt in ["%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"]:
+            try:
+                return datetime.strptime(date_str, fmt)
+            except ValueError:
+                continue
+        raise ValueError(f"Unable to parse date: {date_str}")
+
+
+def parse_summary_params(params):
+    """
+    Validates the summary parameters shared by the single and batch summary
+    endpoints. Returns (options, None) or (None, error response).
+    """
+
+    def error(message):
+        return None, Response({"error": message}, status=status.HTTP_400_BAD_REQUEST)
+
+    from_date_str = params.get("from")
+    to_date_str = params.get("to")
+    granularity = params.get("granularity", "day")
+
+    if not from_date_str or not to_date_str:
+        return error('"from" and "to" parameters are required')
+
+    if granularity not in ["hour", "day", "month"]:
+        return error("Granularity must be hour, day, or month")
+
+    method = params.get("method", "sma")
+    if method not in METHODS:
+        return error("Method must be sma, ema, or wma")
+
+    max_window = getattr(settings, "SUMMARY_MAX_WINDOW", 365)
+    try:
+        window = int(params.get("window", 3))
+    except (TypeError, ValueError):
+        window = 0
+    if not 1 <= window <= max_window:
+        return error(f"Window must be an integer between 1 and {max_window}")
+
+    try:
+        from_date = parse_date(str(from_date_str))
+        to_date = parse_date(str(to_date_str))
+    except ValueError as e:
+        return error(f"Invalid date format: {str(e)}")
+
+    if from_date.tzinfo is None:
+        from_date = timezone.make_aware(from_date)
+    if to_date.tzinfo is None:
+        to_date = timezone.make_aware(to_date)
+
+    if from_date > to_date:
+        return error('"from" date must be before "to" date')
+
+    return {
+        "from_date": from_date,
+        "to_date": to_date,
+        "granularity": granularity,
+        "window": window,
+        "method": method,
+    }, None
+
+
+@require_GET
+def export_records(request, id):
+    """
+    GET: The user's raw records in (timestamp, id) order, streamed as CSV
+    (default) or NDJSON, optionally limited to from <= timestamp <= to.
+
+    A plain Django view: DRF would treat ?format= as a renderer override.
+    """
+    export_format = request.GET.get("format", "csv")
+    if export_format not in exports.CONTENT_TYPES:
+        return JsonResponse(
+            {"error": "Format must be csv or ndjson"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    bounds = {}
+    for name in ("from", "to"):
+        value = request.GET.get(name)
+        if not value:
+            continue
         try:
+            moment = parse_date(value)
+        except ValueError as e:
+            return JsonResponse(
+                {"error": f"Invalid date format: {str(e)}"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if moment.tzinfo is None:
+            moment = timezone.make_aware(moment)
+        bounds[name] = moment
+
+    if not User.objects.filter(id=id).exists():
+        return JsonResponse(
+            {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
+        )
+
+    rows = exports.export_rows(id, bounds.get("from"), bounds.get("to"))
+    response = StreamingHttpResponse(
+        exports.encode_rows(rows, export_format),
+        content_type=exports.CONTENT_TYPES[export_format],
+    )
+    response["Content-Disposition"] = (
+        f'attachment; filename="user-{id}-records.{export_format}"'
+    )
+    return response
+
+
+class SummaryView(APIView):
+    """
+    ViewSet for User Summary operations.
+    """
+
+    renderer_classes = [SummaryJSONRenderer, BrowsableAPIRenderer]
+
+    def get(self, request, id):
+        """
+        GET: User Summary
+        """
+        with timing.phase("parse"):
+            options, error = parse_summary_params(request.GET)
+        if error is not None:
+            return error
+
+        from_date = options["from_date"]
+        to_date = options["to_date"]
+        granularity = options["granularity"]
+        window = options["window"]
+        method = options["method"]
+        # Streamed responses are never buffered, so they bypass the cache
+        stream = request.GET.get("stream", "").lower() in ("1", "true", "yes")
+        fast_render = getattr(settings, "SUMMARY_FAST_RENDER", True)
+
+        try:
+            cache_key = None
+            if SummaryCache.is_enabled() and not stream:
+                cache_key = SummaryCache.key(
+                    id,
+                    from_date,
+                    to_date,
+                    granularity,
+                    timezone.get_current_timezone(),
+                    window=window,
+                    method=method,
+                )
+                with timing.phase("cache"):
+                    payload = SummaryCache.get(cache_key)
+                if payload is not None:
+                    return Response(payload)
+
             # Check if user exists
             try:
-                user = User.objects.get(id=id)
+                with timing.phase("user"):
+                    user = User.objects.get(id=id)
             except User.DoesNotExist:
                 return Response(
                     {"error": "User not found"}, status=status.HTTP_404_NOT_FOUND
                 )
 
-            def parse_date(date_str):
-                try:
-                    return datetime.fromisoformat(date_str.replace("Z", "+00:00"))
-                except ValueError:
-                    for fmt in ["%Y-%m-%dT%H:%M:%S%z", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d"]:
-                        try:
-                            return datetime.strptime(date_str, fmt)
-                        except ValueError:
-                            continue
-                    raise ValueError(f"Unable to parse date: {date_str}")
-
-            from_date = parse_date(from_date_str)
-            to_date = parse_date(to_date_str)
-
-            if from_date.tzinfo is None:
-                from_date = timezone.make_aware(from_date)
-            if to_date.tzinfo is None:
-                to_date = timezone.make_aware(to_date)
-
-            if from_date > to_date:
-                return Response(
-                    {"error": '"from" date must be before "to" date'},
-                    status=status.HTTP_400_BAD_REQUEST,
+            payload = {
+                "user_id": user.id,
+                "user_email": user.email,
+                "timezone": str(timezone.get_current_timezone()),
+                "granularity": granularity,
+                "moving_average": {"method": method, "window": window},
+                "period": {
+                    "from": from_date.isoformat(),
+                    "to": to_date.isoformat(),
+                },
+            }
+
+            if stream:
+                periods = timing.iterate(
+                    "metrics",
+                    AggregationService.iter_summary(
+                        user.id,
+                        from_date,
+                        to_date,
+                        granularity,
+                        window=window,
+                        method=method,
+                    ),
+                )
+                if fast_render:
+                    members = iter_encoded_periods(periods)
+                else:
+                    members = (
+                        json.dumps(SummarySerializer(period).data, cls=JSONEncoder)
+                        for period in periods
+                    )
+                return StreamingHttpResponse(
+                    stream_json(payload, "summary", timing.iterate("render", members)),
+                    content_type="application/json",
                 )
 
-            summary_data = AggregationService.get_summary(
-                user.id, from_date, to_date, granularity
-            )
+            with timing.phase("metrics"):
+                summary_data = AggregationService.get_summary(
+                    user.id,
+                    from_date,
+                    to_date,
+                    granularity,
+                    window=window,
+                    method=method,
+                )
 
-            serializer = SummarySerializer(summary_data, many=True)
-            return Response(
-                {
-                    "user_id": user.id,
-                    "user_email": user.email,
-                    "timezone": str(timezone.get_current_timezone()),
-                    "granularity": granularity,
-                    "period": {
-                        "from": from_date.isoformat(),
-                        "to": to_date.isoformat(),
-                    },
-                    "summary": serializer.data,
-                }
-            )
+            if fast_render:
+                payload["summary"] = SummaryPeriods(summary_data)
+            else:
+                with timing.phase("render"):
+                    serializer = SummarySerializer(summary_data, many=True)
+                    payload["summary"] = serializer.data
+            if cache_key is not None:
+                SummaryCache.set(cache_key, payload)
+            return Response(payload)
 
         except ValueError as e:
             return Response(
@@ -159,3 +459,86 @@ class SummaryView(APIView):
                 {"error": f"Internal server error: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+
+class SummaryBatchView(APIView):
+    """
+    ViewSet for multi-user Summary operations.
+    """
+
+    def post(self, request):
+        """
+        POST: Summaries for many users, streamed as one JSON object keyed by
+        user ID
+        """
+        if not isinstance(request.data, dict):
+            return Response(
+                {"error": "Request body must be a JSON object"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        options, error = parse_summary_params(request.data)
+        if error is not None:
+            return error
+
+        user_ids = request.data.get("user_ids")
+        max_users = getattr(settings, "SUMMARY_BATCH_MAX_USERS", 10000)
+        if user_ids is not None:
+            # bool is a subclass of int, but true/false are not user IDs
+            if not isinstance(user_ids, list) or not all(
+                isinstance(user_id, int) and not isinstance(user_id, bool)
+                for user_id in user_ids
+            ):
+                return Response(
+                    {"error": '"user_ids" must be a list of integers'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if len(user_ids) > max_users:
+                return Response(
+                    {"error": f'"user_ids" must not exceed {max_users} users'},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        summaries = AggregationService.get_summaries(
+            user_ids,
+            options["from_date"],
+            options["to_date"],
+            options["granularity"],
+            window=options["window"],
+            method=options["method"],
+        )
+        header = {
+            "timezone": str(timezone.get_current_timezone()),
+            "granularity": options["granularity"],
+            "moving_average": {
+                "method": options["method"],
+                "window": options["window"],
+            },
+            "period": {
+                "from": options["from_date"].isoformat(),
+                "to": options["to_date"].isoformat(),
+            },
+        }
+
+        if getattr(settings, "SUMMARY_FAST_RENDER", True):
+            members = (
+                f"{json.dumps(str(user_id))}: "
+                f'{{"user_email": {json.dumps(email)}, '
+                f'"summary": {encode_periods(periods)}}}'
+                for user_id, email, periods in summaries
+            )
+        else:
+            members = (
+                f"{json.dumps(str(user_id))}: "
+                + json.dumps(
+                    {
+                        "user_email": email,
+                        "summary": SummarySerializer(periods, many=True).data,
+                    },
+                    cls=JSONEncoder,
+                )
+                for user_id, email, periods in summaries
+            )
+        return StreamingHttpResponse(
+            stream_json(header, "users", members, brackets="{}"),
+            content_type="application/json",
+        )
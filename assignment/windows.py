@@ -0,0 +1,67 @@
+"""
+Single-pass moving averages over a sequence of period totals.
+
+Every method keeps running sums, so each new period costs O(1) regardless
+of the window size and a series can be consumed as a stream. Positions
+without a full window of history yield None.
+"""
+
+from collections import deque
+
+METHODS = ("sma", "ema", "wma")
+
+
+class MovingAverage:
+    """
+    Incremental moving average: push() one value at a time and get the
+    average of the window ending at that value.
+
+    - sma: simple mean of the last `window` values
+    - wma: linearly weighted, the newest value has weight `window`, the oldest 1
+    - ema: alpha = 2 / (window + 1), seeded with the SMA of the first window
+    """
+
+    def __init__(self, window=3, method="sma"):
+        if method not in METHODS:
+            raise ValueError(f"Unknown moving average method: {method}")
+        self.window = window
+        self.method = method
+        self.values = deque(maxlen=window)
+        self.total = 0
+        self.weighted = 0
+        self.ema = None
+        self.count = 0
+
+    def push(self, value):
+        window = self.window
+        evicted = self.values[0] if len(self.values) == window else 0
+
+        if self.method == "wma":
+            if self.count < window:
+                self.weighted += (self.count + 1) * value
+            else:
+                # Shift every weight down by one and add the new value at `window`
+                self.weighted += window * value - self.total
+
+        self.total += value - evicted
+        self.values.append(value)
+        self.count += 1
+
+        if self.count < window:
+            return None
+        if self.method == "sma":
+            return self.total / window
+        if self.method == "wma":
+            return self.weighted / (window * (window + 1) // 2)
+
+        if self.ema is None:
+            self.ema = self.total / window
+        else:
+            alpha = 2 / (window + 1)
+            self.ema = alpha * value + (1 - alpha) * self.ema
+        return self.ema
+
+
+def moving_average(values, window=3, method="sma"):
+    average = MovingAverage(window, method)
+    return [average.push(value) for value in values]